@@ -1,14 +1,54 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from typing import Optional
+import asyncio
+import json
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from datetime import datetime
 
+from app.core.config import settings
 from app.core.logging import logger, log_exception
-from app.models.ticket_dto import TicketResponse, TicketRequest
-from app.services.ticket_workflow import TicketWorkflowService
+from app.models.ticket_dto import (
+    TicketResponse, TicketRequest, TicketBatchRequest, TicketBatchResponse, TicketJobRequest, TicketJobResponse
+)
+from app.services.readiness import readiness
+from app.services.ticket_queue import TicketQueue
+
+if TYPE_CHECKING:
+    from app.services.ticket_workflow import TicketWorkflowService
 
 router = APIRouter()
-workflow_service = TicketWorkflowService()
+
+# 工作流服务(编译工作流、创建模型客户端及各类缓存)和异步任务队列在首次使用时创建，导入本模块不承担这部分开销；
+# 任务队列的 worker 在应用启动时启动（见 main.lifespan）
+_workflow_service: Optional["TicketWorkflowService"] = None
+_job_queue: Optional[TicketQueue] = None
+_service_lock = threading.Lock()
+
+
+def get_workflow_service() -> "TicketWorkflowService":
+    """获取进程内共享的工单工作流服务"""
+    global _workflow_service
+    if _workflow_service is None:
+        with _service_lock:
+            if _workflow_service is None:
+                from app.services.ticket_workflow import TicketWorkflowService
+                _workflow_service = TicketWorkflowService()
+    return _workflow_service
+
+
+def get_job_queue() -> TicketQueue:
+    """获取进程内共享的异步工单任务队列"""
+    global _job_queue
+    if _job_queue is None:
+        service = get_workflow_service()
+        with _service_lock:
+            if _job_queue is None:
+                _job_queue = TicketQueue(service)
+    return _job_queue
+
 
 @router.post("/process", response_model=TicketResponse)
 async def process_ticket(ticket: TicketRequest):
@@ -24,18 +64,136 @@ async def process_ticket(ticket: TicketRequest):
     try:
         logger.info("Received ticket request")
         logger.debug(f"Ticket content: {ticket.format_ticket_content()}")
-        response = await workflow_service.process_ticket(ticket)
+        response = await get_workflow_service().process_ticket(ticket)
         return response
         
     except Exception as e:
         log_exception(logger, e, "Error processing ticket")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/process/batch", response_model=TicketBatchResponse)
+async def process_ticket_batch(batch: TicketBatchRequest):
+    """
+    批量处理工单请求
+
+    Args:
+        batch: 工单列表及可选的并发数
+
+    Returns:
+        TicketBatchResponse: 各工单的处理结果（顺序与请求一致）及批次耗时
+    """
+    if len(batch.tickets) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"单批最多 {settings.BATCH_MAX_SIZE} 个工单")
+    try:
+        logger.info(f"Received batch ticket request: {len(batch.tickets)} tickets")
+        return await get_workflow_service().process_batch(batch)
+
+    except Exception as e:
+        log_exception(logger, e, "Error processing ticket batch")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/jobs", response_model=TicketJobResponse, status_code=202)
+async def submit_ticket_job(ticket: TicketJobRequest):
+    """
+    提交异步工单任务，立即返回 request_id，之后通过 GET /jobs/{request_id} 查询状态和结果
+
+    队列已满时返回 429，detail 中包含当前队列深度。
+
+    Args:
+        ticket: 工单请求信息，可指定优先级(urgent/normal/low)
+
+    Returns:
+        TicketJobResponse: 任务状态（queued）
+    """
+    job_queue = get_job_queue()
+    try:
+        job = job_queue.submit(TicketRequest(**ticket.model_dump(exclude={"priority"})), ticket.priority)
+    except asyncio.QueueFull:
+        logger.warning(f"Ticket job queue is full, depth: {job_queue.depth}")
+        raise HTTPException(
+            status_code=429,
+            detail={"message": "工单任务队列已满，请稍后重试", "queue_depth": job_queue.depth},
+            headers={"Retry-After": "10"}
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_response(job_queue.depth)
+
+@router.get("/jobs/{request_id}", response_model=TicketJobResponse)
+async def get_ticket_job(request_id: str):
+    """
+    查询异步工单任务的状态，处理完成后返回结果
+
+    Args:
+        request_id: 提交任务时返回的请求ID
+
+    Returns:
+        TicketJobResponse: 任务状态及结果
+    """
+    job_queue = get_job_queue()
+    job = job_queue.get(request_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在或已过期: {request_id}")
+    return job.to_response(job_queue.depth)
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """将事件格式化为 Server-Sent Events 报文"""
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+@router.post("/process/stream")
+async def process_ticket_stream(ticket: TicketRequest, request: Request):
+    """
+    流式处理工单请求（Server-Sent Events）
+
+    工作流执行过程中实时推送节点切换、工具调用和 LLM 增量输出，
+    最后推送 result 事件（内容同 /process 的 TicketResponse）。客户端断开后停止处理。
+
+    Args:
+        ticket: 工单请求信息
+
+    Returns:
+        StreamingResponse: text/event-stream 事件流
+    """
+    logger.info("Received streaming ticket request")
+    logger.debug(f"Ticket content: {ticket.format_ticket_content()}")
+
+    async def event_stream():
+        events = get_workflow_service().stream_ticket(ticket)
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    logger.info("Client disconnected, stop streaming ticket")
+                    break
+                yield _format_sse(event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/health")
 async def health_check():
-    """健康检查接口"""
+    """健康检查接口（存活检查：进程能响应即返回 healthy，不检查依赖）"""
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow(),
         "version": "1.0.0"
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    就绪检查接口：返回各依赖的预热状态和耗时
+
+    必需的依赖全部预热成功时返回 200，预热中或有依赖不可用时返回 503，负载均衡据此只向已预热的实例转发流量。
+    """
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content=jsonable_encoder(readiness.snapshot())
+    )
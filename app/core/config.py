@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
+from typing import Dict, Optional
+import json
 import os
 
 load_dotenv()
@@ -13,6 +15,121 @@ class Settings(BaseSettings):
     MODEL: str = os.getenv("MODEL", "gpt-3.5-turbo")
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
 
+    # 活动科目号检索：DashScope 接口、Embedding/分析模型、本地 Chroma 向量库路径及集合名
+    DASHSCOPE_API_KEY: Optional[str] = os.getenv("DASHSCOPE_API_KEY")
+    DASHSCOPE_API_BASE: str = os.getenv("DASHSCOPE_API_BASE", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+    ACTIVITY_EMBEDDING_MODEL: str = os.getenv("ACTIVITY_EMBEDDING_MODEL", "text-embedding-v3")
+    ACTIVITY_LLM_MODEL: str = os.getenv("ACTIVITY_LLM_MODEL", "qwq-32b")
+    ACTIVITY_CHROMA_DIR: str = os.getenv("ACTIVITY_CHROMA_DIR", "data/chroma_db")
+    ACTIVITY_COLLECTION: str = os.getenv("ACTIVITY_COLLECTION", "my_collection")
+    # 活动检索后端：chroma(本地 Chroma 向量库) 或 numpy(进程内内存映射索引，需先由 vector_index 导出)
+    ACTIVITY_RETRIEVAL_BACKEND: str = os.getenv("ACTIVITY_RETRIEVAL_BACKEND", "chroma")
+    ACTIVITY_NUMPY_INDEX_DIR: str = os.getenv("ACTIVITY_NUMPY_INDEX_DIR", "data/activity_index")
+
+    # 查询文本 embedding 缓存：是否启用、本地持久化路径、内存 LRU 条数
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "True").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.db")
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+
+    # 工具调用：单步内并发数、默认超时(秒)以及按工具名覆盖的超时，如 {"query_system_logs": 120}
+    TOOL_MAX_CONCURRENCY: int = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+    TOOL_TIMEOUT: float = float(os.getenv("TOOL_TIMEOUT", "60"))
+    TOOL_TIMEOUTS: Dict[str, float] = json.loads(os.getenv("TOOL_TIMEOUTS", "{}"))
+
+    # 批量处理工单：默认同时处理的工单数、单批最多工单数
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "500"))
+
+    # 异步任务队列：worker 数、队列容量、已完成任务结果保留时间(秒)、判定为加急工单的关键词(逗号分隔)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_MAX_SIZE: int = int(os.getenv("JOB_QUEUE_MAX_SIZE", "200"))
+    JOB_RESULT_TTL: float = float(os.getenv("JOB_RESULT_TTL", "3600"))
+    JOB_URGENT_KEYWORDS: str = os.getenv("JOB_URGENT_KEYWORDS", "加急,紧急")
+
+    # 近重复工单检测：是否启用、相似度阈值、时间窗口(秒)、最多保留的历史工单数
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "True").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+    DEDUP_WINDOW: float = float(os.getenv("DEDUP_WINDOW", "21600"))
+    DEDUP_MAX_ENTRIES: int = int(os.getenv("DEDUP_MAX_ENTRIES", "2000"))
+
+    # 代理提示词上下文管理：是否启用、每次调用模型的 token 预算、单条工具输出的 token 上限
+    CONTEXT_MANAGER_ENABLED: bool = os.getenv("CONTEXT_MANAGER_ENABLED", "True").lower() == "true"
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000"))
+    TOOL_OUTPUT_TOKEN_LIMIT: int = int(os.getenv("TOOL_OUTPUT_TOKEN_LIMIT", "2000"))
+
+    # 代理大模型响应缓存：是否启用、SQLite 文件路径、过期时间(秒)、内存 LRU 条数、SQLite 最多条数
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "data/llm_cache.db")
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "86400"))
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "256"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+    # 用户库(MySQL)连接池及表结构快照缓存时间(秒)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_TABLE_INFO_TTL: float = float(os.getenv("DB_TABLE_INFO_TTL", "3600"))
+
+    # 自然语言查询 -> 参数化 SQL 模板缓存：是否启用及最多缓存的句式数
+    SQL_TEMPLATE_CACHE_ENABLED: bool = os.getenv("SQL_TEMPLATE_CACHE_ENABLED", "True").lower() == "true"
+    SQL_TEMPLATE_CACHE_SIZE: int = int(os.getenv("SQL_TEMPLATE_CACHE_SIZE", "256"))
+
+    # 明觉日志 traceID 级联查询：最多级联的 traceID 数、并发请求数、日志条数预算(0 表示不限制)
+    MJLOG_MAX_TRACE_IDS: int = int(os.getenv("MJLOG_MAX_TRACE_IDS", "20"))
+    MJLOG_CASCADE_CONCURRENCY: int = int(os.getenv("MJLOG_CASCADE_CONCURRENCY", "5"))
+    MJLOG_LOG_BUDGET: int = int(os.getenv("MJLOG_LOG_BUDGET", "500"))
+    # 明觉日志结果按模板聚合后输出：是否启用、模板合并的相似度阈值
+    MJLOG_TEMPLATE_ENABLED: bool = os.getenv("MJLOG_TEMPLATE_ENABLED", "True").lower() == "true"
+    MJLOG_TEMPLATE_SIMILARITY: float = float(os.getenv("MJLOG_TEMPLATE_SIMILARITY", "0.5"))
+    # 明觉日志分页查询：每页条数、单个查询最多翻页数及时间预算(秒)，0 表示不限制；单个查询的条数上限同 MJLOG_LOG_BUDGET
+    MJLOG_PAGE_SIZE: int = int(os.getenv("MJLOG_PAGE_SIZE", "100"))
+    MJLOG_MAX_PAGES: int = int(os.getenv("MJLOG_MAX_PAGES", "10"))
+    MJLOG_PAGE_TIME_BUDGET: float = float(os.getenv("MJLOG_PAGE_TIME_BUDGET", "20"))
+
+    # 明觉日志接口连接：地址、登录 Cookie、读/连接超时(秒)、连接池大小、重试次数及退避基数(秒)
+    MJLOG_URL: str = os.getenv("MJLOG_URL", "https://web.rong-data.com/mjlog/elasticsearch/log/list")
+    MJLOG_COOKIE: Optional[str] = os.getenv("cookie")
+    MJLOG_TIMEOUT: float = float(os.getenv("MJLOG_TIMEOUT", "15"))
+    MJLOG_CONNECT_TIMEOUT: float = float(os.getenv("MJLOG_CONNECT_TIMEOUT", "5"))
+    MJLOG_MAX_CONNECTIONS: int = int(os.getenv("MJLOG_MAX_CONNECTIONS", "20"))
+    MJLOG_MAX_RETRIES: int = int(os.getenv("MJLOG_MAX_RETRIES", "2"))
+    MJLOG_RETRY_BACKOFF: float = float(os.getenv("MJLOG_RETRY_BACKOFF", "0.5"))
+
+    # 明觉日志查询范围：项目及时间窗口
+    MJLOG_PROJECT: str = os.getenv("MJLOG_PROJECT", "uum-api")
+    MJLOG_BEGIN_TIME: str = os.getenv("MJLOG_BEGIN_TIME", "2025-03-28 00:00:00")
+    MJLOG_END_TIME: str = os.getenv("MJLOG_END_TIME", "2025-03-29 23:59:59")
+
+    # 明觉日志本地全文索引：是否启用、SQLite 文件路径、日志过期时间(秒)
+    MJLOG_INDEX_ENABLED: bool = os.getenv("MJLOG_INDEX_ENABLED", "True").lower() == "true"
+    MJLOG_INDEX_PATH: str = os.getenv("MJLOG_INDEX_PATH", "data/mjlog_index.db")
+    MJLOG_INDEX_TTL: float = float(os.getenv("MJLOG_INDEX_TTL", "21600"))
+
+    # 积分明细工具：交给大模型的示例明细行数（其余明细只以汇总形式给出）
+    POINTS_EXEMPLAR_ROWS: int = int(os.getenv("POINTS_EXEMPLAR_ROWS", "5"))
+    # 积分明细本地存储：是否启用、SQLite 文件路径、明细过期时间(秒)
+    POINTS_STORE_ENABLED: bool = os.getenv("POINTS_STORE_ENABLED", "True").lower() == "true"
+    POINTS_STORE_PATH: str = os.getenv("POINTS_STORE_PATH", "data/points_ledger.db")
+    POINTS_STORE_TTL: float = float(os.getenv("POINTS_STORE_TTL", "86400"))
+
+    # 就绪检查：启动时是否向上游发送预热请求、单项预热超时(秒)、不影响就绪状态的依赖(逗号分隔)
+    READINESS_WARMUP_REQUESTS: bool = os.getenv("READINESS_WARMUP_REQUESTS", "False").lower() == "true"
+    READINESS_CHECK_TIMEOUT: float = float(os.getenv("READINESS_CHECK_TIMEOUT", "30"))
+    READINESS_OPTIONAL: str = os.getenv("READINESS_OPTIONAL", "mjlog,tokenizer")
+    # 预热失败的依赖的重试间隔(秒)：从初始间隔起每次翻倍，不超过最大间隔
+    READINESS_RETRY_INTERVAL: float = float(os.getenv("READINESS_RETRY_INTERVAL", "5"))
+    READINESS_RETRY_MAX_INTERVAL: float = float(os.getenv("READINESS_RETRY_MAX_INTERVAL", "60"))
+
+    # 日志：目录、默认级别、按模块(文件名)覆盖的级别如 {"ticket_workflow": "INFO"}、轮转保留的文件数、错误日志单文件大小(字节)
+    LOG_DIR: str = os.getenv("LOG_DIR", "logs")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG")
+    LOG_LEVELS: Dict[str, str] = json.loads(os.getenv("LOG_LEVELS", "{}"))
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+    LOG_ERROR_MAX_BYTES: int = int(os.getenv("LOG_ERROR_MAX_BYTES", str(10 * 1024 * 1024)))
+    # 日志载荷：单条消息最大字符数(超出截断，ERROR 及以上不截断，0 表示不限制)、DEBUG 日志采样率(0~1)
+    LOG_MAX_MESSAGE_CHARS: int = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "4000"))
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
     class Config:
         case_sensitive = True
 
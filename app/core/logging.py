@@ -1,49 +1,157 @@
+import atexit
 import logging
-from datetime import datetime
-import sys
+import logging.handlers
 import os
+import queue
+import random
+import sys
+import threading
 import traceback
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_listener_lock = threading.Lock()
+
+
+class LevelFilter(logging.Filter):
+    """按模块(文件名，不含扩展名)过滤日志级别，未配置的模块使用默认级别"""
+
+    def __init__(self, default_level: int, module_levels: Dict[str, int]):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.module_levels.get(record.module, self.default_level)
+
+
+class PayloadFilter(logging.Filter):
+    """
+    限制热点路径上的日志量：DEBUG 日志按采样率抽样，超长消息截断
+
+    工单内容、工具输出、SQL 查询结果等都可能整段写入日志，截断后再入队，减少复制和磁盘写入；
+    ERROR 及以上级别(通常带堆栈)保持完整。
+    """
+
+    def __init__(self, max_chars: int, debug_sample_rate: float):
+        super().__init__()
+        self.max_chars = max_chars
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1 \
+                and random.random() >= self.debug_sample_rate:
+            return False
+        if self.max_chars and record.levelno < logging.ERROR:
+            message = record.getMessage()
+            if len(message) > self.max_chars:
+                record.msg = f"{message[:self.max_chars]}...(已截断，共 {len(message)} 字符)"
+                record.args = None
+        return True
+
+
+def _level(name: str) -> int:
+    """级别名(如 "info")转为数值"""
+    return logging.getLevelName(name.upper())
+
+
+def _configured_levels() -> Tuple[int, Dict[str, int]]:
+    """默认级别及按模块配置的级别"""
+    return _level(settings.LOG_LEVEL), {module: _level(level) for module, level in settings.LOG_LEVELS.items()}
+
 
 def setup_logger():
-    # 确保日志目录存在
-    os.makedirs("logs", exist_ok=True)
-    
+    """
+    日志经队列异步写出：请求路径上的 logger 只把日志记录放入内存队列，由后台 QueueListener 线程
+    写控制台和文件。全部日志按天轮转，错误日志按大小轮转；级别可按模块配置(LOG_LEVELS)。
+    """
     logger = logging.getLogger("ticket_assistant")
-    logger.setLevel(logging.DEBUG)  # 设置为DEBUG级别
-
-    # 创建更详细的日志格式
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-    )
-
-    # 控制台处理器
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.DEBUG)  # 控制台只显示INFO及以上级别
-    logger.addHandler(console_handler)
-
-    # 文件处理器 - 所有日志
-    file_handler = logging.FileHandler(
-        f"logs/ticket_assistant_{datetime.now().strftime('%Y%m%d')}.log"
-    )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.DEBUG)  # 文件记录所有DEBUG及以上级别
-    logger.addHandler(file_handler)
-
-    # 错误日志专用处理器
-    error_handler = logging.FileHandler(
-        f"logs/ticket_assistant_errors_{datetime.now().strftime('%Y%m%d')}.log"
-    )
-    error_handler.setFormatter(formatter)
-    error_handler.setLevel(logging.ERROR)  # 只记录ERROR及以上级别
-    logger.addHandler(error_handler)
+    default_level, module_levels = _configured_levels()
+    # logger 本身取各模块中最低的级别，更低级别的日志在调用处即被丢弃
+    logger.setLevel(min([default_level, *module_levels.values()]))
+
+    start_logging()
+    atexit.register(stop_logging)
 
     return logger
 
+
+def start_logging() -> None:
+    """
+    创建处理器并启动后台监听线程（导入时及每次应用启动时调用，已在运行时不做任何事）
+    stop_logging 之后再次调用可恢复写日志，例如同一进程中先后启动多个应用生命周期
+    """
+    global _listener, _queue_handler
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        # 确保日志目录存在
+        os.makedirs(settings.LOG_DIR, exist_ok=True)
+        default_level, module_levels = _configured_levels()
+
+        # 创建更详细的日志格式
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+        )
+
+        # 控制台处理器
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        console_handler.setLevel(logging.DEBUG)
+
+        # 文件处理器 - 所有日志，每天零点轮转
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            os.path.join(settings.LOG_DIR, "ticket_assistant.log"),
+            when="midnight", backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(formatter)
+        file_handler.setLevel(logging.DEBUG)
+
+        # 错误日志专用处理器，按大小轮转
+        error_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(settings.LOG_DIR, "ticket_assistant_errors.log"),
+            maxBytes=settings.LOG_ERROR_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        error_handler.setFormatter(formatter)
+        error_handler.setLevel(logging.ERROR)  # 只记录ERROR及以上级别
+
+        # 调用方只做过滤、拼接消息和入队，按格式输出及控制台/文件 I/O 在监听线程中完成
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _queue_handler.addFilter(LevelFilter(default_level, module_levels))
+        _queue_handler.addFilter(PayloadFilter(settings.LOG_MAX_MESSAGE_CHARS, settings.LOG_DEBUG_SAMPLE_RATE))
+        logging.getLogger("ticket_assistant").addHandler(_queue_handler)
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, error_handler, respect_handler_level=True
+        )
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    写出队列中剩余的日志并停止后台监听线程（应用关闭及进程退出时调用，可重复调用）
+    之后不再入队，WARNING 及以上的日志由 logging 的兜底处理器直接输出到 stderr，直到 start_logging 重新启动
+    """
+    global _listener, _queue_handler
+    with _listener_lock:
+        listener, _listener = _listener, None
+        if _queue_handler is not None:
+            logging.getLogger("ticket_assistant").removeHandler(_queue_handler)
+            _queue_handler = None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
 def log_exception(logger, e, message="发生异常"):
     """详细记录异常信息，包括堆栈跟踪"""
     error_message = f"{message}: {str(e)}"
     stack_trace = traceback.format_exc()
-    logger.error(f"{error_message}\n堆栈跟踪:\n{stack_trace}")
+    logger.error(f"{error_message}\n堆栈跟踪:\n{stack_trace}", stacklevel=2)
 
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Literal, Optional
 from datetime import datetime
 
 class TicketRequest(BaseModel):
@@ -32,6 +32,7 @@ class TicketResponse(BaseModel):
     analysis: str = Field(default="", description="分析结果")
     solution: str = Field(default="", description="解决方案")
     processing_time: float = Field(..., description="处理耗时(秒)")
+    similar_request_id: Optional[str] = Field(default=None, description="参考的相似历史工单的请求ID")
     created_at: datetime = Field(default_factory=lambda: datetime.utcnow(), description="创建时间")
     
     @validator('status')
@@ -40,4 +41,38 @@ class TicketResponse(BaseModel):
         allowed_status = ["success", "error", "processing"]
         if v not in allowed_status:
             raise ValueError(f"状态值必须是以下之一: {', '.join(allowed_status)}")
-        return v
\ No newline at end of file
+        return v
+
+class TicketBatchRequest(BaseModel):
+    """批量工单请求模型"""
+    tickets: List[TicketRequest] = Field(..., description="工单列表")
+    max_concurrency: Optional[int] = Field(default=None, ge=1, description="同时处理的工单数，不填使用服务端默认值")
+
+class TicketBatchResponse(BaseModel):
+    """批量工单响应模型"""
+    batch_id: str = Field(..., description="批次ID")
+    results: List[TicketResponse] = Field(default_factory=list, description="各工单的处理结果，顺序与请求一致")
+    total: int = Field(default=0, description="工单总数")
+    succeeded: int = Field(default=0, description="处理成功的工单数")
+    failed: int = Field(default=0, description="处理失败的工单数")
+    shared_tool_calls: int = Field(default=0, description="批次内复用已有结果、未重复执行的工具调用次数")
+    processing_time: float = Field(..., description="批次总耗时(秒)")
+    created_at: datetime = Field(default_factory=lambda: datetime.utcnow(), description="创建时间")
+
+class TicketJobRequest(TicketRequest):
+    """异步工单任务请求模型"""
+    priority: Optional[Literal["urgent", "normal", "low"]] = Field(
+        default=None, description="优先级，不填时根据工单内容判断（含加急等关键词为 urgent，否则 normal）"
+    )
+
+class TicketJobResponse(BaseModel):
+    """异步工单任务状态模型"""
+    request_id: str = Field(..., description="请求ID，用于查询任务状态")
+    status: Literal["queued", "running", "success", "error", "cancelled"] = Field(..., description="任务状态")
+    priority: str = Field(..., description="优先级")
+    queue_depth: int = Field(default=0, description="当前排队中的任务数")
+    submitted_at: datetime = Field(..., description="提交时间")
+    started_at: Optional[datetime] = Field(default=None, description="开始处理时间")
+    finished_at: Optional[datetime] = Field(default=None, description="处理完成时间")
+    result: Optional[TicketResponse] = Field(default=None, description="处理结果，任务成功后返回")
+    error: Optional[str] = Field(default=None, description="错误信息，任务失败时返回")
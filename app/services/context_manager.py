@@ -0,0 +1,153 @@
+import json
+import re
+import threading
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from app.core.config import settings
+from app.core.logging import logger
+
+_CJK_PATTERN = re.compile(r'[　-〿一-鿿＀-￯]')
+# 每条消息在对话格式中的固定开销
+_MESSAGE_OVERHEAD = 4
+
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_requested = False
+
+
+def load_encoding():
+    """
+    加载 tiktoken 编码表并返回，失败时抛出异常
+    首次加载需读取(缓存目录中没有时下载) BPE 文件，耗时可达数秒，由就绪检查在线程中预热
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def _load_encoding_in_background() -> None:
+    try:
+        load_encoding()
+    except Exception as e:
+        logger.warning(f"tiktoken 不可用，token 数改为估算: {str(e)}")
+
+
+def _get_encoding():
+    """
+    返回已加载的编码表；尚未加载时返回 None 并在后台线程中加载，
+    计数不等待加载，调用方(事件循环)不被阻塞，加载完成前按估算计数
+    """
+    global _encoding_requested
+    if _encoding is None and not _encoding_requested:
+        _encoding_requested = True
+        threading.Thread(target=_load_encoding_in_background, name="tiktoken-loader", daemon=True).start()
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """计算文本的 token 数；tiktoken 未加载或不可用时按中文每字 1 个、其他字符每 4 个 1 个估算"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """单条消息的 token 数（内容 + 工具调用参数）"""
+    tokens = _MESSAGE_OVERHEAD + count_tokens(str(message.content))
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        tokens += count_tokens(json.dumps([(c["name"], c["args"]) for c in tool_calls], ensure_ascii=False))
+    return tokens
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """把文本截断到约 max_tokens 个 token，保留开头和结尾，中间注明省略的量"""
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    chars = max(int(len(text) * max_tokens / total), 1)
+    head = int(chars * 0.7)
+    tail = chars - head
+    return (f"{text[:head]}\n...[内容过长，已省略约 {total - max_tokens} tokens]...\n"
+            f"{text[len(text) - tail:] if tail else ''}")
+
+
+class ContextManager:
+    """
+    代理提示词的上下文预算管理
+
+    工具输出（积分明细、日志等）动辄数千 token，且随迭代不断累积。每次调用模型前：
+    1. 超过 TOOL_OUTPUT_TOKEN_LIMIT 的工具输出截断为首尾摘要；
+    2. 总量仍超过 CONTEXT_TOKEN_BUDGET 时，从最早的工具输出开始压缩为简短引用，
+       最近一轮工具调用的输出保持不变。
+    只替换消息内容，不删除消息，AIMessage 的 tool_calls 与 ToolMessage 始终一一对应。
+    工作流状态中保留完整内容，压缩只作用于发送给模型的副本。
+    """
+
+    def __init__(self, budget: int = settings.CONTEXT_TOKEN_BUDGET,
+                 tool_output_limit: int = settings.TOOL_OUTPUT_TOKEN_LIMIT,
+                 reference_tokens: int = 200):
+        self.budget = budget
+        self.tool_output_limit = tool_output_limit
+        self.reference_tokens = reference_tokens
+
+    def compact(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        messages = list(messages)
+        tokens = [message_tokens(m) for m in messages]
+        original_total = sum(tokens)
+
+        for i, message in enumerate(messages):
+            if isinstance(message, ToolMessage) and tokens[i] > self.tool_output_limit + _MESSAGE_OVERHEAD:
+                messages[i] = self._replace(message, truncate_to_tokens(str(message.content), self.tool_output_limit))
+                tokens[i] = message_tokens(messages[i])
+
+        if sum(tokens) > self.budget:
+            for i in self._older_tool_outputs(messages):
+                if sum(tokens) <= self.budget:
+                    break
+                reference = self._reference(messages[i])
+                if reference is None:
+                    continue
+                messages[i] = self._replace(messages[i], reference)
+                tokens[i] = message_tokens(messages[i])
+
+        total = sum(tokens)
+        if total < original_total:
+            logger.debug(f"【上下文】提示词 token 数 {original_total} -> {total}（预算 {self.budget}）")
+        if total > self.budget:
+            logger.warning(f"【上下文】压缩后仍超出预算: {total} > {self.budget}")
+        return messages
+
+    @staticmethod
+    def _older_tool_outputs(messages: List[BaseMessage]) -> List[int]:
+        """最近一次工具调用之前的工具输出下标（从早到晚）"""
+        last_call: Optional[int] = None
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], AIMessage) and messages[i].tool_calls:
+                last_call = i
+                break
+        if last_call is None:
+            last_call = len(messages)
+        return [i for i in range(last_call) if isinstance(messages[i], ToolMessage)]
+
+    def _reference(self, message: ToolMessage) -> Optional[str]:
+        """将较早的工具输出压缩为简短引用；已足够短时返回 None"""
+        content = str(message.content)
+        if count_tokens(content) <= self.reference_tokens * 2:
+            return None
+        head = truncate_to_tokens(content, self.reference_tokens).split("\n...[")[0]
+        return f"[较早的工具输出已压缩] 工具 {message.name} 的输出开头：\n{head}\n...（完整内容已在之前的分析中使用）"
+
+    @staticmethod
+    def _replace(message: ToolMessage, content: str) -> ToolMessage:
+        return message.model_copy(update={"content": content})
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+def canonical_messages(messages: Sequence[BaseMessage]) -> List[Dict[str, Any]]:
+    """
+    提取消息中影响模型输出的部分（类型、名称、内容、工具调用），
+    忽略消息 ID、token 用量等每次运行都不同的元数据
+    """
+    canonical = []
+    for message in messages:
+        item = {"type": message.type, "name": message.name, "content": message.content}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            item["tool_calls"] = [{"name": c["name"], "args": c["args"], "id": c.get("id")} for c in tool_calls]
+        tool_call_id = getattr(message, "tool_call_id", None)
+        if tool_call_id:
+            item["tool_call_id"] = tool_call_id
+        canonical.append(item)
+    return canonical
+
+
+class TieredLLMCache:
+    """
+    大模型响应缓存（temperature=0 时相同输入得到相同输出）
+
+    键为 命名空间(模型、系统提示词、绑定的工具定义) + 规范化后的消息历史 的 SHA-256。
+    第一级为进程内 LRU，第二级为本地 SQLite；两级均按 TTL 过期，SQLite 超过条数上限时
+    淘汰最久未使用的记录。重试或重放工单时直接返回缓存的模型输出。
+    """
+
+    def __init__(self, path: str = settings.LLM_CACHE_PATH,
+                 ttl: float = settings.LLM_CACHE_TTL,
+                 max_memory_items: int = settings.LLM_CACHE_SIZE,
+                 max_entries: int = settings.LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, message TEXT, created_at REAL, accessed_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at)")
+
+    @staticmethod
+    def key(namespace: str, messages: Sequence[BaseMessage]) -> str:
+        payload = json.dumps(canonical_messages(messages), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{namespace}\x1f{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        now = time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and item[1] >= now - self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._load(item[0])
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT message, created_at FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            return self._load(row[0])
+
+    def put(self, key: str, message: BaseMessage) -> None:
+        now = time()
+        data = json.dumps(message_to_dict(message), ensure_ascii=False, default=str)
+        with self._lock:
+            self._remember(key, data, now)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, message, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, data, now, now)
+                )
+                self._evict(now)
+
+    async def aget(self, key: str) -> Optional[BaseMessage]:
+        """get 的异步版本，SQLite 读写在线程中执行，不阻塞事件循环"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, message: BaseMessage) -> None:
+        """put 的异步版本"""
+        await asyncio.to_thread(self.put, key, message)
+
+    def _remember(self, key: str, data: str, created_at: float) -> None:
+        """写入内存 LRU（调用方需持有锁）"""
+        self._memory[key] = (data, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        """删除过期记录，超过条数上限时淘汰最久未使用的记录（调用方需持有锁）"""
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    @staticmethod
+    def _load(data: str) -> BaseMessage:
+        return messages_from_dict([json.loads(data)])[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_llm_cache: Optional[TieredLLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[TieredLLMCache]:
+    """获取进程内共享的大模型响应缓存；未启用时返回 None"""
+    global _llm_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = TieredLLMCache()
+    return _llm_cache
+
+
+def close_llm_cache() -> None:
+    """关闭共享的大模型响应缓存（应用关闭时调用）"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is not None:
+            _llm_cache.close()
+            _llm_cache = None
@@ -0,0 +1,206 @@
+import asyncio
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# 应用关闭时需要释放的共享资源：(模块, 关闭函数)
+_CLOSERS = [
+    ("app.tools.MjLogs.mj_log_client", "close_mjlog_client"),
+    ("app.tools.MjLogs.log_index", "close_log_index"),
+    ("app.tools.PointsDetails.points_store", "close_points_store"),
+    ("app.services.llm_cache", "close_llm_cache"),
+    ("app.tools.sql_db_query_tool", "close_sql_query_tool"),
+]
+
+
+class DependencyStatus:
+    """一个依赖的预热状态"""
+
+    __slots__ = ("name", "required", "ready", "latency_ms", "error", "checked_at")
+
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.ready = False
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "required": self.required,
+            "latency_ms": self.latency_ms,
+            "error": self.error,
+            "checked_at": self.checked_at,
+        }
+
+
+class Readiness:
+    """
+    依赖预热与就绪状态
+
+    应用启动时依次注册各依赖的预热函数(同步函数在线程中执行，也可以是协程函数)，warm_up 并发执行全部预热，
+    记录每个依赖是否可用及耗时。必需的依赖全部预热成功后才视为就绪，/ready 据此返回 200 或 503，
+    负载均衡只把流量转发给已预热的实例。run 在首次预热后按指数退避重试失败的依赖，
+    启动时短暂不可用的依赖恢复后实例即可变为就绪，无需重启进程。
+    同步预热超时后线程无法中止，重试时若上次的线程仍在执行，继续等待它而不再启动新线程。
+    """
+
+    def __init__(self, timeout: float = settings.READINESS_CHECK_TIMEOUT,
+                 optional: str = settings.READINESS_OPTIONAL,
+                 retry_interval: float = settings.READINESS_RETRY_INTERVAL,
+                 max_retry_interval: float = settings.READINESS_RETRY_MAX_INTERVAL):
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.optional = {name.strip() for name in optional.split(",") if name.strip()}
+        self.statuses: Dict[str, DependencyStatus] = {}
+        self.warmed_up = False
+        self._checks: Dict[str, Callable[[], Any]] = {}
+        self._threads: Dict[str, asyncio.Future] = {}  # 各同步预热最近一次在线程中的执行
+
+    def register(self, name: str, check: Callable[[], Any]) -> None:
+        self._checks[name] = check
+        self.statuses[name] = DependencyStatus(name, required=name not in self.optional)
+
+    async def check(self, name: str) -> DependencyStatus:
+        """执行一个依赖的预热，失败或超时时记录错误，不抛出异常"""
+        check = self._checks[name]
+        status = self.statuses[name]
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(check):
+                await asyncio.wait_for(check(), self.timeout)
+            else:
+                await asyncio.wait_for(asyncio.shield(self._thread(name)), self.timeout)
+            status.ready, status.error = True, None
+        except asyncio.TimeoutError:
+            status.ready, status.error = False, f"预热超时({self.timeout}秒)"
+        except Exception as e:
+            status.ready, status.error = False, str(e)
+        status.latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        status.checked_at = datetime.now()
+        if status.ready:
+            logger.info(f"依赖 {name} 预热完成，耗时 {status.latency_ms}ms")
+        else:
+            logger.warning(f"依赖 {name} 预热失败: {status.error}")
+        return status
+
+    def _thread(self, name: str) -> asyncio.Future:
+        """在线程中执行同步预热；上次超时的执行尚未结束时返回它，不重复启动"""
+        future = self._threads.get(name)
+        if future is None or future.done():
+            future = asyncio.ensure_future(asyncio.to_thread(self._checks[name]))
+            # 超时后无人等待的执行可能以异常结束，取走异常避免事件循环报告未处理
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._threads[name] = future
+        return future
+
+    async def warm_up(self) -> None:
+        """并发预热全部已注册的依赖"""
+        await asyncio.gather(*(self.check(name) for name in self._checks))
+        self.warmed_up = True
+        logger.info(f"依赖预热结束，{'已就绪' if self.ready else '未就绪'}")
+
+    async def run(self) -> None:
+        """预热全部依赖，之后按指数退避重试失败的依赖，直到全部可用（应用关闭时取消）"""
+        await self.warm_up()
+        interval = self.retry_interval
+        while True:
+            failed = [name for name, status in self.statuses.items() if not status.ready]
+            if not failed:
+                return
+            await asyncio.sleep(interval)
+            await asyncio.gather(*(self.check(name) for name in failed))
+            if all(self.statuses[name].ready for name in failed):
+                logger.info(f"依赖 {', '.join(failed)} 重试预热成功，{'已就绪' if self.ready else '未就绪'}")
+            interval = min(interval * 2, self.max_retry_interval)
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and all(s.ready for s in self.statuses.values() if s.required)
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.ready:
+            status = "ready"
+        elif not self.warmed_up:
+            status = "warming"
+        else:
+            status = "not_ready"
+        return {
+            "status": status,
+            "dependencies": {name: s.to_dict() for name, s in self.statuses.items()},
+            "timestamp": datetime.now(),
+        }
+
+
+readiness = Readiness()
+
+
+async def warm_up_llm(llm) -> None:
+    """工作流使用的大模型客户端：启用预热请求时发送一次最短的调用，建立连接"""
+    if settings.READINESS_WARMUP_REQUESTS:
+        await llm.ainvoke("ping", max_tokens=1)
+
+
+def warm_up_database() -> None:
+    """建立用户库连接池并读取表结构快照，启用预热请求时执行一次 SELECT 1"""
+    from sqlalchemy import text
+
+    from app.tools.sql_db_query_tool import get_sql_query_tool
+
+    sql_tool = get_sql_query_tool()
+    if settings.READINESS_WARMUP_REQUESTS:
+        with sql_tool.db._engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+
+def open_local_stores() -> None:
+    """打开本地 SQLite 缓存/索引（大模型响应缓存、日志索引、积分明细存储）"""
+    from app.services.llm_cache import get_llm_cache
+    from app.tools.MjLogs.log_index import get_log_index
+    from app.tools.PointsDetails.points_store import get_points_store
+
+    get_llm_cache()
+    get_log_index()
+    get_points_store()
+
+
+def warm_up_tokenizer() -> None:
+    """加载上下文管理计数用的 tiktoken 编码表，加载完成前 token 数按估算"""
+    from app.services.context_manager import load_encoding
+
+    load_encoding()
+
+
+async def warm_up_mjlog() -> None:
+    """创建明觉日志连接池，启用预热请求时查询一条日志，建立 TLS 连接"""
+    from app.tools.MjLogs.mj_log_query_tool import aquery_system_logs
+
+    if settings.READINESS_WARMUP_REQUESTS:
+        page = await aquery_system_logs("readiness", page_num=1, page_size=1)
+        if not page.ok:
+            raise RuntimeError(page.error)
+    else:
+        from app.tools.MjLogs.mj_log_client import get_mjlog_client
+        get_mjlog_client().async_client
+
+
+async def close_resources() -> None:
+    """应用关闭时释放共享的连接池和本地存储"""
+    for module_name, closer in _CLOSERS:
+        # 模块未导入或仍在导入中(预热线程尚未结束)时，资源尚未创建
+        close = getattr(sys.modules.get(module_name), closer, None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.warning(f"关闭 {module_name} 的资源失败: {str(e)}")
@@ -0,0 +1,130 @@
+import hashlib
+import re
+from collections import deque
+from time import time
+from typing import Deque, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.models.ticket_dto import TicketRequest, TicketResponse
+from app.tools.identifier_extractor import identifier_extractor
+
+# 工单中因人而异的内容：姓名、长数字(卡号、证件号、手机号、用户ID等)
+_NAME_PATTERN = re.compile(r'((?:联系人)?姓名[：:]\s*)\S+')
+_NUMBER_PATTERN = re.compile(r'\d{6,}[0-9Xx]?')
+# MinHash 使用的大素数（< 2^31，保证 a * h 不超出 uint64）
+_MERSENNE_PRIME = (1 << 31) - 1
+_SHINGLE_SIZE = 3
+
+
+class SimilarTicket(NamedTuple):
+    """相似的历史工单"""
+    request_id: str
+    similarity: float
+    analysis: str
+    solution: str
+    processed_at: float
+
+
+class _Entry(NamedTuple):
+    digest: str
+    signature: np.ndarray
+    response: TicketResponse
+    processed_at: float
+
+
+class TicketDeduplicator:
+    """
+    近重复工单检测
+
+    同一事件引发的工单往往只有客户姓名、卡号、手机号不同。对工单内容脱敏后按字符 n-gram 计算
+    MinHash 签名，在时间窗口内查找相似度达到阈值的已处理工单，将其分析结果和解决方案作为上下文
+    提供给工作流，减少大模型的推理轮数；涉及具体用户的工具查询仍按当前工单重新执行。
+    """
+
+    def __init__(self, threshold: float = settings.DEDUP_THRESHOLD,
+                 window: float = settings.DEDUP_WINDOW,
+                 max_entries: int = settings.DEDUP_MAX_ENTRIES,
+                 num_perm: int = 64):
+        self.threshold = threshold
+        self.window = window
+        self.hits = 0
+        self._entries: Deque[_Entry] = deque(maxlen=max_entries)
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def mask(text: str) -> str:
+        """脱敏：去掉用户标识、姓名和长数字，合并空白"""
+        text = identifier_extractor.mask(text, "<id>")
+        text = _NAME_PATTERN.sub(r'\1<name>', text)
+        text = _NUMBER_PATTERN.sub("<num>", text)
+        return " ".join(text.split())
+
+    def signature(self, masked: str) -> np.ndarray:
+        """计算 MinHash 签名"""
+        shingles = {masked[i:i + _SHINGLE_SIZE] for i in range(max(len(masked) - _SHINGLE_SIZE + 1, 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64, count=len(shingles)
+        ) % _MERSENNE_PRIME
+        return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME).min(axis=0)
+
+    def find(self, ticket: TicketRequest) -> Optional[SimilarTicket]:
+        """查找时间窗口内最相似的已处理工单，未达到阈值时返回 None"""
+        self._expire()
+        if not self._entries:
+            return None
+        masked = self.mask(ticket.format_ticket_content())
+        digest = hashlib.sha256(masked.encode("utf-8")).hexdigest()
+        signature = self.signature(masked)
+
+        best, best_similarity = None, 0.0
+        for entry in self._entries:
+            similarity = 1.0 if entry.digest == digest else float(np.mean(entry.signature == signature))
+            if similarity > best_similarity:
+                best, best_similarity = entry, similarity
+        if best is None or best_similarity < self.threshold:
+            return None
+
+        self.hits += 1
+        logger.info(f"【相似工单】匹配到工单 {best.response.request_id}，相似度 {best_similarity:.2f}")
+        return SimilarTicket(
+            request_id=best.response.request_id,
+            similarity=best_similarity,
+            analysis=best.response.analysis,
+            solution=best.response.solution,
+            processed_at=best.processed_at
+        )
+
+    def remember(self, ticket: TicketRequest, response: TicketResponse) -> None:
+        """记录处理成功且有结论的工单"""
+        if response.status != "success" or not (response.analysis or response.solution):
+            return
+        masked = self.mask(ticket.format_ticket_content())
+        digest = hashlib.sha256(masked.encode("utf-8")).hexdigest()
+        self._entries.append(_Entry(digest, self.signature(masked), response, time()))
+
+    def _expire(self) -> None:
+        expire_before = time() - self.window
+        while self._entries and self._entries[0].processed_at < expire_before:
+            self._entries.popleft()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def build_seed_message(similar: SimilarTicket) -> str:
+    """把相似工单的结论整理为提供给代理的参考信息"""
+    parts: List[str] = [
+        f"参考信息：与本工单高度相似（相似度 {similar.similarity:.2f}）的工单 {similar.request_id} 已处理完成。"
+    ]
+    if similar.analysis:
+        parts.append(f"历史分析结果：\n{similar.analysis}")
+    if similar.solution:
+        parts.append(f"历史解决方案：\n{similar.solution}")
+    parts.append("两张工单的用户不同，请仍调用工具核实本工单用户的信息；核实结果与历史结论一致时可直接沿用，无需重复分析。")
+    return "\n\n".join(parts)
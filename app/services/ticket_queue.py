@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import uuid
+from datetime import datetime
+from time import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import logger, log_exception
+from app.models.ticket_dto import TicketRequest, TicketResponse, TicketJobResponse
+
+if TYPE_CHECKING:
+    from app.services.ticket_workflow import TicketWorkflowService
+
+# 优先级类别，数值越小越先处理
+PRIORITY_CLASSES = {"urgent": 0, "normal": 1, "low": 2}
+
+
+class TicketJob:
+    """队列中的一个工单任务"""
+
+    def __init__(self, request_id: str, ticket: TicketRequest, priority: str):
+        self.request_id = request_id
+        self.ticket = ticket
+        self.priority = priority
+        self.status = "queued"
+        self.submitted_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.finished_ts: Optional[float] = None
+        self.result: Optional[TicketResponse] = None
+        self.error: Optional[str] = None
+
+    def cancel(self, reason: str) -> None:
+        """标记为已取消（服务关闭时未完成的任务）"""
+        self.status = "cancelled"
+        self.error = reason
+        self.finished_at = datetime.utcnow()
+        self.finished_ts = time()
+        self.ticket = None
+
+    def to_response(self, queue_depth: int) -> TicketJobResponse:
+        return TicketJobResponse(
+            request_id=self.request_id,
+            status=self.status,
+            priority=self.priority,
+            queue_depth=queue_depth,
+            submitted_at=self.submitted_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            result=self.result,
+            error=self.error
+        )
+
+
+class TicketQueue:
+    """
+    工单异步任务队列
+
+    提交后立即返回 request_id，由固定数量的 worker 按优先级从队列中取出工单执行工作流，
+    同一优先级内先进先出。队列满时拒绝提交（由接口返回 429），不无限堆积。
+    已完成任务的结果保留 JOB_RESULT_TTL 秒供查询。
+    """
+
+    def __init__(self, workflow_service: "TicketWorkflowService",
+                 workers: int = settings.JOB_WORKERS,
+                 max_size: int = settings.JOB_QUEUE_MAX_SIZE,
+                 result_ttl: float = settings.JOB_RESULT_TTL):
+        self.workflow_service = workflow_service
+        self.workers = workers
+        self.max_size = max_size
+        self.result_ttl = result_ttl
+        self.urgent_keywords = [k.strip() for k in settings.JOB_URGENT_KEYWORDS.split(",") if k.strip()]
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._jobs: Dict[str, TicketJob] = {}
+        self._sequence = itertools.count()
+        self._worker_tasks: List[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """排队中的任务数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """启动 worker（在应用启动时调用，队列需在事件循环中创建）"""
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_size)
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"工单任务队列已启动: {self.workers} 个 worker，容量 {self.max_size}")
+
+    async def stop(self) -> None:
+        """停止 worker：处理中和排队中的任务标记为已取消，之后查询任务状态不会一直停留在 running/queued"""
+        running = [job for job in self._jobs.values() if job.status == "running"]
+        for job in running:
+            job.cancel("服务关闭，处理中的任务已取消")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        dropped = 0
+        while self._queue is not None and not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            job.cancel("服务关闭，排队中的任务未处理")
+            self._queue.task_done()
+            dropped += 1
+        logger.info(f"工单任务队列已停止，取消 {len(running)} 个处理中的任务，丢弃 {dropped} 个排队任务")
+
+    def classify(self, ticket: TicketRequest) -> str:
+        """根据工单内容判断优先级：包含加急关键词的为 urgent"""
+        content = ticket.format_ticket_content()
+        if any(keyword in content for keyword in self.urgent_keywords):
+            return "urgent"
+        return "normal"
+
+    def submit(self, ticket: TicketRequest, priority: Optional[str] = None) -> TicketJob:
+        """
+        提交工单任务
+
+        Raises:
+            RuntimeError: 队列未启动
+            asyncio.QueueFull: 队列已满
+        """
+        if self._queue is None:
+            raise RuntimeError("工单任务队列未启动")
+        self._purge_expired()
+        priority = priority or self.classify(ticket)
+        job = TicketJob(str(uuid.uuid4()), ticket, priority)
+        self._queue.put_nowait((PRIORITY_CLASSES[priority], next(self._sequence), job))
+        self._jobs[job.request_id] = job
+        logger.info(f"【排队】工单 {job.request_id}，优先级 {priority}，队列深度 {self.depth}")
+        return job
+
+    def get(self, request_id: str) -> Optional[TicketJob]:
+        self._purge_expired()
+        return self._jobs.get(request_id)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            logger.debug(f"worker {index} 开始处理工单 {job.request_id}")
+            try:
+                job.result = await self.workflow_service.process_ticket(job.ticket, job.request_id)
+                job.status = "success"
+            except asyncio.CancelledError:
+                if job.status == "running":
+                    job.cancel("任务已取消")
+                raise
+            except Exception as e:
+                log_exception(logger, e, f"【错误】队列工单 {job.request_id} 处理失败")
+                job.status = "error"
+                job.error = str(e)
+            finally:
+                if job.status != "cancelled":
+                    job.finished_at = datetime.utcnow()
+                    job.finished_ts = time()
+                    job.ticket = None  # 处理完成后不再需要工单内容
+                self._queue.task_done()
+
+    def _purge_expired(self) -> None:
+        """清理超过保留时间的已完成任务"""
+        expire_before = time() - self.result_ttl
+        expired = [request_id for request_id, job in self._jobs.items()
+                   if job.finished_ts is not None and job.finished_ts < expire_before]
+        for request_id in expired:
+            del self._jobs[request_id]
@@ -1,23 +1,56 @@
+import asyncio
 import functools
+import hashlib
+import json
+import operator
 import uuid
+from contextvars import ContextVar
 from time import time
-from typing import Dict, Any, Generator, List, TypedDict, Literal
-import re
+from typing import Annotated, AsyncIterator, Dict, Any, List, Optional, Tuple, TypedDict, Literal
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langgraph.graph import StateGraph, END, START
 
 from app.core.config import settings
 from app.core.logging import logger, log_exception
-from app.models.ticket_dto import TicketRequest, TicketResponse
-from app.tools.tools import Tools
+from app.models.ticket_dto import TicketRequest, TicketResponse, TicketBatchRequest, TicketBatchResponse
+from app.services.context_manager import ContextManager
+from app.services.llm_cache import TieredLLMCache, get_llm_cache
+from app.services.ticket_dedup import SimilarTicket, TicketDeduplicator, build_seed_message
+from app.tools.identifier_extractor import extract_sql_first_id
+from app.tools.tools import Tools, tool_calling_context
+
+# 工作流中的节点名称
+WORKFLOW_NODES = ("analysis_agent", "resolution_agent", "call_tool")
+# 流式事件中工具输出的最大预览长度
+STREAM_TOOL_OUTPUT_PREVIEW = 2000
+# 批量处理时可在工单间共享结果的工具：结果只取决于调用参数。
+# query_system_logs 会从当前工单的上下文补充用户ID，参数相同结果也可能不同，不参与共享
+BATCH_SHARED_TOOLS = {"query_user_info", "analyze_ticket_subject", "query_points_details"}
+
+
+class ToolCallMemo:
+    """批次内的工具调用结果共享：相同工具、相同参数的调用只执行一次，其余工单等待并复用其结果"""
+
+    def __init__(self):
+        self.tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+
+    @staticmethod
+    def key(tool_name: str, tool_args: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(tool_args, sort_keys=True, ensure_ascii=False, default=str)
+
+
+# 当前批次的工具调用共享表，单个工单处理时为 None
+batch_tool_memo: ContextVar[Optional[ToolCallMemo]] = ContextVar("batch_tool_memo", default=None)
 
 
 class WorkflowState(TypedDict):
     """工作流状态类型定义"""
-    messages: List[BaseMessage]
+    messages: Annotated[List[BaseMessage], operator.add]
     context: Dict[str, Any]
     sender: str
 
@@ -35,14 +68,30 @@ class TicketWorkflowService:
             streaming=True
         )
         self.tools = Tools.get_all_tools()
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
+        self.context_manager = ContextManager() if settings.CONTEXT_MANAGER_ENABLED else None
         self.graph = self.create_ticket_workflow()
+        self.deduplicator = TicketDeduplicator() if settings.DEDUP_ENABLED else None
 
     @staticmethod
-    def agent_node(state, agent, name):
+    async def agent_node(state, agent, name, cache_namespace=None, context_manager=None):
         """
         调用指定的代理，并处理其返回的消息。
+
+        发送给模型的消息先经 context_manager 按 token 预算压缩（状态中的消息不变）；
+        启用响应缓存时，相同代理、相同消息历史的调用直接返回缓存的模型输出。
         """
-        result = agent.invoke(state)
+        if context_manager is not None:
+            state = {**state, "messages": context_manager.compact(state["messages"])}
+        cache = get_llm_cache() if cache_namespace else None
+        cache_key = TieredLLMCache.key(cache_namespace, state["messages"]) if cache else None
+        result = await cache.aget(cache_key) if cache else None
+        if result is not None:
+            logger.debug(f"【缓存】{name} 命中模型响应缓存")
+        else:
+            result = await agent.ainvoke(state)
+            if cache and isinstance(result, AIMessage) and (result.content or result.tool_calls):
+                await cache.aput(cache_key, result)
         if isinstance(result, ToolMessage):
             pass
         else:
@@ -70,17 +119,28 @@ class TicketWorkflowService:
         )
         return prompt | self.llm.bind_tools(self.tools)
 
+    def _cache_namespace(self, system_message: str) -> str:
+        """响应缓存的命名空间：模型、系统提示词和绑定的工具定义，任一变化都不会命中旧缓存"""
+        tool_schemas = [convert_to_openai_tool(tool) for tool in self.tools]
+        payload = json.dumps([settings.MODEL, system_message, tool_schemas],
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def create_ticket_workflow(self) -> StateGraph:
         """创建工作流图"""
         # 创建分析和解决方案代理
-        analysis_agent = self._create_agent(
-            "分析工单内容，确定问题所属系统和类型，并调用相应工具获取信息。"
+        analysis_message = "分析工单内容，确定问题所属系统和类型，并调用相应工具获取信息。"
+        resolution_message = "结合工单问题和工具返回的信息，分析问题原因并提供解决方案。"
+        analysis_agent = self._create_agent(analysis_message)
+        resolution_agent = self._create_agent(resolution_message)
+        analysis_node = functools.partial(
+            self.agent_node, agent=analysis_agent, name="analysis_agent",
+            cache_namespace=self._cache_namespace(analysis_message), context_manager=self.context_manager
         )
-        resolution_agent = self._create_agent(
-            "结合工单问题和工具返回的信息，分析问题原因并提供解决方案。"
+        resolution_node = functools.partial(
+            self.agent_node, agent=resolution_agent, name="resolution_agent",
+            cache_namespace=self._cache_namespace(resolution_message), context_manager=self.context_manager
         )
-        analysis_node = functools.partial(self.agent_node, agent=analysis_agent, name="analysis_agent")
-        resolution_node = functools.partial(self.agent_node, agent=resolution_agent, name="resolution_agent")
         # 创建工作流图
         workflow = StateGraph(state_schema=WorkflowState)
 
@@ -106,63 +166,87 @@ class TicketWorkflowService:
 
         return workflow.compile()
 
-    def _tool_node_with_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def _tool_node_with_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """处理工具调用"""
         try:
             logger.debug(f"工具节点状态键值: {list(state.keys())}")
 
-            # 为工具添加上下文
-            for tool in self.tools:
-                setattr(tool, '_calling_context', state)
+            # 为工具添加上下文（ContextVar 随当前任务隔离，并发工单之间不会串用）
+            tool_calling_context.set(state)
 
             # 获取最后一条消息
             messages = state.get("messages", [])
             if not messages:
                 logger.warning("状态中未找到消息")
-                return state
+                return {"messages": []}
 
             last_message = messages[-1]
 
             # 检查是否有工具调用
             if not hasattr(last_message, 'tool_calls') or not last_message.tool_calls:
                 logger.warning("最后一条消息中未找到工具调用")
-                return state
-
-            # 执行工具调用
-            tool_calls = last_message.tool_calls
-            tool_results = []
+                return {"messages": []}
 
-            for tool_call in tool_calls:
-                tool_name = tool_call.get("name")
-                tool_args = tool_call.get("args", {})
-
-                # 查找对应的工具
-                tool = next((t for t in self.tools if t.name == tool_name), None)
-                if not tool:
-                    logger.warning(f"未找到工具: {tool_name}")
-                    continue
-
-                # 调用工具
-                try:
-                    result = tool.invoke(tool_args)
-                    tool_results.append({
-                        "name": tool_name,
-                        "content": result
-                    })
-                except Exception as e:
-                    logger.error(f"工具 {tool_name} 调用失败: {str(e)}")
-                    tool_results.append({
-                        "name": tool_name,
-                        "content": f"错误: {str(e)}"
-                    })
+            # 并发执行工具调用：并发数受 TOOL_MAX_CONCURRENCY 限制，gather 保证结果顺序与调用顺序一致
+            semaphore = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY)
+            tool_messages = await asyncio.gather(
+                *(self._invoke_tool(tool_call, semaphore) for tool_call in last_message.tool_calls)
+            )
 
-            # 更新状态
-            state["tool_results"] = tool_results
-            return state
+            # 更新状态（messages 按 operator.add 追加）
+            return {"messages": list(tool_messages)}
 
         except Exception as e:
             logger.error(f"工具节点执行错误: {str(e)}")
-            return state
+            return {"messages": []}
+
+    async def _invoke_tool(self, tool_call: Dict[str, Any], semaphore: asyncio.Semaphore) -> ToolMessage:
+        """在并发限制和超时限制下执行单个工具调用，失败时返回错误信息而不是抛出异常"""
+        tool_name = tool_call.get("name")
+        tool_args = tool_call.get("args", {})
+
+        memo = batch_tool_memo.get()
+        if memo is None or tool_name not in BATCH_SHARED_TOOLS:
+            content, _ = await self._run_tool(tool_name, tool_args, semaphore)
+        else:
+            key = ToolCallMemo.key(tool_name, tool_args)
+            task = memo.tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._run_tool(tool_name, tool_args, semaphore))
+                memo.tasks[key] = task
+            else:
+                memo.hits += 1
+                logger.debug(f"工具 {tool_name} 复用批次内相同参数的调用结果")
+            # shield 避免某个工单被取消时连带取消其他工单正在等待的调用
+            content, failed = await asyncio.shield(task)
+            # 失败的结果不共享，后续工单重新调用
+            if failed and memo.tasks.get(key) is task:
+                del memo.tasks[key]
+
+        return ToolMessage(content=str(content), name=tool_name, tool_call_id=tool_call.get("id"))
+
+    async def _run_tool(self, tool_name: str, tool_args: Dict[str, Any],
+                        semaphore: asyncio.Semaphore) -> Tuple[Any, bool]:
+        """执行工具，返回 (结果, 是否失败)"""
+        # 查找对应的工具
+        tool = self.tools_by_name.get(tool_name)
+        if not tool:
+            logger.warning(f"未找到工具: {tool_name}")
+            return f"错误: 未找到工具 {tool_name}", True
+
+        timeout = settings.TOOL_TIMEOUTS.get(tool_name, settings.TOOL_TIMEOUT)
+        async with semaphore:
+            started = time()
+            try:
+                content = await asyncio.wait_for(tool.ainvoke(tool_args), timeout=timeout)
+                logger.debug(f"工具 {tool_name} 调用完成，耗时: {time() - started:.2f}秒")
+                return content, False
+            except asyncio.TimeoutError:
+                logger.error(f"工具 {tool_name} 调用超时({timeout}秒)")
+                return f"错误: 工具调用超时({timeout}秒)", True
+            except Exception as e:
+                logger.error(f"工具 {tool_name} 调用失败: {str(e)}")
+                return f"错误: {str(e)}", True
 
     def _router(self, state: Dict[str, Any]) -> Literal["call_tool", "resolution_agent", "__end__"]:
         """路由决策"""
@@ -187,11 +271,11 @@ class TicketWorkflowService:
         # 处理用户信息
         if isinstance(last_message, ToolMessage) and last_message.name == "query_user_info":
             try:
-                user_id_match = re.search(r'\(\s*(\d+)\s*,', last_message.content)
-                if user_id_match:
+                user_id = extract_sql_first_id(last_message.content)
+                if user_id:
                     if "context" not in state:
                         state["context"] = {}
-                    state["context"]["user_id"] = user_id_match.group(1)
+                    state["context"]["user_id"] = user_id
                     logger.debug(f"【用户】成功提取用户ID: {state['context']['user_id']}")
             except Exception as e:
                 logger.error(f"【错误】提取用户ID失败: {str(e)}")
@@ -208,73 +292,219 @@ class TicketWorkflowService:
         logger.debug(f"【路由】转向解决方案代理，消息类型: {type(last_message).__name__}")
         return "resolution_agent"
 
-    async def process_ticket(self, ticket: TicketRequest) -> TicketResponse:
+    @staticmethod
+    def _initial_state(ticket: TicketRequest, request_id: str,
+                       similar: Optional[SimilarTicket] = None) -> Dict[str, Any]:
+        """构建工作流初始状态，有相似的历史工单时附上其结论作为参考"""
+        messages = [HumanMessage(content=ticket.format_ticket_content())]
+        if similar is not None:
+            messages.append(HumanMessage(content=build_seed_message(similar)))
+        return {
+            "messages": messages,
+            "context": {
+                "request_id": request_id
+            }
+        }
+
+    def _find_similar(self, ticket: TicketRequest) -> Optional[SimilarTicket]:
+        if self.deduplicator is None:
+            return None
+        try:
+            return self.deduplicator.find(ticket)
+        except Exception as e:
+            logger.error(f"相似工单检测失败: {str(e)}")
+            return None
+
+    def _remember(self, ticket: TicketRequest, response: TicketResponse) -> None:
+        if self.deduplicator is not None:
+            self.deduplicator.remember(ticket, response)
+
+    @staticmethod
+    def _build_response(request_id: str, node_outputs: List[Dict[str, Any]], start_time: float) -> TicketResponse:
+        """从各节点的输出中提取分析结果和解决方案，构建响应"""
+        logger.debug(f"【处理】共 {len(node_outputs)} 个事件")
+        analysis = ""
+        solution = ""
+        messages = []
+
+        for output in node_outputs:
+            if output.get("sender") and isinstance(output.get("messages", [None])[0], AIMessage):
+                msg_content = output["messages"][0].content
+                if "FINAL ANSWER" in msg_content:
+                    logger.debug("【结果】找到最终答案")
+                    solution = msg_content.replace("FINAL ANSWER", "").strip()
+                elif output.get("sender") == "analysis_agent":
+                    logger.debug("【结果】找到分析内容")
+                    analysis = msg_content
+                messages.append({
+                    "role": output["sender"],
+                    "content": msg_content
+                })
+
+        processing_time = time() - start_time
+        logger.debug(f"【完成】处理耗时: {processing_time:.2f}秒")
+
+        return TicketResponse(
+            request_id=request_id,
+            status="success",
+            messages=messages,
+            analysis=analysis,
+            solution=solution,
+            processing_time=processing_time
+        )
+
+    async def process_ticket(self, ticket: TicketRequest, request_id: Optional[str] = None) -> TicketResponse:
         """
         处理工单请求
 
         Args:
             ticket: TicketRequest对象，包含工单信息
+            request_id: 请求ID，不传时自动生成
 
         Returns:
             TicketResponse对象，包含处理结果
         """
-        request_id = str(uuid.uuid4())
+        request_id = request_id or str(uuid.uuid4())
         start_time = time()
 
         try:
             logger.info(f"【开始】处理工单 {request_id}")
             logger.debug(f"【工单】内容: {ticket.format_ticket_content()}")
 
-            # 运行工作流
-            events = []
-            logger.debug("【工作流】开始执行")
-            for event in self.graph.stream({
-                "messages": [
-                    HumanMessage(content=ticket.format_ticket_content())
-                ],
-                "context": {
-                    "request_id": request_id
-                }
-            }, {"recursion_limit": 20}):
-                logger.debug(f"【事件】{event.get('sender', 'unknown')} - {type(event).__name__}")
-                events.append(event)
-
-            # 提取结果
-            logger.debug(f"【处理】共 {len(events)} 个事件")
-            analysis = ""
-            solution = ""
-            messages = []
-
-            for event in events:
-                if isinstance(event.get("messages", [None])[0], AIMessage):
-                    msg_content = event["messages"][0].content
-                    if "FINAL ANSWER" in msg_content:
-                        logger.debug("【结果】找到最终答案")
-                        solution = msg_content.replace("FINAL ANSWER", "").strip()
-                    elif event.get("sender") == "analysis_agent":
-                        logger.debug("【结果】找到分析内容")
-                        analysis = msg_content
-                    messages.append({
-                        "role": event["sender"],
-                        "content": msg_content
-                    })
-
-            processing_time = time() - start_time
-            logger.debug(f"【完成】处理耗时: {processing_time:.2f}秒")
-
-            # 构建响应
-            response = TicketResponse(
-                request_id=request_id,
-                status="success",
-                messages=messages,
-                analysis=analysis,
-                solution=solution,
-                processing_time=processing_time
-            )
+            similar = self._find_similar(ticket)
 
-            logger.info(f"【完成】工单 {request_id} 处理完成，耗时: {processing_time:.2f}秒")
+            # 运行工作流，astream 每个事件形如 {节点名: 节点输出}
+            node_outputs = []
+            logger.debug("【工作流】开始执行")
+            initial_state = self._initial_state(ticket, request_id, similar)
+            async for event in self.graph.astream(initial_state, {"recursion_limit": 20}):
+                for node_name, output in event.items():
+                    logger.debug(f"【事件】{node_name} - {type(output).__name__}")
+                    if isinstance(output, dict):
+                        node_outputs.append(output)
+
+            response = self._build_response(request_id, node_outputs, start_time)
+            if similar is not None:
+                response.similar_request_id = similar.request_id
+            self._remember(ticket, response)
+            logger.info(f"【完成】工单 {request_id} 处理完成，耗时: {response.processing_time:.2f}秒")
             return response
 
         except Exception as e:
             log_exception(logger, e, f"【错误】处理工单 {request_id} 失败")
             raise
+
+    async def process_batch(self, batch: TicketBatchRequest) -> TicketBatchResponse:
+        """
+        批量处理工单
+
+        工单并发处理，并发数取请求中的 max_concurrency 或 BATCH_MAX_CONCURRENCY；
+        批次内相同参数的工具调用（同一用户、同一活动等）只执行一次。
+        单个工单失败不影响其他工单，其结果的 status 为 error。
+
+        Args:
+            batch: TicketBatchRequest对象，包含工单列表
+
+        Returns:
+            TicketBatchResponse对象，results 与请求中的工单一一对应
+        """
+        batch_id = str(uuid.uuid4())
+        start_time = time()
+        concurrency = batch.max_concurrency or settings.BATCH_MAX_CONCURRENCY
+        semaphore = asyncio.Semaphore(concurrency)
+        memo = ToolCallMemo()
+        # 在创建子任务前设置，各工单的任务复制当前上下文，共享同一个 memo
+        token = batch_tool_memo.set(memo)
+        logger.info(f"【开始】批次 {batch_id}，共 {len(batch.tickets)} 个工单，并发数 {concurrency}")
+
+        async def run(ticket: TicketRequest) -> TicketResponse:
+            async with semaphore:
+                request_id = str(uuid.uuid4())
+                ticket_start = time()
+                try:
+                    return await self.process_ticket(ticket, request_id)
+                except Exception as e:
+                    return TicketResponse(
+                        request_id=request_id,
+                        status="error",
+                        messages=[{"role": "error", "content": str(e)}],
+                        processing_time=time() - ticket_start
+                    )
+
+        try:
+            results = await asyncio.gather(*(run(ticket) for ticket in batch.tickets))
+        finally:
+            batch_tool_memo.reset(token)
+
+        failed = sum(1 for result in results if result.status == "error")
+        response = TicketBatchResponse(
+            batch_id=batch_id,
+            results=results,
+            total=len(results),
+            succeeded=len(results) - failed,
+            failed=failed,
+            shared_tool_calls=memo.hits,
+            processing_time=time() - start_time
+        )
+        logger.info(f"【完成】批次 {batch_id} 处理完成，成功 {response.succeeded}，失败 {failed}，"
+                    f"复用工具调用 {memo.hits} 次，耗时: {response.processing_time:.2f}秒")
+        return response
+
+    async def stream_ticket(self, ticket: TicketRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        以事件流的形式处理工单，边执行边产出进度
+
+        依次产出 start、node_start/node_end（节点切换）、tool_start/tool_end（工具调用）、
+        token（LLM 增量输出）事件，最后产出包含完整 TicketResponse 的 result 事件；
+        出错时产出 error 事件。调用方停止迭代时工作流随之取消。
+
+        Args:
+            ticket: TicketRequest对象，包含工单信息
+
+        Yields:
+            形如 {"event": 事件类型, ...} 的字典
+        """
+        request_id = str(uuid.uuid4())
+        start_time = time()
+        node_outputs = []
+
+        logger.info(f"【开始】流式处理工单 {request_id}")
+        similar = self._find_similar(ticket)
+        yield {"event": "start", "request_id": request_id,
+               "similar_request_id": similar.request_id if similar else None}
+
+        try:
+            async for event in self.graph.astream_events(
+                    self._initial_state(ticket, request_id, similar), {"recursion_limit": 20}, version="v2"):
+                kind = event["event"]
+                name = event.get("name")
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chain_start" and name in WORKFLOW_NODES and name == node:
+                    yield {"event": "node_start", "node": name}
+                elif kind == "on_chain_end" and name in WORKFLOW_NODES and name == node:
+                    output = event["data"].get("output")
+                    if isinstance(output, dict):
+                        node_outputs.append(output)
+                    yield {"event": "node_end", "node": name}
+                elif kind == "on_tool_start":
+                    yield {"event": "tool_start", "tool": name, "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    content = getattr(output, "content", output)
+                    yield {"event": "tool_end", "tool": name, "output": str(content)[:STREAM_TOOL_OUTPUT_PREVIEW]}
+                elif kind == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    if content:
+                        yield {"event": "token", "node": node, "content": content}
+
+            response = self._build_response(request_id, node_outputs, start_time)
+            if similar is not None:
+                response.similar_request_id = similar.request_id
+            self._remember(ticket, response)
+            logger.info(f"【完成】工单 {request_id} 流式处理完成，耗时: {response.processing_time:.2f}秒")
+            yield {"event": "result", "data": response.model_dump(mode="json")}
+
+        except Exception as e:
+            log_exception(logger, e, f"【错误】流式处理工单 {request_id} 失败")
+            yield {"event": "error", "request_id": request_id, "detail": str(e)}
@@ -1,40 +1,138 @@
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.tools import tool
-from langchain_community.embeddings import DashScopeEmbeddings
-from langchain_chroma import Chroma
-from langchain_openai import ChatOpenAI
-import chromadb
-import os
-from langchain.prompts import PromptTemplate
+from langchain_core.embeddings import Embeddings
+import asyncio
+import threading
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class ChromaActivityStore:
+    """基于本地 Chroma 向量库的活动检索后端"""
+
+    def __init__(self, embeddings: Embeddings):
+        # chromadb 导入较重，只在选用该后端时导入
+        import chromadb
+        from langchain_chroma import Chroma
+
+        # 使用 PersistentClient 打开本地向量库
+        self.client = chromadb.PersistentClient(path=settings.ACTIVITY_CHROMA_DIR)
+        self.vectorstore = Chroma(
+            client=self.client,
+            embedding_function=embeddings,
+            collection_name=settings.ACTIVITY_COLLECTION,
+            persist_directory=settings.ACTIVITY_CHROMA_DIR
+        )
+
+    def count(self) -> int:
+        return self.client.get_collection(settings.ACTIVITY_COLLECTION).count()
+
+    async def amax_marginal_relevance_search(self, query: str, k: int, fetch_k: int, lambda_mult: float) -> List[str]:
+        docs = await self.vectorstore.amax_marginal_relevance_search(
+            query=query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        )
+        return [doc.page_content for doc in docs]
+
+
+class NumpyActivityStore:
+    """基于进程内内存映射矩阵的活动检索后端，索引由 vector_index 从 Chroma 导出"""
+
+    def __init__(self, embeddings: Embeddings):
+        from app.tools.ActivityTool.vector_index import NumpyVectorIndex
+
+        self.embeddings = embeddings
+        self.index = NumpyVectorIndex.load(settings.ACTIVITY_NUMPY_INDEX_DIR)
+
+    def count(self) -> int:
+        return len(self.index.documents)
+
+    async def amax_marginal_relevance_search(self, query: str, k: int, fetch_k: int, lambda_mult: float) -> List[str]:
+        query_embedding = await self.embeddings.aembed_query(query)
+        return self.index.max_marginal_relevance_search_by_vector(
+            query_embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        )
+
+
+ACTIVITY_STORES = {
+    "chroma": ChromaActivityStore,
+    "numpy": NumpyActivityStore,
+}
+
+
+class ActivityRetriever:
+    """活动科目号检索所需的 Embedding、向量库和分析模型，进程内只创建一次并复用"""
+
+    def __init__(self):
+        # Embedding、大模型客户端导入较重，首次使用工具时才导入
+        from langchain.prompts import PromptTemplate
+        from langchain_community.embeddings import DashScopeEmbeddings
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_openai import ChatOpenAI
+
+        from app.tools.ActivityTool.embedding_cache import CachedEmbeddings
+
+        # 初始化 embeddings，相同工单文本的向量走本地缓存
+        self.embeddings = DashScopeEmbeddings(
+            dashscope_api_key=settings.DASHSCOPE_API_KEY,
+            model=settings.ACTIVITY_EMBEDDING_MODEL
+        )
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embeddings = CachedEmbeddings(self.embeddings, namespace=settings.ACTIVITY_EMBEDDING_MODEL)
+
+        # 按配置选择检索后端
+        backend = settings.ACTIVITY_RETRIEVAL_BACKEND.lower()
+        if backend not in ACTIVITY_STORES:
+            raise ValueError(f"未知的活动检索后端: {settings.ACTIVITY_RETRIEVAL_BACKEND}")
+        self.store = ACTIVITY_STORES[backend](self.embeddings)
+
+        # 将找到的活动描述传给大模型，分析出最可能的 3 个活动
+        prompt = PromptTemplate.from_template(
+            "以下是多个科目号活动描述，请根据这些描述分析出最可能的 3 个活动：\n\n"
+            "{results_str}\n\n"
+            "请返回最相关的 3 个活动"
+        )
+        llm = ChatOpenAI(
+            model=settings.ACTIVITY_LLM_MODEL,
+            openai_api_key=settings.DASHSCOPE_API_KEY,
+            openai_api_base=settings.DASHSCOPE_API_BASE,
+            temperature=0,
+            streaming=True,
+        )
+        self.chain = prompt | llm | StrOutputParser()
+
+
+_activity_retriever: Optional[ActivityRetriever] = None
+_activity_retriever_lock = threading.Lock()
+
+
+def get_activity_retriever() -> ActivityRetriever:
+    """获取进程内共享的 ActivityRetriever，首次调用时打开向量库"""
+    global _activity_retriever
+    if _activity_retriever is None:
+        with _activity_retriever_lock:
+            if _activity_retriever is None:
+                _activity_retriever = ActivityRetriever()
+    return _activity_retriever
+
+
+def warm_up_activity_store() -> None:
+    """服务启动时预先打开向量库，避免首个工单请求承担加载开销"""
+    retriever = get_activity_retriever()
+    count = retriever.store.count()
+    logger.info(f"活动检索后端 {settings.ACTIVITY_RETRIEVAL_BACKEND} 已加载，共 {count} 条活动")
 
 
 @tool
-def analyze_ticket_subject(query: str) -> str:
+async def analyze_ticket_subject(query: str) -> str:
     """
     工单活动科目号分析工具：根据用户输入的问题内容，查找最相似的活动描述，辅助判断工单属于哪一个活动。
     """
-    # 设置向量库本地存储路径
-    PERSIST_DIRECTORY = "C:\\liuyb\\pythonCode\\ai-llm-study\\chroma\\chroma_db"
-
-    # 初始化 embeddings
-    embeddings = DashScopeEmbeddings(
-        dashscope_api_key="sk-1644b0e12c664989b4765e115b06a3fa",
-        model="text-embedding-v3"
-    )
-
-    # 使用 PersistentClient 并指定存储路径
-    persistent_client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
-
-    # 加载已存在的向量库
-    loaded_vectorstore = Chroma(
-        client=persistent_client,
-        embedding_function=embeddings,
-        collection_name="my_collection",
-        persist_directory=PERSIST_DIRECTORY
-    )
+    # 首次调用时打开向量库涉及磁盘读取，放到线程中执行
+    retriever = await asyncio.to_thread(get_activity_retriever)
 
     # 执行 MMR 多样性搜索
-    docs = loaded_vectorstore.max_marginal_relevance_search(
+    docs = await retriever.store.amax_marginal_relevance_search(
         query=query,
         k=10,
         fetch_k=15,
@@ -44,33 +142,12 @@ def analyze_ticket_subject(query: str) -> str:
     # 整合结果为字符串返回
     results = []
     for i, doc in enumerate(docs, 1):
-        results.append(f"结果 {i}:\n{doc.page_content}")
-
-    # 将找到的活动描述传给大模型，分析出最可能的 3 个活动
+        results.append(f"结果 {i}:\n{doc}")
     results_str = "\n\n".join(results)
     # print("向量数据库检索出的活动"+results_str)
-    prompt_template = (
-        "以下是多个科目号活动描述，请根据这些描述分析出最可能的 3 个活动：\n\n"
-        "{results_str}\n\n"
-        "请返回最相关的 3 个活动"
-    )
-
-    # 使用模板
-    prompt = PromptTemplate.from_template(prompt_template)
-
-    # 使用 OpenAI 的大语言模型进行分析
-    llm = ChatOpenAI(
-        model="qwq-32b",
-        openai_api_key="sk-1644b0e12c664989b4765e115b06a3fa",
-        openai_api_base="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        temperature=0,
-        streaming=True,
-    )
-    # 创建 LLMChain 来执行大模型推理
-    chain = prompt | llm | StrOutputParser()
 
     # 直接传递字符串而不是字典
-    analysis_result = chain.invoke(results_str)
+    analysis_result = await retriever.chain.ainvoke(results_str)
     print("最相关的三个活动"+ analysis_result)
     return analysis_result
 
@@ -82,5 +159,5 @@ if __name__ == "__main__":
     活动名称： 邮储小绿卡 蜜雪冰城天天1分购（2025年3
     客户致电表示在信用卡APP进行抢兑，邮储小绿卡 蜜雪冰城天天1分购（2025年3月-6月）活动的兑换券未成功，客户称在进行支付最后一步输入验证码后提示，账户异常，为保证资金安全请前往网点咨询。客户前往网点咨询无果后致电，现客户要求核实原因。请相关部门进行协助处理，谢谢。"""
 
-    result = analyze_ticket_subject(query)
+    result = asyncio.run(analyze_ticket_subject.ainvoke(query))
     print(result)
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    带两级缓存的 Embeddings 包装器
+
+    以归一化文本(合并空白)的 SHA-256 为键：第一级是进程内 LRU，第二级是本地 SQLite，
+    服务重启后仍然有效。命中时跳过远程 embedding 调用，并记录各级命中/未命中次数。
+    """
+
+    def __init__(self, embeddings: Embeddings, namespace: str,
+                 path: str = settings.EMBEDDING_CACHE_PATH,
+                 max_memory_items: int = settings.EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.namespace = namespace  # 通常为模型名，不同模型的向量互不复用
+        self.max_memory_items = max_memory_items
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, created_at REAL)"
+            )
+
+    def _key(self, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.namespace}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            vector = array("f", row[0]).tolist()
+            self._remember(key, vector)
+            return vector
+
+    def _put(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+                )
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        """写入内存 LRU（调用方需持有锁）"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _lookup_many(self, texts: List[str]):
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        return keys, vectors, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup_many(texts)
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            self._put({keys[i]: vectors[i] for i in missing})
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put({key: vector})
+        else:
+            logger.debug("query embedding 命中缓存")
+        return vector
+
+    # 异步版本中的缓存读写涉及 SQLite，放到线程中执行，不阻塞事件循环
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = await asyncio.to_thread(self._lookup_many, texts)
+        if missing:
+            computed = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            await asyncio.to_thread(self._put, {keys[i]: vectors[i] for i in missing})
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = await asyncio.to_thread(self._get, key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self._put, {key: vector})
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
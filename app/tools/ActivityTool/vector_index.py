@@ -0,0 +1,108 @@
+import json
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.json"
+
+
+class NumpyVectorIndex:
+    """
+    进程内的活动目录向量索引
+
+    活动/科目号目录规模小且基本不变，向量以 L2 归一化后的 float32 矩阵保存为 .npy 文件，
+    加载时按内存映射方式打开(零拷贝)，查询时用 NumPy 矩阵运算计算余弦相似度并做 MMR 重排，
+    不依赖 chromadb。
+    """
+
+    def __init__(self, embeddings: np.ndarray, documents: List[str]):
+        if len(embeddings) != len(documents):
+            raise ValueError(f"向量数({len(embeddings)})与文档数({len(documents)})不一致")
+        self.embeddings = embeddings
+        self.documents = documents
+
+    @classmethod
+    def load(cls, index_dir: str) -> "NumpyVectorIndex":
+        """以内存映射方式加载索引"""
+        embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, DOCUMENTS_FILE), encoding="utf-8") as f:
+            documents = json.load(f)
+        return cls(embeddings, documents)
+
+    @staticmethod
+    def build(index_dir: str, documents: List[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """将文档及其向量写成索引文件（向量预先归一化，加载后无需再处理）"""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, EMBEDDINGS_FILE), matrix)
+        with open(os.path.join(index_dir, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            json.dump(list(documents), f, ensure_ascii=False)
+
+    def similarity_search_by_vector(self, query_embedding: Sequence[float], k: int = 4) -> List[str]:
+        """按余弦相似度返回最相似的 k 个文档"""
+        scores = self.embeddings @ self._normalize(query_embedding)
+        return [self.documents[i] for i in self._top_k(scores, k)]
+
+    def max_marginal_relevance_search_by_vector(self, query_embedding: Sequence[float], k: int = 4,
+                                                fetch_k: int = 20, lambda_mult: float = 0.5) -> List[str]:
+        """
+        MMR 多样性检索，与 langchain 向量库的 max_marginal_relevance_search 语义一致：
+        先按相似度取 fetch_k 个候选，再在相关性与已选结果的差异性之间按 lambda_mult 权衡选出 k 个
+        """
+        scores = self.embeddings @ self._normalize(query_embedding)
+        candidates = self._top_k(scores, fetch_k)
+        if len(candidates) == 0:
+            return []
+
+        candidate_vectors = np.asarray(self.embeddings[candidates])
+        relevance = scores[candidates]
+        selected = [0]
+        # 每个候选与已选结果的最大相似度
+        redundancy = candidate_vectors @ candidate_vectors[0]
+        while len(selected) < min(k, len(candidates)):
+            mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            mmr_scores[selected] = -np.inf
+            best = int(np.argmax(mmr_scores))
+            selected.append(best)
+            redundancy = np.maximum(redundancy, candidate_vectors @ candidate_vectors[best])
+        return [self.documents[candidates[i]] for i in selected]
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """相似度最高的 k 个下标（降序）"""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+
+def export_chroma_collection(persist_directory: str, collection_name: str, index_dir: str,
+                             limit: Optional[int] = None) -> int:
+    """从本地 Chroma 向量库导出文档和向量，生成 NumpyVectorIndex 索引文件，返回导出的条数"""
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=persist_directory).get_collection(collection_name)
+    data = collection.get(include=["documents", "embeddings"], limit=limit)
+    NumpyVectorIndex.build(index_dir, data["documents"], data["embeddings"])
+    return len(data["documents"])
+
+
+# 从配置的 Chroma 向量库生成索引: python -m app.tools.ActivityTool.vector_index
+if __name__ == "__main__":
+    from app.core.config import settings
+
+    count = export_chroma_collection(
+        settings.ACTIVITY_CHROMA_DIR, settings.ACTIVITY_COLLECTION, settings.ACTIVITY_NUMPY_INDEX_DIR
+    )
+    print(f"已导出 {count} 条活动向量到 {settings.ACTIVITY_NUMPY_INDEX_DIR}")
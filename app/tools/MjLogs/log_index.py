@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, List, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.tools.MjLogs.log_row import LogRow
+
+
+def normalize_timestamp(value: Any) -> Optional[str]:
+    """将日志时间统一为 'YYYY-MM-DD HH:MM:SS' 字符串，便于按时间窗口比较；无法识别时返回 None"""
+    if value is None or value == "":
+        return None
+    text = str(value).strip()
+    if text.isdigit() and len(text) in (10, 13):
+        seconds = int(text) / 1000 if len(text) == 13 else int(text)
+        return datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+    text = text.replace("T", " ")
+    if len(text) >= 19 and text[4] == "-" and text[13] == ":":
+        return text[:19]
+    return None
+
+
+# 批量查询日志行 id 时每条 SQL 的参数个数，低于旧版 SQLite 的 999 个变量上限
+_KEY_BATCH_SIZE = 500
+
+
+class LogIndex:
+    """
+    明觉日志本地全文索引（SQLite FTS5）
+
+    每次远程查询成功后，把解析出的日志行写入本地库，并按顺序记录该 (标识符, 项目, 时间窗口) 返回了哪些行。
+    之后对同一标识符、落在已索引时间窗口内的查询按该记录原样返回，不再请求日志代理；
+    日志平台可能按其他字段或模糊检索命中，消息中不一定包含标识符，因此不能靠全文检索重放。
+    全文索引只用于 search 的临时检索。日志行和时间窗口按写入时间过期。
+    """
+
+    def __init__(self, path: str = settings.MJLOG_INDEX_PATH, ttl: float = settings.MJLOG_INDEX_TTL):
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            has_window_rows = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_window_rows'"
+            ).fetchone()
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS log_rows (
+                    id INTEGER PRIMARY KEY,
+                    row_key TEXT UNIQUE,
+                    identifier TEXT,
+                    trace_id TEXT,
+                    ts TEXT,
+                    project TEXT,
+                    message TEXT,
+                    raw TEXT,
+                    ingested_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_log_rows_project_ts ON log_rows (project, ts);
+                CREATE INDEX IF NOT EXISTS idx_log_rows_identifier ON log_rows (identifier);
+                CREATE INDEX IF NOT EXISTS idx_log_rows_trace_id ON log_rows (trace_id);
+                CREATE INDEX IF NOT EXISTS idx_log_rows_ingested_at ON log_rows (ingested_at);
+
+                CREATE TABLE IF NOT EXISTS log_windows (
+                    identifier TEXT,
+                    project TEXT,
+                    begin_time TEXT,
+                    end_time TEXT,
+                    ingested_at REAL,
+                    PRIMARY KEY (identifier, project, begin_time, end_time)
+                );
+
+                CREATE TABLE IF NOT EXISTS log_window_rows (
+                    identifier TEXT,
+                    project TEXT,
+                    begin_time TEXT,
+                    end_time TEXT,
+                    position INTEGER,
+                    row_id INTEGER,
+                    ingested_at REAL,
+                    PRIMARY KEY (identifier, project, begin_time, end_time, position)
+                );
+                CREATE INDEX IF NOT EXISTS idx_log_window_rows_ingested_at ON log_window_rows (ingested_at);
+            """)
+            if not has_window_rows:
+                # 旧版本只记录了时间窗口、没有记录窗口对应的日志行，这些窗口无法原样重放，需重新查询
+                self._conn.execute("DELETE FROM log_windows")
+            # trigram 分词支持任意子串匹配（与日志平台的模糊检索一致），旧版 SQLite 不支持时退回默认分词
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING "
+                    "fts5(message, content='log_rows', content_rowid='id', tokenize='trigram')"
+                )
+            except sqlite3.OperationalError:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING "
+                    "fts5(message, content='log_rows', content_rowid='id')"
+                )
+            self._conn.executescript("""
+                CREATE TRIGGER IF NOT EXISTS log_rows_ai AFTER INSERT ON log_rows BEGIN
+                    INSERT INTO log_fts (rowid, message) VALUES (new.id, new.message);
+                END;
+                CREATE TRIGGER IF NOT EXISTS log_rows_ad AFTER DELETE ON log_rows BEGIN
+                    INSERT INTO log_fts (log_fts, rowid, message) VALUES ('delete', old.id, old.message);
+                END;
+            """)
+
+    def lookup(self, identifier: str, project: str, begin_time: str, end_time: str) -> Optional[List[LogRow]]:
+        """
+        查询本地索引
+
+        Returns:
+            时间窗口已被索引覆盖时返回日志行列表（可能为空），否则返回 None，表示需要远程查询
+        """
+        if not identifier:
+            return None
+        expire_before = time.time() - self.ttl
+        with self._lock:
+            window = self._conn.execute(
+                "SELECT begin_time, end_time FROM log_windows WHERE identifier = ? AND project = ? "
+                "AND begin_time <= ? AND end_time >= ? AND ingested_at >= ? ORDER BY ingested_at DESC LIMIT 1",
+                (identifier, project, begin_time, end_time, expire_before)
+            ).fetchone()
+            if not window:
+                return None
+            # 按写入时记录的顺序重放该窗口的结果，只需再按请求的(更小的)时间窗口过滤
+            rows = self._conn.execute(
+                "SELECT r.raw FROM log_window_rows w JOIN log_rows r ON r.id = w.row_id "
+                "WHERE w.identifier = ? AND w.project = ? AND w.begin_time = ? AND w.end_time = ? "
+                "AND (r.ts IS NULL OR r.ts BETWEEN ? AND ?) ORDER BY w.position",
+                (identifier, project, window[0], window[1], begin_time, end_time)
+            ).fetchall()
+        logger.debug(f"本地日志索引命中: {identifier}，{len(rows)} 条")
+        return [LogRow.from_dict(json.loads(raw)) for (raw,) in rows]
+
+    def ingest(self, identifier: str, logs: List[LogRow], project: str,
+               begin_time: str, end_time: str, trace_id: Optional[str] = None) -> None:
+        """写入一次远程查询的结果，并记录该标识符已覆盖的时间窗口"""
+        now = time.time()
+        records = []
+        for log in logs:
+            raw = json.dumps(log.to_dict(), ensure_ascii=False, default=str, sort_keys=True)
+            # 按整行(含 IP、级别等字段)去重，时间和消息相同的不同日志行不会合并
+            row_key = hashlib.sha256(f"{project}\x1f{raw}".encode("utf-8")).hexdigest()
+            records.append((row_key, identifier, trace_id, normalize_timestamp(log.timestamp), project,
+                            log.message or "", raw, now))
+
+        window = (identifier, project, begin_time, end_time)
+        with self._lock, self._conn:
+            # 已存在的日志行只刷新写入时间，避免同一行在不同查询中重复存储
+            self._conn.executemany(
+                "INSERT INTO log_rows (row_key, identifier, trace_id, ts, project, message, raw, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(row_key) DO UPDATE SET ingested_at = excluded.ingested_at",
+                records
+            )
+            row_ids = self._row_ids([record[0] for record in records])
+            self._conn.execute(
+                "DELETE FROM log_window_rows WHERE identifier = ? AND project = ? AND begin_time = ? AND end_time = ?",
+                window
+            )
+            self._conn.executemany(
+                "INSERT INTO log_window_rows (identifier, project, begin_time, end_time, position, row_id, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*window, position, row_id, now) for position, row_id in enumerate(row_ids)]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO log_windows (identifier, project, begin_time, end_time, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*window, now)
+            )
+        self._purge_expired()
+
+    def _row_ids(self, row_keys: List[str]) -> List[int]:
+        """按 row_key 批量查出日志行 id，顺序与 row_keys 一致（调用方持有锁）"""
+        ids = {}
+        unique_keys = list(dict.fromkeys(row_keys))
+        for start in range(0, len(unique_keys), _KEY_BATCH_SIZE):
+            batch = unique_keys[start:start + _KEY_BATCH_SIZE]
+            ids.update(self._conn.execute(
+                f"SELECT row_key, id FROM log_rows WHERE row_key IN ({', '.join('?' * len(batch))})", batch
+            ).fetchall())
+        return [ids[row_key] for row_key in row_keys]
+
+    def _purge_expired(self) -> None:
+        """删除过期的日志行和时间窗口（至多每分钟执行一次）"""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        expire_before = now - self.ttl
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM log_rows WHERE ingested_at < ?", (expire_before,))
+            self._conn.execute("DELETE FROM log_windows WHERE ingested_at < ?", (expire_before,))
+            self._conn.execute("DELETE FROM log_window_rows WHERE ingested_at < ?", (expire_before,))
+
+    def search(self, text: str, project: str, limit: int = 100) -> List[LogRow]:
+        """在本地已索引的日志中全文检索消息（临时排查用，不代表日志平台的完整结果）"""
+        expire_before = time.time() - self.ttl
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.raw FROM log_fts JOIN log_rows r ON r.id = log_fts.rowid "
+                "WHERE log_fts MATCH ? AND r.project = ? AND r.ingested_at >= ? ORDER BY r.id LIMIT ?",
+                (self._phrase(text), project, expire_before, limit)
+            ).fetchall()
+        return [LogRow.from_dict(json.loads(raw)) for (raw,) in rows]
+
+    @staticmethod
+    def _phrase(text: str) -> str:
+        """将标识符转为 FTS5 短语查询，避免其中的特殊字符被当作查询语法"""
+        return '"' + text.replace('"', '""') + '"'
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_log_index: Optional[LogIndex] = None
+_log_index_lock = threading.Lock()
+
+
+def get_log_index() -> Optional[LogIndex]:
+    """获取进程内共享的本地日志索引；未启用时返回 None"""
+    global _log_index
+    if not settings.MJLOG_INDEX_ENABLED:
+        return None
+    if _log_index is None:
+        with _log_index_lock:
+            if _log_index is None:
+                _log_index = LogIndex()
+    return _log_index
+
+
+def close_log_index() -> None:
+    """关闭共享的本地日志索引（应用关闭时调用）"""
+    global _log_index
+    with _log_index_lock:
+        if _log_index is not None:
+            _log_index.close()
+            _log_index = None
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from app.core.config import settings
+from app.tools.MjLogs.log_row import LogPage, LogRow
+
+# 停止翻页的原因
+STOP_END = "end"              # 已取完全部结果
+STOP_MAX_ROWS = "max_rows"    # 达到条数预算
+STOP_MAX_PAGES = "max_pages"  # 达到页数上限
+STOP_TIMEOUT = "timeout"      # 超出时间预算
+STOP_PREDICATE = "predicate"  # stop_when 条件满足
+STOP_ERROR = "error"          # 某一页查询失败
+
+
+class LogPager:
+    """
+    明觉日志分页读取
+
+    以生成器逐行产出日志：处理当前页的同时在后台预取下一页，满足条数预算、页数上限、时间预算或
+    stop_when 条件时停止翻页，内存中只保留当前页和预取页。同步迭代使用 fetch_page，异步迭代使用
+    afetch_page，二者均接收页码(从 1 开始)返回 LogPage。迭代结束后 stop_reason、pages、rows、error
+    记录本次读取的情况。
+    """
+
+    def __init__(self,
+                 fetch_page: Optional[Callable[[int], LogPage]] = None,
+                 afetch_page: Optional[Callable[[int], Awaitable[LogPage]]] = None,
+                 page_size: int = settings.MJLOG_PAGE_SIZE,
+                 max_rows: int = settings.MJLOG_LOG_BUDGET,
+                 max_pages: int = settings.MJLOG_MAX_PAGES,
+                 time_budget: float = settings.MJLOG_PAGE_TIME_BUDGET,
+                 stop_when: Optional[Callable[[LogRow], bool]] = None):
+        self.fetch_page = fetch_page
+        self.afetch_page = afetch_page
+        self.page_size = page_size
+        self.max_rows = max_rows        # 0 表示不限制
+        self.max_pages = max_pages      # 0 表示不限制
+        self.time_budget = time_budget  # 秒，0 表示不限制；首页不受限制，只决定是否继续翻页
+        self.stop_when = stop_when
+        self.stop_reason: Optional[str] = None
+        self.pages = 0
+        self.rows = 0
+        self.error: Optional[str] = None
+        self._fetched = 0
+        self._deadline: Optional[float] = None
+
+    @property
+    def complete(self) -> bool:
+        """是否取完了全部结果"""
+        return self.stop_reason == STOP_END
+
+    def _start(self) -> None:
+        self.stop_reason = None
+        self.pages = self.rows = self._fetched = 0
+        self.error = None
+        self._deadline = time.monotonic() + self.time_budget if self.time_budget > 0 else None
+
+    def _remaining(self) -> Optional[float]:
+        return None if self._deadline is None else max(self._deadline - time.monotonic(), 0.0)
+
+    def _accept(self, page: LogPage) -> bool:
+        """记录取到的一页，查询失败时返回 False"""
+        if not page.ok:
+            self.error = page.error
+            self.stop_reason = STOP_ERROR
+            return False
+        self.pages += 1
+        self._fetched += len(page.rows)
+        return True
+
+    def _has_next(self, page: LogPage, page_num: int) -> bool:
+        """根据当前页判断是否需要继续翻页，不需要时记录停止原因"""
+        if len(page.rows) < self.page_size or self._fetched >= page.total:
+            self.stop_reason = STOP_END
+        elif self.max_rows and self._fetched >= self.max_rows:
+            self.stop_reason = STOP_MAX_ROWS
+        elif self.max_pages and page_num >= self.max_pages:
+            self.stop_reason = STOP_MAX_PAGES
+        elif self._remaining() == 0:
+            self.stop_reason = STOP_TIMEOUT
+        else:
+            return True
+        return False
+
+    def _take(self, row: LogRow) -> bool:
+        """产出一行前检查条数预算"""
+        if self.max_rows and self.rows >= self.max_rows:
+            self.stop_reason = STOP_MAX_ROWS
+            return False
+        self.rows += 1
+        return True
+
+    def _satisfied(self, row: LogRow) -> bool:
+        if self.stop_when is not None and self.stop_when(row):
+            self.stop_reason = STOP_PREDICATE
+            return True
+        return False
+
+    def __iter__(self) -> Iterator[LogRow]:
+        self._start()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mjlog-pager")
+        pending = executor.submit(self.fetch_page, 1)
+        page_num = 1
+        try:
+            while pending is not None:
+                try:
+                    page = pending.result(timeout=self._remaining() if page_num > 1 else None)
+                except FutureTimeoutError:
+                    self.stop_reason = STOP_TIMEOUT
+                    return
+                pending = None
+                if not self._accept(page):
+                    return
+                if self._has_next(page, page_num):
+                    pending = executor.submit(self.fetch_page, page_num + 1)
+                for row in page.rows:
+                    if not self._take(row):
+                        return
+                    yield row
+                    if self._satisfied(row):
+                        return
+                page_num += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+    async def __aiter__(self) -> AsyncIterator[LogRow]:
+        self._start()
+        pending = asyncio.ensure_future(self.afetch_page(1))
+        page_num = 1
+        try:
+            while pending is not None:
+                try:
+                    if page_num > 1 and self._deadline is not None:
+                        page = await asyncio.wait_for(asyncio.shield(pending), self._remaining())
+                    else:
+                        page = await pending
+                except asyncio.TimeoutError:
+                    self.stop_reason = STOP_TIMEOUT
+                    return
+                pending = None
+                if not self._accept(page):
+                    return
+                if self._has_next(page, page_num):
+                    pending = asyncio.ensure_future(self.afetch_page(page_num + 1))
+                for row in page.rows:
+                    if not self._take(row):
+                        return
+                    yield row
+                    if self._satisfied(row):
+                        return
+                page_num += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Optional
+
+# 单独保存为属性的字段，其余字段放入 extra
+_ROW_FIELDS = ("timestamp", "message", "level")
+
+
+class LogRow:
+    """
+    一条明觉日志
+
+    从接口响应的 JSON 直接构建，在查询、去重、索引和格式化之间传递，
+    只在最终生成工具结果时转为文本。
+    """
+
+    __slots__ = ("timestamp", "message", "level", "extra")
+
+    def __init__(self, timestamp: Any = None, message: Optional[str] = None,
+                 level: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        self.timestamp = timestamp
+        self.message = message
+        self.level = level
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogRow":
+        extra = {k: v for k, v in data.items() if k not in _ROW_FIELDS} or None
+        return cls(data.get("timestamp"), data.get("message"), data.get("level"), extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.extra) if self.extra else {}
+        for field in _ROW_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def __repr__(self) -> str:
+        return f"LogRow(timestamp={self.timestamp!r}, message={self.message!r})"
+
+
+class LogPage:
+    """一次日志查询的结果：成功时为日志行列表，失败时为错误信息"""
+
+    __slots__ = ("rows", "total", "error")
+
+    def __init__(self, rows: Optional[List[LogRow]] = None, total: Optional[int] = None,
+                 error: Optional[str] = None):
+        self.rows = rows if rows is not None else []
+        self.total = total if total is not None else len(self.rows)
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "LogPage":
+        """由接口返回的 JSON 构建；code 不为 0 或缺少 rows 时视为失败"""
+        if not isinstance(payload, dict) or payload.get("code") != 0:
+            code = payload.get("code") if isinstance(payload, dict) else None
+            return cls(error=f"日志接口返回异常，code：{code}")
+        rows = payload.get("rows")
+        if not isinstance(rows, list):
+            return cls(error="日志接口返回的数据中没有 rows")
+        return cls([LogRow.from_dict(row) for row in rows if isinstance(row, dict)], payload.get("total"))
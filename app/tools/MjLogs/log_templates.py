@@ -0,0 +1,115 @@
+import re
+from typing import Dict, List, Optional
+
+# 日志中的可变部分，挖掘模板前统一替换为通配符（各模式均不跨越空白，保证替换前后分词数量一致）
+_VARIABLE_PATTERNS = [
+    re.compile(r'\d{4}-\d{2}-\d{2}'),                                          # 日期
+    re.compile(r'\d{2}:\d{2}:\d{2}(?:[.,]\d+)?'),                              # 时间
+    re.compile(r'\b[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}\b'),   # UUID
+    re.compile(r'\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{12,}\b'),         # traceID 等十六进制串
+    re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'),                       # IP(:端口)
+    re.compile(r'(?<![A-Za-z])\d+(?:\.\d+)?'),                                  # 数字（用户ID、手机号、耗时等）
+]
+# 只含日期或时间的参数，首末时间已单独输出，不作为参数示例
+_TIMESTAMP_TOKEN = re.compile(r'\d{4}-\d{2}-\d{2}|\d{2}:\d{2}:\d{2}(?:[.,]\d+)?')
+_ANSI_PATTERN = re.compile(r'\033\[[0-9;]+m')
+WILDCARD = "<*>"
+
+
+def strip_ansi(message: str) -> str:
+    return _ANSI_PATTERN.sub('', message)
+
+
+class LogCluster:
+    """一个日志模板及其统计信息"""
+
+    __slots__ = ("template", "count", "first_timestamp", "last_timestamp", "samples")
+
+    def __init__(self, template: List[str], timestamp: Optional[str]):
+        self.template = template
+        self.count = 0
+        self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.samples: List[List[str]] = []  # 前几条日志的原始分词
+
+    @property
+    def template_text(self) -> str:
+        return " ".join(self.template)
+
+    def sample_params(self) -> List[List[str]]:
+        """各样本在模板通配符位置上的原始取值（不含时间）"""
+        positions = [i for i, token in enumerate(self.template) if WILDCARD in token]
+        return [[sample[i] for i in positions if not _TIMESTAMP_TOKEN.fullmatch(sample[i])]
+                for sample in self.samples]
+
+
+class LogTemplateMiner:
+    """
+    Drain 风格的流式日志模板挖掘
+
+    日志逐条加入：先把时间、数字、traceID 等可变部分替换为通配符，再按 分词数 -> 前 depth 个分词
+    两级前缀树找到候选模板，与最相似且相似度不低于阈值的模板合并（不同位置改为通配符），
+    否则新建模板。每个模板记录出现次数、首末时间和若干参数示例。
+    """
+
+    def __init__(self, similarity_threshold: float = 0.5, depth: int = 2,
+                 max_samples: int = 3, max_clusters_per_node: int = 100):
+        self.similarity_threshold = similarity_threshold
+        self.depth = depth
+        self.max_samples = max_samples
+        self.max_clusters_per_node = max_clusters_per_node
+        self.clusters: List[LogCluster] = []
+        self.total = 0
+        self._tree: Dict[int, Dict[tuple, List[LogCluster]]] = {}
+
+    @staticmethod
+    def _mask(message: str) -> str:
+        for pattern in _VARIABLE_PATTERNS:
+            message = pattern.sub(WILDCARD, message)
+        return message
+
+    def _prefix(self, tokens: List[str]) -> tuple:
+        # 以数字开头或含通配符的分词不适合作为路由键
+        return tuple(
+            token if WILDCARD not in token and not token[:1].isdigit() else WILDCARD
+            for token in tokens[:self.depth]
+        )
+
+    @staticmethod
+    def _similarity(template: List[str], tokens: List[str]) -> float:
+        same = sum(1 for a, b in zip(template, tokens) if a == b or a == WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def add(self, message: str, timestamp: Optional[str] = None) -> LogCluster:
+        """加入一条日志，返回其所属模板"""
+        raw_tokens = message.split()
+        tokens = self._mask(message).split()
+        if len(tokens) != len(raw_tokens):  # 理论上不会发生，防御性处理
+            raw_tokens = tokens
+        self.total += 1
+
+        candidates = self._tree.setdefault(len(tokens), {}).setdefault(self._prefix(tokens), [])
+        cluster = None
+        best_similarity = -1.0
+        for candidate in candidates:
+            similarity = self._similarity(candidate.template, tokens)
+            if similarity > best_similarity:
+                cluster, best_similarity = candidate, similarity
+
+        if cluster is None or best_similarity < self.similarity_threshold:
+            cluster = LogCluster(tokens, timestamp)
+            if len(candidates) < self.max_clusters_per_node:
+                candidates.append(cluster)
+            self.clusters.append(cluster)
+        else:
+            cluster.template = [a if a == b else WILDCARD for a, b in zip(cluster.template, tokens)]
+
+        cluster.count += 1
+        if timestamp is not None:
+            if cluster.first_timestamp is None or timestamp < cluster.first_timestamp:
+                cluster.first_timestamp = timestamp
+            if cluster.last_timestamp is None or timestamp > cluster.last_timestamp:
+                cluster.last_timestamp = timestamp
+        if len(cluster.samples) < self.max_samples:
+            cluster.samples.append(raw_tokens)
+        return cluster
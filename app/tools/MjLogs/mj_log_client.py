@@ -0,0 +1,153 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# 遇到这些状态码时视为临时故障，进行重试
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class MjLogClient:
+    """
+    明觉日志(Elasticsearch 代理)接口客户端
+
+    进程内共享一个实例：同步和异步各持有一个长连接池，复用 TLS 连接和 keep-alive，
+    请求头只构建一次；所有请求统一超时，临时故障按指数退避加随机抖动重试。
+    """
+
+    def __init__(self,
+                 url: str = settings.MJLOG_URL,
+                 cookie: Optional[str] = settings.MJLOG_COOKIE,
+                 timeout: float = settings.MJLOG_TIMEOUT,
+                 connect_timeout: float = settings.MJLOG_CONNECT_TIMEOUT,
+                 max_connections: int = settings.MJLOG_MAX_CONNECTIONS,
+                 max_retries: int = settings.MJLOG_MAX_RETRIES,
+                 retry_backoff: float = settings.MJLOG_RETRY_BACKOFF):
+        self.url = url
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.headers = self._build_headers(cookie)
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_headers(cookie: Optional[str]) -> Dict[str, str]:
+        """构建请求头（模拟浏览器访问日志平台）"""
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:136.0) Gecko/20100101 Firefox/136.0",
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
+            # br/zstd 需要额外的解码依赖，只声明 httpx 内置支持的压缩格式
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/x-www-form-urlencoded",
+            "X-Requested-With": "XMLHttpRequest",
+            "Origin": "https://web.rong-data.com",
+            "Referer": "https://web.rong-data.com/mjlog/elasticsearch/log",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-origin",
+            "Priority": "u=0"
+        }
+        if cookie:
+            headers["Cookie"] = cookie
+        return headers
+
+    @property
+    def client(self) -> httpx.Client:
+        """同步连接池，首次使用时创建"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(headers=self.headers, timeout=self._timeout, limits=self._limits)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """异步连接池，首次使用时创建"""
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = httpx.AsyncClient(
+                        headers=self.headers, timeout=self._timeout, limits=self._limits
+                    )
+        return self._async_client
+
+    def _retry_delay(self, attempt: int) -> float:
+        """指数退避 + 全抖动：在 [0, backoff * 2^attempt] 内随机取值，避免并发请求同时重试"""
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    def post(self, data: Dict[str, str]) -> httpx.Response:
+        """发送查询请求，临时故障时自动重试"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.post(self.url, data=data)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                logger.warning(f"明觉日志接口返回 {response.status_code}，第 {attempt + 1} 次重试")
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"明觉日志接口请求失败: {str(e)}，第 {attempt + 1} 次重试")
+            time.sleep(self._retry_delay(attempt))
+
+    async def apost(self, data: Dict[str, str]) -> httpx.Response:
+        """post 的异步版本"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.async_client.post(self.url, data=data)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                logger.warning(f"明觉日志接口返回 {response.status_code}，第 {attempt + 1} 次重试")
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"明觉日志接口请求失败: {str(e)}，第 {attempt + 1} 次重试")
+            await asyncio.sleep(self._retry_delay(attempt))
+
+    def close(self) -> None:
+        """关闭同步连接池"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        """关闭全部连接池"""
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+_mjlog_client: Optional[MjLogClient] = None
+_mjlog_client_lock = threading.Lock()
+
+
+def get_mjlog_client() -> MjLogClient:
+    """获取进程内共享的明觉日志客户端"""
+    global _mjlog_client
+    if _mjlog_client is None:
+        with _mjlog_client_lock:
+            if _mjlog_client is None:
+                _mjlog_client = MjLogClient()
+    return _mjlog_client
+
+
+async def close_mjlog_client() -> None:
+    """关闭共享明觉日志客户端的连接池（应用关闭时调用）"""
+    global _mjlog_client
+    with _mjlog_client_lock:
+        client, _mjlog_client = _mjlog_client, None
+    if client is not None:
+        await client.aclose()
@@ -1,73 +1,32 @@
-import os
-import re
 import json
-import requests
-from typing import Annotated, List, Dict, Any, Optional, Tuple
+import asyncio
+import httpx
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Annotated, Callable, List, Dict, Any, Optional
 
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.core.logging import logger
+from app.tools.identifier_extractor import identifier_extractor
+from app.tools.MjLogs.log_index import get_log_index, normalize_timestamp
+from app.tools.MjLogs.log_pager import STOP_END, STOP_MAX_ROWS, LogPager
+from app.tools.MjLogs.log_row import LogPage, LogRow
+from app.tools.MjLogs.log_templates import LogTemplateMiner, strip_ansi
+from app.tools.MjLogs.mj_log_client import get_mjlog_client
+
 # 加载环境变量
 load_dotenv()
+
+# 日志查询成功时工具结果的前缀
+LOG_QUERY_SUCCESS_PREFIX = "系统日志查询成功，返回结果："
+
 def extract_user_identifiers(text: str) -> Dict[str, str]:
     """
     从文本中提取用户标识符，并按类型分类
     返回格式: {"user_id": "xxx", "id_number": "xxx", "phone": "xxx"}
     """
-    identifiers = {}
-    
-    # 提取用户ID (通常是数字，可能前缀为"用户id:"等)
-    user_id_patterns = [
-        r'用户[iI][dD][：:]\s*(\d+)',
-        r'用户标识符[：:]\s*(\d+)',
-        r'[uU]ser[_\s]*[iI][dD][：:]\s*(\d+)',
-        r'用户\s*(?:编号|号码)?[：:]\s*(\d+)'
-    ]
-    
-    for pattern in user_id_patterns:
-        match = re.search(pattern, text)
-        if match:
-            identifiers["user_id"] = match.group(1).strip()
-            break
-    
-    # 提取证件号 (通常是18位)
-    id_patterns = [
-        r'证件号[码]?[：:]\s*([0-9X]{18})',
-        r'身份证[：:]\s*([0-9X]{18})',
-        r'[iI][dD][：:]\s*([0-9X]{18})'
-    ]
-    
-    for pattern in id_patterns:
-        match = re.search(pattern, text)
-        if match:
-            identifiers["id_number"] = match.group(1).strip()
-            break
-    
-    # 提取手机号 (11位数字，通常以1开头)
-    phone_patterns = [
-        r'手机号[码]?[：:]\s*(1[3-9]\d{9})',
-        r'电话[：:]\s*(1[3-9]\d{9})',
-        r'联系方式[：:]\s*(1[3-9]\d{9})'
-    ]
-    
-    for pattern in phone_patterns:
-        match = re.search(pattern, text)
-        if match:
-            identifiers["phone"] = match.group(1).strip()
-            break
-    
-    # 如果上面的模式都没有匹配到，尝试更宽松的模式
-    if not identifiers:
-        # 尝试找任何看起来像用户ID的长数字 (至少10位)
-        general_id_match = re.search(r'\b(\d{10,})\b', text)
-        if general_id_match:
-            identifiers["user_id"] = general_id_match.group(1)
-        
-        # 尝试找任何看起来像手机号的11位数字
-        general_phone_match = re.search(r'\b(1[3-9]\d{9})\b', text)
-        if general_phone_match:
-            identifiers["phone"] = general_phone_match.group(1)
-    
-    return identifiers
+    return identifier_extractor.scan(text).user_identifiers()
 
 def select_best_identifier(identifiers: Dict[str, str]) -> Optional[str]:
     """根据优先级选择最佳的用户标识符: user_id > id_number > phone"""
@@ -81,20 +40,14 @@ def select_best_identifier(identifiers: Dict[str, str]) -> Optional[str]:
 
 def extract_trace_ids(log_content: str) -> List[str]:
     """从日志内容中提取traceID"""
-    # 针对格式: xxxxx:sso:traceID:xxxxx
-    trace_pattern = r':[a-z]{3}:([0-9a-f]{12}):'
-    matches = re.findall(trace_pattern, log_content)
-    
-    if not matches:
-        # 尝试备用模式，针对其他可能的格式
-        fallback_pattern = r'[0-9a-f]{8}(?:[0-9a-f]{4}){3}[0-9a-f]{12}|[0-9a-f]{12}'
-        fallback_matches = re.findall(fallback_pattern, log_content)
-        return list(set(fallback_matches))
-    
-    return list(set(matches))  # 去重
+    return identifier_extractor.trace_ids(log_content)
 
 def parse_log_response(response: str) -> List[Dict[str, Any]]:
-    """解析日志查询结果，提取日志记录"""
+    """
+    从字符串形式的日志查询结果中提取日志记录
+
+    兼容以文本形式保存或传递的旧查询结果；查询流程内部直接使用 query_system_logs 返回的 LogPage，不经过此函数。
+    """
     try:
         # 首先判断是否已经是字典类型(已解析的JSON)
         if isinstance(response, dict):
@@ -108,8 +61,8 @@ def parse_log_response(response: str) -> List[Dict[str, Any]]:
         # 如果是字符串类型，尝试提取并解析JSON
         if isinstance(response, str):
             # 检查是否是API响应格式
-            if "系统日志查询成功，返回结果：" in response:
-                json_start = response.find("系统日志查询成功，返回结果：") + len("系统日志查询成功，返回结果：")
+            if LOG_QUERY_SUCCESS_PREFIX in response:
+                json_start = response.find(LOG_QUERY_SUCCESS_PREFIX) + len(LOG_QUERY_SUCCESS_PREFIX)
                 try:
                     # 尝试解析JSON部分
                     json_data = json.loads(response[json_start:])
@@ -175,64 +128,180 @@ def parse_log_response(response: str) -> List[Dict[str, Any]]:
     print("无法解析日志响应")
     return []
 
-def query_system_logs(params: Annotated[str, "查询系统日志的参数"]) -> str:
-    """从系统日志中获取相关信息，使用POST请求模拟curl查询日志。"""
-    # 清理参数 - 去除额外空格、引号等
-    cleaned_params = params.strip().strip('"\'').strip()
-    
-    # 设置请求的 URL
-    url = "https://web.rong-data.com/mjlog/elasticsearch/log/list"
-
-    cookie = os.getenv("cookie")
-    # 设置请求头
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:136.0) Gecko/20100101 Firefox/136.0",
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
-        "Accept-Encoding": "gzip, deflate, br, zstd",
-        "Content-Type": "application/x-www-form-urlencoded",
-        "X-Requested-With": "XMLHttpRequest",
-        "Origin": "https://web.rong-data.com",
-        "Connection": "keep-alive",
-        "Referer": "https://web.rong-data.com/mjlog/elasticsearch/log",
-        "Cookie": cookie,
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "same-origin",
-        "Priority": "u=0"
-    }
-    
-    print(f"查询参数: {cleaned_params}")
-    
+def _clean_params(params: str) -> str:
+    """清理参数 - 去除额外空格、引号等"""
+    return params.strip().strip('"\'').strip()
+
+
+def _build_log_request(params: str, page_num: int = 1,
+                       page_size: int = settings.MJLOG_PAGE_SIZE) -> Dict[str, str]:
+    """构造日志查询的请求体（请求头由 MjLogClient 统一维护）"""
+    cleaned_params = _clean_params(params)
+
+    logger.debug(f"查询日志参数: {cleaned_params}，第 {page_num} 页")
+
     # 设置请求体
-    data = {
+    return {
         "doc_id": "",
         "doc_id_new": "",
         "timestamp": "",
         "ip": "",
-        "projects": "uum-api",
-        "project": "uum-api",
-        "beginTime": "2025-03-28 00:00:00",
-        "endTime": "2025-03-29 23:59:59",  # 扩大时间范围以提高找到日志的概率
+        "projects": settings.MJLOG_PROJECT,
+        "project": settings.MJLOG_PROJECT,
+        "beginTime": settings.MJLOG_BEGIN_TIME,
+        "endTime": settings.MJLOG_END_TIME,  # 扩大时间范围以提高找到日志的概率
         "level": "",
         "message": cleaned_params,
         "tranceId": "and",
         "sort": "asc",
-        "pageSize": "100",
-        "pageNum": "1",
+        "pageSize": str(page_size),
+        "pageNum": str(page_num),
         "orderByColumn": "",
         "isAsc": "asc"
     }
 
-    # 发送POST请求
+
+def _parse_log_page(response: httpx.Response) -> LogPage:
+    """将接口响应直接解析为 LogPage（响应体只解析一次，不经过字符串中转）"""
+    if response.status_code != 200:
+        return LogPage(error=f"查询失败，状态码：{response.status_code},{response.text}")
+    try:
+        payload = response.json()
+    except ValueError:
+        return LogPage(error=f"查询失败，响应不是有效的JSON：{response.text[:200]}")
+    return LogPage.from_payload(payload)
+
+
+def query_system_logs(params: Annotated[str, "查询系统日志的参数"], page_num: int = 1,
+                      page_size: int = settings.MJLOG_PAGE_SIZE) -> LogPage:
+    """从系统日志中获取相关信息，通过共享连接池的 MjLogClient 发送 POST 请求查询一页日志。"""
+    try:
+        response = get_mjlog_client().post(_build_log_request(params, page_num, page_size))
+        return _parse_log_page(response)
+    except httpx.HTTPError as e:
+        return LogPage(error=f"请求发生错误: {str(e)}")
+
+
+async def aquery_system_logs(params: Annotated[str, "查询系统日志的参数"], page_num: int = 1,
+                             page_size: int = settings.MJLOG_PAGE_SIZE) -> LogPage:
+    """query_system_logs 的异步版本，等待日志接口响应时不阻塞事件循环。"""
     try:
-        response = requests.post(url, headers=headers, data=data)
-        if response.status_code == 200 and response.json().get("code") == 0:
-            return f"系统日志查询成功，返回结果：{response.json()}"
-        else:
-            return f"查询失败，状态码：{response.status_code},{response.text}"
-    except requests.exceptions.RequestException as e:
-        return f"请求发生错误: {str(e)}"
+        response = await get_mjlog_client().apost(_build_log_request(params, page_num, page_size))
+        return _parse_log_page(response)
+    except httpx.HTTPError as e:
+        return LogPage(error=f"请求发生错误: {str(e)}")
+
+
+def _lookup_index(term: str) -> Optional[List[LogRow]]:
+    """在本地日志索引中查找，时间窗口未被覆盖或索引未启用时返回 None"""
+    index = get_log_index()
+    if index is None:
+        return None
+    return index.lookup(term, settings.MJLOG_PROJECT, settings.MJLOG_BEGIN_TIME, settings.MJLOG_END_TIME)
+
+
+def log_pager(params: str, stop_when: Optional[Callable[[LogRow], bool]] = None,
+              page_size: int = settings.MJLOG_PAGE_SIZE, **limits) -> LogPager:
+    """
+    分页读取一个查询的全部日志，同步、异步迭代均可：
+        for row in log_pager(term): ...
+        async for row in log_pager(term): ...
+    条数、页数和时间预算默认取 MJLOG_* 配置，可通过关键字参数覆盖
+    """
+    term = _clean_params(params)
+    return LogPager(
+        fetch_page=lambda page_num: query_system_logs(term, page_num, page_size),
+        afetch_page=lambda page_num: aquery_system_logs(term, page_num, page_size),
+        page_size=page_size, stop_when=stop_when, **limits
+    )
+
+
+def _ingest_index(term: str, rows: List[LogRow], pager: LogPager, is_trace: bool) -> List[LogRow]:
+    """
+    远程查询结束后，把日志写入本地索引；返回本次查询的日志行
+    只有取完全部结果或按条数预算截断时才写入：超时、条件提前停止或中途失败的结果不完整，不能标记为已覆盖
+    """
+    if pager.error:
+        logger.warning(f"分页查询日志出错({term}): {pager.error}")
+    if pager.stop_reason not in (STOP_END, STOP_MAX_ROWS):
+        return rows
+    index = get_log_index()
+    if index is not None:
+        index.ingest(term, rows, settings.MJLOG_PROJECT, settings.MJLOG_BEGIN_TIME, settings.MJLOG_END_TIME,
+                     trace_id=term if is_trace else None)
+    return rows
+
+
+def fetch_logs(params: str, is_trace: bool = False,
+               stop_when: Optional[Callable[[LogRow], bool]] = None) -> List[LogRow]:
+    """查询日志：已索引的时间窗口直接从本地索引返回，否则分页请求日志代理并写入索引"""
+    term = _clean_params(params)
+    cached = _lookup_index(term)
+    if cached is not None:
+        return cached
+    pager = log_pager(term, stop_when)
+    return _ingest_index(term, list(pager), pager, is_trace)
+
+
+async def afetch_logs(params: str, is_trace: bool = False,
+                      stop_when: Optional[Callable[[LogRow], bool]] = None) -> List[LogRow]:
+    """fetch_logs 的异步版本，本地索引的读写为同步 SQLite 操作，在线程中执行"""
+    term = _clean_params(params)
+    cached = await asyncio.to_thread(_lookup_index, term)
+    if cached is not None:
+        return cached
+    pager = log_pager(term, stop_when)
+    rows = [row async for row in pager]
+    return await asyncio.to_thread(_ingest_index, term, rows, pager, is_trace)
+
+
+def _extract_cascade_trace_ids(logs: List[LogRow]) -> List[str]:
+    """从首轮日志中提取用于级联查询的traceID（按出现顺序去重，最多 MJLOG_MAX_TRACE_IDS 个）"""
+    trace_ids = [
+        trace_id
+        for row_trace_ids in identifier_extractor.trace_ids_many(log.message for log in logs if log.message is not None)
+        for trace_id in row_trace_ids
+    ]
+
+    # 去重并限制级联查询的扇出数量
+    trace_ids = list(dict.fromkeys(trace_ids))[:settings.MJLOG_MAX_TRACE_IDS]
+    logger.info(f"提取到的traceID: {trace_ids}")
+    return trace_ids
+
+
+class _LogCollector:
+    """按日志内容增量去重合并查询结果，达到日志预算后提示停止级联查询"""
+
+    def __init__(self, budget: int):
+        self.budget = budget  # 0 表示不限制
+        self.logs: List[LogRow] = []
+        self._seen_messages = set()
+
+    def add(self, logs: List[LogRow]) -> None:
+        for log in logs:
+            if self.exhausted:
+                return
+            msg = log.message
+            if msg is not None and msg not in self._seen_messages:
+                self._seen_messages.add(msg)
+                self.logs.append(log)
+
+    @property
+    def exhausted(self) -> bool:
+        return 0 < self.budget <= len(self.logs)
+
+
+def _build_log_results(unique_logs: List[LogRow], identifiers: Dict[str, str],
+                       best_identifier: str, trace_ids: List[str]) -> Dict[str, Any]:
+    """组装查询结果"""
+    return {
+        "status": "success" if unique_logs else "no_logs",
+        "message": f"查询完成，共找到 {len(unique_logs)} 条日志记录" if unique_logs else "未找到任何相关日志，请使用其他工具",
+        "logs": unique_logs,
+        "identifiers": identifiers,
+        "selected_identifier": best_identifier,
+        "trace_ids": trace_ids
+    }
 
 
 def query_logs_and_get_results(ticket_text: str) -> Dict[str, Any]:
@@ -240,7 +309,7 @@ def query_logs_and_get_results(ticket_text: str) -> Dict[str, Any]:
     处理完整的日志查询流程：
     1. 提取和选择用户标识符
     2. 使用标识符查询日志
-    3. 提取traceID并进行级联查询（最多20个）
+    3. 提取traceID并行级联查询（扇出数、并发数和日志预算见 MJLOG_* 配置）
     4. 格式化并返回结果
     """
     # 1. 提取用户标识符
@@ -255,55 +324,75 @@ def query_logs_and_get_results(ticket_text: str) -> Dict[str, Any]:
         }
 
     # 2. 使用标识符查询日志
-    print(f"使用标识符查询日志: {best_identifier}")
-    log_response = query_system_logs(best_identifier)
-    logs = parse_log_response(log_response)
+    logger.info(f"使用标识符查询日志: {best_identifier}")
+    logs = fetch_logs(best_identifier)
 
-    all_logs = logs.copy()  # 保存所有日志的副本
+    collector = _LogCollector(settings.MJLOG_LOG_BUDGET)
+    collector.add(logs)
     trace_ids = []
 
-    # 3. 从日志中提取traceID并进行级联查询（最多20个）
-    if logs:
-        # 提取所有traceID
-        for log in logs:
-            if "message" in log:
-                trace_ids.extend(extract_trace_ids(log["message"]))
+    # 3. 从日志中提取traceID，在线程池中并行级联查询，结果到达即合并，预算用尽后不再等待剩余请求
+    if logs and not collector.exhausted:
+        trace_ids = _extract_cascade_trace_ids(logs)
 
-        # 去重并限制最多20个traceID
-        trace_ids = list(set(trace_ids))[:20]
-        print(f"提取到的traceID: {trace_ids}")
+        if trace_ids:
+            executor = ThreadPoolExecutor(max_workers=settings.MJLOG_CASCADE_CONCURRENCY)
+            try:
+                futures = [executor.submit(fetch_logs, trace_id, True) for trace_id in trace_ids]
+                for future in as_completed(futures):
+                    collector.add(future.result())
+                    if collector.exhausted:
+                        logger.info(f"已达到日志预算 {collector.budget} 条，停止级联查询")
+                        break
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
 
-        # 使用每个traceID进行查询
-        for trace_id in trace_ids:
-            trace_response = query_system_logs(trace_id)
-            trace_logs = parse_log_response(trace_response)
+    # 4. 格式化并返回结果
+    return format_log_results(_build_log_results(collector.logs, identifiers, best_identifier, trace_ids))
 
-            # 添加新的日志记录
-            all_logs.extend(trace_logs)
 
-    # 4. 去重并返回结果
-    unique_logs = []
-    seen_messages = set()
+async def aquery_logs_and_get_results(ticket_text: str) -> Dict[str, Any]:
+    """query_logs_and_get_results 的异步版本，级联查询以有限并发的协程执行。"""
+    identifiers = extract_user_identifiers(ticket_text)
+    best_identifier = select_best_identifier(identifiers)
 
-    for log in all_logs:
-        if "message" in log:
-            msg = log["message"]
-            if msg not in seen_messages:
-                seen_messages.add(msg)
-                unique_logs.append(log)
+    if not best_identifier:
+        return {
+            "status": "error",
+            "message": "未从工单中提取到有效的用户标识符",
+            "logs": []
+        }
 
-    all_logs = {
-        "status": "success" if unique_logs else "no_logs",
-        "message": f"查询完成，共找到 {len(unique_logs)} 条日志记录" if unique_logs else "未找到任何相关日志，请使用其他工具",
-        "logs": unique_logs,
-        "identifiers": identifiers,
-        "selected_identifier": best_identifier,
-        "trace_ids": trace_ids
-    }
+    logger.info(f"使用标识符查询日志: {best_identifier}")
+    logs = await afetch_logs(best_identifier)
+
+    collector = _LogCollector(settings.MJLOG_LOG_BUDGET)
+    collector.add(logs)
+    trace_ids = []
 
-    # 5. 格式化并返回结果
-    return format_log_results(all_logs);
+    if logs and not collector.exhausted:
+        trace_ids = _extract_cascade_trace_ids(logs)
+        semaphore = asyncio.Semaphore(settings.MJLOG_CASCADE_CONCURRENCY)
 
+        async def query_trace(trace_id: str) -> List[LogRow]:
+            async with semaphore:
+                return await afetch_logs(trace_id, is_trace=True)
+
+        tasks = [asyncio.create_task(query_trace(trace_id)) for trace_id in trace_ids]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                collector.add(await finished)
+                if collector.exhausted:
+                    logger.info(f"已达到日志预算 {collector.budget} 条，停止级联查询")
+                    break
+        finally:
+            # 提前结束或出错时取消尚未完成的查询，并等待其真正结束，避免请求在后台继续执行
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return format_log_results(_build_log_results(collector.logs, identifiers, best_identifier, trace_ids))
 
 
 def format_log_results(results: Dict[str, Any]) -> str:
@@ -321,13 +410,17 @@ def format_log_results(results: Dict[str, Any]) -> str:
         output.append(f"发现的 traceID: {', '.join(results['trace_ids'])}")
     
     output.append("")
+    if settings.MJLOG_TEMPLATE_ENABLED:
+        output.extend(_format_log_templates(results["logs"]))
+        return "\n".join(output)
+
     for i, log in enumerate(results["logs"], 1):
         # 提取时间戳和日志内容
-        timestamp = log.get("timestamp", "未知时间")
-        message = log.get("message", "无内容")
+        timestamp = log.timestamp or "未知时间"
+        message = log.message or "无内容"
         
         # 移除可能的ANSI颜色代码
-        message = re.sub(r'\033\[[0-9;]+m', '', message)
+        message = strip_ansi(message)
         
         # 格式化输出 - 显示完整日志内容
         # output.append(f"{i}. [{timestamp}] {message}")
@@ -335,6 +428,31 @@ def format_log_results(results: Dict[str, Any]) -> str:
 
     return "\n".join(output)
 
+
+def _format_log_templates(logs: List[LogRow]) -> List[str]:
+    """
+    按模板聚合日志：只差时间、ID、traceID 的日志归为一个模板，输出出现次数、首末时间和参数示例；
+    只出现一次的日志原样输出
+    """
+    miner = LogTemplateMiner(similarity_threshold=settings.MJLOG_TEMPLATE_SIMILARITY)
+    first_messages = {}
+    for log in logs:
+        message = strip_ansi(log.message or "无内容")
+        cluster = miner.add(message, normalize_timestamp(log.timestamp))
+        first_messages.setdefault(id(cluster), message)
+
+    output = [f"日志模板：共 {miner.total} 条日志，归纳为 {len(miner.clusters)} 个模板"]
+    for cluster in miner.clusters:
+        if cluster.count == 1:
+            output.append(first_messages[id(cluster)])
+            continue
+        time_range = f"{cluster.first_timestamp or '未知时间'} ~ {cluster.last_timestamp or '未知时间'}"
+        output.append(f"[{cluster.count}次] {time_range} | {cluster.template_text}")
+        samples = [", ".join(params) for params in cluster.sample_params() if params]
+        if samples:
+            output.append(f"    参数示例: {' | '.join(samples)}")
+    return output
+
 # 示例使用
 if __name__ == "__main__":
     # 测试用例
@@ -350,6 +468,5 @@ if __name__ == "__main__":
     请获取相关信息并给出分析结果。
     """
     
-    results = query_logs_and_get_results(ticket)
-    formatted_output = format_log_results(results)
+    formatted_output = query_logs_and_get_results(ticket)
     print(formatted_output) 
\ No newline at end of file
@@ -0,0 +1,254 @@
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# 积分明细的列：(表头, 属性名)
+LEDGER_COLUMNS = [
+    ("序号", "seq"),
+    ("积分池类型", "pool_type"),
+    ("积分科目编号", "subject_no"),
+    ("积分科目名称", "subject_name"),
+    ("积分记录卡号", "record_card"),
+    ("交易卡号", "trade_card"),
+    ("积分变动值", "change"),
+    ("积分余额", "balance"),
+    ("积分有效期起", "valid_from"),
+    ("积分有效期止", "valid_to"),
+    ("交易类型", "trade_type"),
+    ("交易描述", "description"),
+    ("交易日期", "trade_date"),
+    ("交易时间", "trade_time"),
+    ("活动名称", "activity"),
+    ("交易金额", "amount"),
+    ("商户名称", "merchant"),
+]
+_INT_COLUMNS = {"seq", "change", "balance", "valid_from", "valid_to", "trade_date", "trade_time"}
+# 原文中定宽补零的列，按整数存储以便比较，输出时还原宽度（如交易时间 093002）
+_FIXED_WIDTH_COLUMNS = {"valid_from": 8, "valid_to": 8, "trade_date": 8, "trade_time": 6}
+_FLOAT_COLUMNS = {"amount"}
+
+# 明细接口返回的文本以单个空格分隔字段、空字段只留下空格，多行首尾相接。按字段格式逐行匹配：
+# 交易描述、活动名称可能为空或带括号，以其后的 日期 时间、金额 定界；商户名称之后紧跟下一行的 序号 积分池类型
+_ROW_PATTERN = re.compile(
+    r'(?P<seq>\d+) (?P<pool_type>\S+) (?P<subject_no>\S+) (?P<subject_name>\S+) '
+    r'(?P<record_card>\S+) (?P<trade_card>\S+) (?P<change>-?\d+) (?P<balance>-?\d+)\s+'
+    r'(?:(?P<valid_from>\d{8})\s+)?(?P<valid_to>\d{8})\s+(?P<trade_type>\S+) (?P<description>.*?)\s*'
+    r'(?P<trade_date>\d{8}) (?P<trade_time>\d{6})\s+(?P<activity>.*?)\s*(?P<amount>-?\d+\.\d{2})'
+    r'(?: (?P<merchant>\S+))?(?=\s+\d+ \S+ \S+ \S+ \S+ \S+ -?\d+ |\s*$)'
+)
+
+EXCHANGE = "兑换"
+REFUND = "退货"
+
+
+def _to_date(value: Optional[str]) -> Optional[int]:
+    """YYYY-MM-DD 或 YYYYMMDD 转为 YYYYMMDD 整数"""
+    if not value:
+        return None
+    return int(value.replace("-", ""))
+
+
+def _card_mask(column: np.ndarray, card_no: str) -> np.ndarray:
+    """
+    卡号匹配：明细中的卡号已脱敏(前4后4)，传入完整卡号时按前4位和后4位比较，传入脱敏卡号时直接比较
+    """
+    if "*" in card_no or len(card_no) < 8:
+        return column == card_no
+    return np.char.startswith(column, card_no[:4]) & np.char.endswith(column, card_no[-4:])
+
+
+class PointsLedger:
+    """
+    按列存储的积分明细
+
+    每列一个 numpy 数组(数值列为整数/浮点，文本列为定长字符串)，筛选通过布尔掩码一次完成，
+    汇总使用 np.unique/np.bincount，千行级的明细也只把汇总和少量示例行交给大模型。
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    @classmethod
+    def parse(cls, text: str) -> "PointsLedger":
+        """解析明细接口返回的文本（可带表头）"""
+        return cls.from_records([match.groupdict() for match in _ROW_PATTERN.finditer(text)])
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "PointsLedger":
+        """由逐行的字典(键为 LEDGER_COLUMNS 中的属性名)构建，缺失或为空的字段按 0/空串处理"""
+        columns = {}
+        for _, name in LEDGER_COLUMNS:
+            values = [record.get(name) for record in records]
+            if name in _INT_COLUMNS:
+                columns[name] = np.array([int(v) if v not in (None, "") else 0 for v in values], dtype=np.int64)
+            elif name in _FLOAT_COLUMNS:
+                columns[name] = np.array([float(v) if v not in (None, "") else 0.0 for v in values],
+                                         dtype=np.float64)
+            else:
+                columns[name] = np.array(["" if v is None else str(v) for v in values], dtype=str)
+        return cls(columns)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """逐行转为字典（Python 原生类型），用于持久化"""
+        names = [name for _, name in LEDGER_COLUMNS]
+        return [dict(zip(names, values)) for values in zip(*(self.columns[name].tolist() for name in names))]
+
+    def __len__(self) -> int:
+        return len(self.columns["seq"])
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """交易日期时间，YYYYMMDDhhmmss 整数，可直接比较先后"""
+        return self.trade_date * 1_000_000 + self.trade_time
+
+    def take(self, mask: np.ndarray) -> "PointsLedger":
+        return PointsLedger({name: column[mask] for name, column in self.columns.items()})
+
+    def filter(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+               card_no: Optional[str] = None, subject_no: Optional[str] = None) -> "PointsLedger":
+        """按交易日期范围(含首尾)、卡号(积分记录卡号或交易卡号)、积分科目编号筛选"""
+        mask = np.ones(len(self), dtype=bool)
+        start, end = _to_date(start_date), _to_date(end_date)
+        if start is not None:
+            mask &= self.trade_date >= start
+        if end is not None:
+            mask &= self.trade_date <= end
+        if card_no:
+            mask &= _card_mask(self.record_card, card_no) | _card_mask(self.trade_card, card_no)
+        if subject_no:
+            mask &= self.subject_no == subject_no
+        return self.take(mask)
+
+    def subject_numbers(self) -> List[str]:
+        """明细中出现的全部积分科目编号，去重后排序"""
+        return sorted(set(self.subject_no.tolist()))
+
+    def net_change_by_subject(self) -> List[Dict[str, Any]]:
+        """按积分科目汇总：净变动、增加、减少、笔数，以及最近一笔交易后的余额和有效期止"""
+        if not len(self):
+            return []
+        subjects, inverse = np.unique(self.subject_no, return_inverse=True)
+        change = self.change.astype(np.float64)
+        net = np.bincount(inverse, weights=change)
+        gained = np.bincount(inverse, weights=np.where(change > 0, change, 0))
+        spent = np.bincount(inverse, weights=np.where(change < 0, -change, 0))
+        counts = np.bincount(inverse)
+        timestamps = self.timestamps
+        summary = []
+        for i, subject in enumerate(subjects):
+            rows = np.flatnonzero(inverse == i)
+            latest = rows[np.argmax(timestamps[rows])]
+            summary.append({
+                "subject_no": str(subject),
+                "subject_name": str(self.subject_name[latest]),
+                "net_change": int(net[i]),
+                "gained": int(gained[i]),
+                "spent": int(spent[i]),
+                "rows": int(counts[i]),
+                "latest_balance": int(self.balance[latest]),
+                "valid_to": int(self.valid_to[rows].max()),
+            })
+        return summary
+
+    def count_by_type(self) -> Dict[str, int]:
+        """各交易类型的笔数"""
+        types, counts = np.unique(self.trade_type, return_counts=True)
+        return {str(t): int(c) for t, c in zip(types, counts)}
+
+    def exchange_refund_pairs(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        匹配兑换与退货：同一积分科目、同一交易卡号、积分数相同，按时间先后把每笔退货配给其之前最近的未配对兑换
+        返回 {"pairs": [...], "unmatched_exchanges": [...], "unmatched_refunds": [...]}，元素为行序号
+        """
+        timestamps = self.timestamps
+        exchanges = np.flatnonzero(self.trade_type == EXCHANGE)
+        refunds = np.flatnonzero(self.trade_type == REFUND)
+        pending: Dict[tuple, List[int]] = {}
+        events = sorted([(timestamps[i], 0, i) for i in exchanges] + [(timestamps[i], 1, i) for i in refunds])
+        pairs, unmatched_refunds = [], []
+        for _, is_refund, i in events:
+            key = (self.subject_no[i], self.trade_card[i], abs(int(self.change[i])))
+            if not is_refund:
+                pending.setdefault(key, []).append(i)
+            elif pending.get(key):
+                j = pending[key].pop()
+                pairs.append({"exchange_seq": int(self.seq[j]), "refund_seq": int(self.seq[i]),
+                              "points": key[2], "exchange_time": int(timestamps[j]),
+                              "refund_time": int(timestamps[i])})
+            else:
+                unmatched_refunds.append(int(self.seq[i]))
+        unmatched_exchanges = sorted(int(self.seq[j]) for rows in pending.values() for j in rows)
+        return {"pairs": pairs, "unmatched_exchanges": unmatched_exchanges, "unmatched_refunds": unmatched_refunds}
+
+    def exemplar_indices(self, limit: int) -> List[int]:
+        """示例行：未配对的兑换/退货优先，其次每种交易类型最近的一笔，按时间倒序"""
+        if limit <= 0 or not len(self):
+            return []
+        matched = self.exchange_refund_pairs()
+        unmatched = set(matched["unmatched_exchanges"]) | set(matched["unmatched_refunds"])
+        order = np.argsort(-self.timestamps, kind="stable")
+        chosen = [i for i in order if int(self.seq[i]) in unmatched]
+        seen_types = set()
+        for i in order:
+            trade_type = self.trade_type[i]
+            if trade_type not in seen_types:
+                seen_types.add(trade_type)
+                if i not in chosen:
+                    chosen.append(i)
+        return sorted(chosen[:limit], key=lambda i: -self.timestamps[i])
+
+    def _cell(self, name: str, i: int) -> str:
+        value = self.columns[name][i]
+        if name in _FLOAT_COLUMNS:
+            return f"{value:.2f}"
+        if name in ("valid_from", "valid_to") and value == 0:  # 原文为空
+            return ""
+        if name in _FIXED_WIDTH_COLUMNS:
+            return f"{value:0{_FIXED_WIDTH_COLUMNS[name]}d}"
+        return str(value)
+
+    def format_rows(self, indices: List[int]) -> str:
+        lines = [" | ".join(title for title, _ in LEDGER_COLUMNS)]
+        for i in indices:
+            lines.append(" | ".join(self._cell(name, i) for _, name in LEDGER_COLUMNS))
+        return "\n".join(lines)
+
+    def summarize(self, exemplar_rows: int = 5) -> str:
+        """生成交给大模型的摘要：各科目净变动和余额、交易类型笔数、兑换/退货配对情况及少量示例行"""
+        if not len(self):
+            return "没有符合条件的积分明细"
+        timestamps = self.timestamps
+        lines = [f"共 {len(self)} 笔积分明细，时间 {timestamps.min()} ~ {timestamps.max()}"]
+
+        lines.append("各积分科目：")
+        for item in self.net_change_by_subject():
+            lines.append(
+                f"- {item['subject_no']} {item['subject_name']}：{item['rows']} 笔，增加 {item['gained']}，"
+                f"减少 {item['spent']}，净变动 {item['net_change']:+d}，最近余额 {item['latest_balance']}，"
+                f"有效期止 {item['valid_to']}"
+            )
+
+        lines.append("交易类型笔数：" + "，".join(f"{t} {c}" for t, c in self.count_by_type().items()))
+
+        matched = self.exchange_refund_pairs()
+        lines.append(
+            f"兑换/退货：已配对 {len(matched['pairs'])} 组，未退货的兑换 {len(matched['unmatched_exchanges'])} 笔"
+            f"{matched['unmatched_exchanges'] or ''}，无对应兑换的退货 {len(matched['unmatched_refunds'])} 笔"
+            f"{matched['unmatched_refunds'] or ''}"
+        )
+        for pair in matched["pairs"]:
+            lines.append(f"- 兑换#{pair['exchange_seq']}({pair['exchange_time']}) -> "
+                         f"退货#{pair['refund_seq']}({pair['refund_time']})，{pair['points']} 积分")
+
+        indices = self.exemplar_indices(exemplar_rows)
+        if indices:
+            lines.append(f"示例明细（{len(indices)} 笔）：")
+            lines.append(self.format_rows(indices))
+        return "\n".join(lines)
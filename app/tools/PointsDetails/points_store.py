@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.tools.PointsDetails.points_ledger import PointsLedger
+
+_ONE_DAY = timedelta(days=1)
+
+
+def _day(value: str) -> date:
+    """'YYYY-MM-DD' 转为 date"""
+    return date.fromisoformat(value)
+
+
+def _day_int(value: date) -> int:
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def _int_day(value: int) -> date:
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+
+class PointsStore:
+    """
+    积分明细本地存储（SQLite）
+
+    以 (卡号, 银行号, 交易日期) 复合索引保存从上游取到的明细行，并记录每张卡已取过的日期区间。
+    查询时只向上游请求尚未覆盖的日期缺口，补齐后按索引范围扫描返回；今天及以后的日期明细仍可能增加，
+    不记为已覆盖。明细行和覆盖区间按写入时间过期。
+    """
+
+    def __init__(self, path: str = settings.POINTS_STORE_PATH, ttl: float = settings.POINTS_STORE_TTL):
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS points_rows (
+                    id INTEGER PRIMARY KEY,
+                    row_key TEXT UNIQUE,
+                    card_no TEXT,
+                    bank_code TEXT,
+                    trade_date INTEGER,
+                    trade_time INTEGER,
+                    raw TEXT,
+                    fetched_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_points_rows_card_date ON points_rows (card_no, bank_code, trade_date);
+                CREATE INDEX IF NOT EXISTS idx_points_rows_fetched_at ON points_rows (fetched_at);
+
+                CREATE TABLE IF NOT EXISTS points_coverage (
+                    card_no TEXT,
+                    bank_code TEXT,
+                    start_date INTEGER,
+                    end_date INTEGER,
+                    fetched_at REAL,
+                    PRIMARY KEY (card_no, bank_code, start_date, end_date)
+                );
+            """)
+
+    def missing_ranges(self, card_no: str, bank_code: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """[start_date, end_date] 中尚未从上游取过的日期区间，格式 [('YYYY-MM-DD', 'YYYY-MM-DD'), ...]"""
+        start, end = _day(start_date), _day(end_date)
+        with self._lock:
+            covered = self._conn.execute(
+                "SELECT start_date, end_date FROM points_coverage WHERE card_no = ? AND bank_code = ? "
+                "AND start_date <= ? AND end_date >= ? AND fetched_at >= ? ORDER BY start_date",
+                (card_no, bank_code, _day_int(end), _day_int(start), time.time() - self.ttl)
+            ).fetchall()
+
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in covered:
+            covered_start, covered_end = _int_day(covered_start), _int_day(covered_end)
+            if covered_start > cursor:
+                gaps.append((cursor, min(covered_start - _ONE_DAY, end)))
+            cursor = max(cursor, covered_end + _ONE_DAY)
+            if cursor > end:
+                break
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return [(gap_start.isoformat(), gap_end.isoformat()) for gap_start, gap_end in gaps]
+
+    def ingest(self, card_no: str, bank_code: str, start_date: str, end_date: str, ledger: PointsLedger) -> None:
+        """写入一次上游查询的明细，并记录该卡已覆盖的日期区间"""
+        now = time.time()
+        records = []
+        for record in ledger.records():
+            # 序号只是单次返回中的行号，不参与判重
+            identity = {k: v for k, v in record.items() if k != "seq"}
+            row_key = f"{card_no}\x1f{bank_code}\x1f{json.dumps(identity, ensure_ascii=False, sort_keys=True)}"
+            records.append((row_key, card_no, bank_code, record["trade_date"], record["trade_time"],
+                            json.dumps(record, ensure_ascii=False), now))
+
+        # 今天及以后的明细可能还会增加，不记为已覆盖
+        covered_end = min(_day(end_date), date.today() - _ONE_DAY)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO points_rows (row_key, card_no, bank_code, trade_date, trade_time, raw, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(row_key) DO UPDATE SET fetched_at = excluded.fetched_at",
+                records
+            )
+            if covered_end >= _day(start_date):
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO points_coverage (card_no, bank_code, start_date, end_date, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (card_no, bank_code, _day_int(_day(start_date)), _day_int(covered_end), now)
+                )
+        self._purge_expired()
+
+    def query(self, card_no: str, bank_code: str, start_date: str, end_date: str) -> PointsLedger:
+        """按索引范围读取该卡在日期区间内的明细，按交易时间倒序，序号重新编排"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT raw FROM points_rows WHERE card_no = ? AND bank_code = ? "
+                "AND trade_date BETWEEN ? AND ? AND fetched_at >= ? ORDER BY trade_date DESC, trade_time DESC, id",
+                (card_no, bank_code, _day_int(_day(start_date)), _day_int(_day(end_date)), time.time() - self.ttl)
+            ).fetchall()
+        records = [json.loads(raw) for (raw,) in rows]
+        for seq, record in enumerate(records, 1):
+            record["seq"] = seq
+        logger.debug(f"积分明细本地存储: {card_no} {start_date}~{end_date}，{len(records)} 笔")
+        return PointsLedger.from_records(records)
+
+    def _purge_expired(self) -> None:
+        """删除过期的明细行和覆盖区间（至多每分钟执行一次）"""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        expire_before = now - self.ttl
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM points_rows WHERE fetched_at < ?", (expire_before,))
+            self._conn.execute("DELETE FROM points_coverage WHERE fetched_at < ?", (expire_before,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_points_store: Optional[PointsStore] = None
+_points_store_lock = threading.Lock()
+
+
+def get_points_store() -> Optional[PointsStore]:
+    """获取进程内共享的积分明细本地存储；未启用时返回 None"""
+    global _points_store
+    if not settings.POINTS_STORE_ENABLED:
+        return None
+    if _points_store is None:
+        with _points_store_lock:
+            if _points_store is None:
+                _points_store = PointsStore()
+    return _points_store
+
+
+def close_points_store() -> None:
+    """关闭共享的积分明细本地存储（应用关闭时调用）"""
+    global _points_store
+    with _points_store_lock:
+        if _points_store is not None:
+            _points_store.close()
+            _points_store = None
@@ -0,0 +1,206 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 各类标识符的模式，同一类型内按优先级排列（靠前的模式优先于出现位置）。
+# 所有模式合并为一个正则，一次扫描即可取出全部标识符。每个分支都以确定的字符开头
+# （如 [uU]ser 拆成 user、User 两个分支），这样 re 可以根据首字符集合直接跳过无关位置。
+_LABELED_PATTERNS: List[Tuple[str, List[str]]] = [
+    # 用户ID (通常是数字，可能前缀为"用户id:"等)
+    ("user_id", [r'用户[iI][dD][：:]\s*(?P<{v}>\d+)']),
+    ("user_id", [r'用户标识符[：:]\s*(?P<{v}>\d+)']),
+    ("user_id", [r'user[_\s]*[iI][dD][：:]\s*(?P<{v}>\d+)', r'User[_\s]*[iI][dD][：:]\s*(?P<{v}>\d+)']),
+    ("user_id", [r'用户\s*(?:编号|号码)?[：:]\s*(?P<{v}>\d+)']),
+    # 证件号 (通常是18位)
+    ("id_number", [r'证件号[码]?[：:]\s*(?P<{v}>[0-9X]{{18}})']),
+    ("id_number", [r'身份证[：:]\s*(?P<{v}>[0-9X]{{18}})']),
+    ("id_number", [r'i[dD][：:]\s*(?P<{v}>[0-9X]{{18}})', r'I[dD][：:]\s*(?P<{v}>[0-9X]{{18}})']),
+    # 手机号 (11位数字，通常以1开头)
+    ("phone", [r'手机号[码]?[：:]\s*(?P<{v}>1[3-9]\d{{9}})']),
+    ("phone", [r'电话[：:]\s*(?P<{v}>1[3-9]\d{{9}})']),
+    ("phone", [r'联系方式[：:]\s*(?P<{v}>1[3-9]\d{{9}})']),
+    # 卡号
+    ("card_number", [r'卡号[：:]\s*(?P<{v}>\d{{12,}})']),
+    # 日志中的 traceID，格式: xxxxx:sso:traceID:xxxxx
+    ("trace_id", [r':[a-z]{{3}}:(?P<{v}>[0-9a-f]{{12}}):']),
+]
+# 没有标签的长数字（可能是用户ID、手机号、卡号），左边界在匹配后检查。{c} 为首字符
+_NUMBER_PATTERN = r'{c}(?P<{v}>\d{{9,}}(?!\w))'
+# 日志中的 traceID 单独扫描：先找带格式的，一行中没有时再用32位或12位十六进制串兜底
+_TRACE_PATTERN = re.compile(r':[a-z]{3}:(?P<trace>[0-9a-f]{12}):')
+_HEX_FALLBACK = re.compile(r'[0-9a-f]{32}|[0-9a-f]{12}')
+_PHONE = re.compile(r'1[3-9]\d{9}')
+_WORD_CHAR = re.compile(r'\w')
+# SQL 查询结果中第一行的第一列，如 "[(1763739554902667264, '张三', ...)]"
+_SQL_FIRST_COLUMN = re.compile(r'\(\s*(\d+)\s*,')
+# 批量扫描时分隔各段文本（不属于任何模式，标识符不会跨段匹配）
+_SEPARATOR = "\x00"
+
+
+def _build_pattern(kinds: Optional[Iterable[str]] = None,
+                   numbers: bool = True) -> Tuple["re.Pattern", Dict[str, Tuple[str, int]]]:
+    """合并 kinds 中各类型(默认全部)的模式，numbers 为 True 时加入无标签长数字"""
+    alternatives = []
+    groups: Dict[str, Tuple[str, int]] = {}
+    priorities: Dict[str, int] = {}
+    for kind, patterns in _LABELED_PATTERNS:
+        priority = priorities.get(kind, 0)
+        priorities[kind] = priority + 1
+        if kinds is not None and kind not in kinds:
+            continue
+        for i, pattern in enumerate(patterns):
+            name = f"{kind}_{priority}_{i}"
+            groups[name] = (kind, priority)
+            alternatives.append(pattern.format(v=name))
+    if numbers:
+        for c in "0123456789":
+            groups[f"number_{c}"] = ("number", 0)
+            alternatives.append(_NUMBER_PATTERN.format(c=c, v=f"number_{c}"))
+    return re.compile("|".join(alternatives)), groups
+
+
+_COMBINED, _GROUPS = _build_pattern()
+# 证件号的 "id:" 标签是 "用户id:"、"User ID:" 的后缀，合并扫描时会被用户ID的匹配吞掉，
+# 因此另行扫描一遍（旧实现逐个模式搜索，两者都能取到）。合并正则中仍保留证件号模式，避免其数字被当作无标签长数字
+_ID_NUMBERS, _ID_NUMBER_GROUPS = _build_pattern(kinds={"id_number"}, numbers=False)
+
+
+class Extraction:
+    """一段文本中的全部标识符，各列表按 模式优先级、出现位置 排序，未去重"""
+
+    __slots__ = ("user_ids", "id_numbers", "phones", "card_numbers", "trace_ids", "numbers")
+
+    def __init__(self):
+        self.user_ids: List[str] = []
+        self.id_numbers: List[str] = []
+        self.phones: List[str] = []
+        self.card_numbers: List[str] = []
+        self.trace_ids: List[str] = []
+        self.numbers: List[str] = []  # 所有无标签的长数字及卡号，按出现位置
+
+    def user_identifiers(self) -> Dict[str, str]:
+        """
+        按优先级选出用户标识符，格式: {"user_id": "xxx", "id_number": "xxx", "phone": "xxx"}
+        没有带标签的标识符时，退回第一个长数字作为用户ID、第一个11位手机号作为手机号
+        """
+        identifiers = {}
+        if self.user_ids:
+            identifiers["user_id"] = self.user_ids[0]
+        if self.id_numbers:
+            identifiers["id_number"] = self.id_numbers[0]
+        if self.phones:
+            identifiers["phone"] = self.phones[0]
+        if not identifiers:
+            if self.numbers:
+                identifiers["user_id"] = self.numbers[0]
+            phone = next((n for n in self.numbers if _PHONE.fullmatch(n)), None)
+            if phone:
+                identifiers["phone"] = phone
+        return identifiers
+
+    def best_identifier(self) -> Optional[str]:
+        """按 user_id > id_number > phone 的优先级选出用于查询日志的标识符"""
+        identifiers = self.user_identifiers()
+        return identifiers.get("user_id") or identifiers.get("id_number") or identifiers.get("phone")
+
+
+class IdentifierExtractor:
+    """
+    预编译的单次扫描标识符提取器
+
+    所有模式合并为一个正则，一次 finditer 取出用户ID、手机号、卡号、traceID 及无标签的长数字，
+    证件号的标签可能与用户ID的标签重叠，单独再扫描一次；
+    批量接口把多段文本拼接后扫描，再按偏移量分回各段。
+    日志行只需要 traceID，走单独预编译的 trace_ids/trace_ids_many，不做全量扫描。
+    """
+
+    def scan(self, text: str) -> Extraction:
+        return self.scan_many([text])[0]
+
+    def scan_many(self, texts: Iterable[str]) -> List[Extraction]:
+        texts = [text or "" for text in texts]
+        results = [Extraction() for _ in texts]
+        if not texts:
+            return results
+
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + len(_SEPARATOR)
+        # 标签类标识符需按模式优先级排序，先收集 (优先级, 位置, 值)
+        labeled: List[Dict[str, List[Tuple[int, int, str]]]] = [{} for _ in texts]
+
+        joined = _SEPARATOR.join(texts)
+        for match in _COMBINED.finditer(joined):
+            name = match.lastgroup
+            kind, priority = _GROUPS[name]
+            index = bisect_right(starts, match.start()) - 1
+            result = results[index]
+            if kind == "number":
+                if _is_word_boundary(joined, match.start()):
+                    result.numbers.append(match.group(0))
+            elif kind != "id_number":
+                value = match.group(name)
+                labeled[index].setdefault(kind, []).append((priority, match.start(), value))
+                if kind == "card_number":
+                    result.numbers.append(value)
+        for match in _ID_NUMBERS.finditer(joined):
+            name = match.lastgroup
+            kind, priority = _ID_NUMBER_GROUPS[name]
+            index = bisect_right(starts, match.start()) - 1
+            labeled[index].setdefault(kind, []).append((priority, match.start(), match.group(name)))
+
+        for result, found in zip(results, labeled):
+            for kind, items in found.items():
+                items.sort()
+                getattr(result, kind + "s").extend(value for _, _, value in items)
+        return results
+
+    def mask(self, text: str, placeholder: str = "<{kind}>") -> str:
+        """把文本中的标识符替换为占位符（标签保留），用于相似工单比较等场景"""
+        def replace(match: "re.Match") -> str:
+            name = match.lastgroup
+            kind, _ = _GROUPS[name]
+            if kind == "number" and not _is_word_boundary(text, match.start()):
+                return match.group(0)
+            if kind == "number":
+                return placeholder.format(kind=kind)
+            start, end = match.span(name)
+            base = match.start()
+            whole = match.group(0)
+            return whole[:start - base] + placeholder.format(kind=kind) + whole[end - base:]
+
+        return _COMBINED.sub(replace, text)
+
+    def trace_ids(self, log_content: str) -> List[str]:
+        """
+        一条日志中的 traceID，按出现顺序去重
+        先找带格式的 traceID，没有时用十六进制串兜底（纯数字不算，避免把用户ID等长数字当成 traceID）
+        """
+        log_content = log_content or ""
+        trace_ids = _TRACE_PATTERN.findall(log_content)
+        if not trace_ids:
+            trace_ids = [value for value in _HEX_FALLBACK.findall(log_content) if not value.isdigit()]
+        return list(dict.fromkeys(trace_ids))
+
+    def trace_ids_many(self, log_contents: Iterable[str]) -> List[List[str]]:
+        """
+        批量提取日志中的 traceID
+        日志行通常较短且每行都有 traceID，逐行扫描比拼接后按偏移量分回更快
+        """
+        return [self.trace_ids(content) for content in log_contents]
+
+
+def _is_word_boundary(text: str, position: int) -> bool:
+    """position 处左侧是否为单词边界（与 \\b 一致）"""
+    return position == 0 or not _WORD_CHAR.match(text, position - 1)
+
+
+identifier_extractor = IdentifierExtractor()
+
+
+def extract_sql_first_id(text: str) -> Optional[str]:
+    """从 SQL 查询结果文本中提取第一行第一列的数字ID（用户信息查询结果中即为用户ID）"""
+    match = _SQL_FIRST_COLUMN.search(text)
+    return match.group(1) if match else None
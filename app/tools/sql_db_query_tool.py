@@ -1,3 +1,8 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
 from dotenv import load_dotenv
 from langchain_community.utilities import SQLDatabase
 from langchain_experimental.sql import SQLDatabaseChain
@@ -5,19 +10,75 @@ from langchain_openai import ChatOpenAI
 import os
 from langchain.prompts import PromptTemplate
 
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.tools.sql_template_cache import SQLTemplate, SQLTemplateCache, clean_generated_sql
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    缓存表结构快照的 SQLDatabase
+
+    get_table_info 需要反射所有表并抽样数据行，开销较大。这里按 table_names 缓存结果，
+    超过 DB_TABLE_INFO_TTL 秒或调用 refresh_table_info 后重新获取。
+    SQLDatabaseChain 内部也通过 get_table_info 取表结构，因此同样命中缓存。
+    """
+
+    def __init__(self, *args, table_info_ttl: float = settings.DB_TABLE_INFO_TTL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._table_info_ttl = table_info_ttl
+        self._table_info_cache: Dict[Tuple, Tuple[float, str]] = {}
+        self._table_info_lock = threading.Lock()
+
+    def get_table_info(self, table_names: Optional[List[str]] = None, **kwargs) -> str:
+        key = (tuple(sorted(table_names)) if table_names else None, tuple(sorted(kwargs.items())))
+        cached = self._table_info_cache.get(key)
+        if cached and time.time() - cached[0] < self._table_info_ttl:
+            return cached[1]
+        with self._table_info_lock:
+            cached = self._table_info_cache.get(key)
+            if cached and time.time() - cached[0] < self._table_info_ttl:
+                return cached[1]
+            table_info = super().get_table_info(table_names, **kwargs)
+            self._table_info_cache[key] = (time.time(), table_info)
+            return table_info
+
+    def refresh_table_info(self) -> None:
+        """清空表结构缓存，下次查询时重新获取"""
+        with self._table_info_lock:
+            self._table_info_cache.clear()
+
 
 class SQLQueryTool:
+    """
+    基于大模型的自然语言转 SQL 查询工具
+
+    创建时会建立数据库连接池并反射表结构，请通过 get_sql_query_tool 获取进程内共享实例。
+    """
+
     def __init__(self):
         load_dotenv()
         self.db = self._setup_db_connection()
         self.llm = self._setup_llm()
+        self.db_chain = self._build_chain()
+        self.template_cache = SQLTemplateCache() if settings.SQL_TEMPLATE_CACHE_ENABLED else None
 
     def _setup_db_connection(self):
         db_user = os.getenv("db_user")
         db_password = os.getenv("db_password")
         db_host = os.getenv("db_host")
         db_name = os.getenv("db_name")
-        return SQLDatabase.from_uri(f"mysql+pymysql://{db_user}:{db_password}@{db_host}/{db_name}")
+        return CachedSQLDatabase.from_uri(
+            f"mysql+pymysql://{db_user}:{db_password}@{db_host}/{db_name}",
+            engine_args={
+                "pool_size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "pool_recycle": settings.DB_POOL_RECYCLE,
+                "pool_pre_ping": True,
+            }
+        )
 
     def _setup_llm(self):
         return ChatOpenAI(
@@ -28,9 +89,7 @@ class SQLQueryTool:
             streaming=True,
         )
 
-    def generate_sql_query(self, user_query):
-        table_info = self.db.get_table_info()
-
+    def _build_chain(self):
         sql_template = PromptTemplate(
             input_variables=["input", "table_info"],
             template="""
@@ -57,7 +116,7 @@ class SQLQueryTool:
             """
         )
 
-        db_chain = SQLDatabaseChain.from_llm(
+        return SQLDatabaseChain.from_llm(
             llm=self.llm,
             db=self.db,
             prompt=sql_template,
@@ -67,13 +126,76 @@ class SQLQueryTool:
             verbose=True
         )
 
-        result = db_chain.invoke({"query": user_query, "table_info": table_info})
+    def _run_template(self, template: SQLTemplate, params: Dict[str, str]):
+        """使用绑定参数执行缓存的 SQL 模板"""
+        logger.debug(f"命中 SQL 模板缓存: {template.sql}，参数: {params}")
+        query_result = self.db.run(text(template.sql), parameters=template.bind(params))
+        return {"sql_query": template.sql, "query_result": str(query_result)}
+
+    def _learn_template(self, key: str, params: Dict[str, str], result) -> None:
+        """从大模型的生成结果中提取实际执行的 SQL，参数化后写入模板缓存"""
+        steps = result["intermediate_steps"]
+        if len(steps) > 2 and isinstance(steps[2], dict) and "sql_cmd" in steps[2]:
+            self.template_cache.put(key, params, clean_generated_sql(steps[2]["sql_cmd"]))
+
+    def generate_sql_query(self, user_query):
+        if self.template_cache is not None:
+            key, params = self.template_cache.normalize(user_query)
+            template = self.template_cache.get(key)
+            if template is not None:
+                return self._run_template(template, params)
+
+        table_info = self.db.get_table_info()
+        result = self.db_chain.invoke({"query": user_query, "table_info": table_info})
+        if self.template_cache is not None:
+            self._learn_template(key, params, result)
+        return {"sql_query": result["result"], "query_result": result["intermediate_steps"][3]}
+
+    async def agenerate_sql_query(self, user_query):
+        """generate_sql_query 的异步版本，供异步工作流调用"""
+        if self.template_cache is not None:
+            key, params = self.template_cache.normalize(user_query)
+            template = self.template_cache.get(key)
+            if template is not None:
+                return await asyncio.to_thread(self._run_template, template, params)
+
+        table_info = await asyncio.to_thread(self.db.get_table_info)
+        result = await self.db_chain.ainvoke({"query": user_query, "table_info": table_info})
+        if self.template_cache is not None:
+            self._learn_template(key, params, result)
         return {"sql_query": result["result"], "query_result": result["intermediate_steps"][3]}
 
+    def close(self) -> None:
+        """释放数据库连接池"""
+        self.db._engine.dispose()
+
+
+_sql_query_tool: Optional[SQLQueryTool] = None
+_sql_query_tool_lock = threading.Lock()
+
+
+def get_sql_query_tool() -> SQLQueryTool:
+    """获取进程内共享的 SQLQueryTool，首次调用时建立连接池"""
+    global _sql_query_tool
+    if _sql_query_tool is None:
+        with _sql_query_tool_lock:
+            if _sql_query_tool is None:
+                _sql_query_tool = SQLQueryTool()
+    return _sql_query_tool
+
+
+def close_sql_query_tool() -> None:
+    """释放共享 SQLQueryTool 的数据库连接池（应用关闭时调用）"""
+    global _sql_query_tool
+    with _sql_query_tool_lock:
+        if _sql_query_tool is not None:
+            _sql_query_tool.close()
+            _sql_query_tool = None
+
 
 # 示例调用
 if __name__ == "__main__":
-    sql_tool = SQLQueryTool()
+    sql_tool = get_sql_query_tool()
     user_query = "查询用户 ID 为 1763739554902667264 的用户信息。"
     result = sql_tool.generate_sql_query(user_query)
     print("\n----- SQL查询 -----")
@@ -0,0 +1,139 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import logger
+
+# 问题中可参数化的字面量：证件号(18位)、手机号(11位)、其他长数字(用户ID、卡号等)
+_LITERAL_PATTERN = re.compile(
+    r'(?<![0-9A-Za-z])(?:(?P<id_number>\d{17}[0-9Xx])|(?P<phone>1[3-9]\d{9})|(?P<number>\d{6,}))(?![0-9A-Za-z])'
+)
+# 生成的 SQL 中残留的长数字字面量（说明模板里写死了具体取值，不可复用）
+_SQL_LONG_LITERAL = re.compile(r'(?<![0-9A-Za-z_:])\d{6,}(?![0-9A-Za-z_])')
+SQL_QUERY = "SQLQuery:"
+SQL_RESULT = "SQLResult:"
+
+
+def clean_generated_sql(sql_cmd: str) -> str:
+    """与 SQLDatabaseChain 执行前的处理保持一致，去掉 SQLQuery:/SQLResult: 等多余内容"""
+    if SQL_QUERY in sql_cmd:
+        sql_cmd = sql_cmd.split(SQL_QUERY)[1].strip()
+    if SQL_RESULT in sql_cmd:
+        sql_cmd = sql_cmd.split(SQL_RESULT)[0].strip()
+    return sql_cmd.strip()
+
+
+class SQLTemplate(NamedTuple):
+    """参数化 SQL 模板"""
+    sql: str
+    # 在 SQL 中以数值形式出现的参数，绑定时转为 int，避免 MySQL 将大整数与字符串比较时按浮点数处理
+    int_params: FrozenSet[str]
+
+    def bind(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {name: int(value) if name in self.int_params else value for name, value in params.items()}
+
+
+class SQLTemplateCache:
+    """
+    自然语言查询 -> 参数化 SQL 模板缓存
+
+    把问题中的证件号、手机号、卡号/用户ID 等字面量提取为参数，其余文本作为缓存键；
+    大模型生成的 SQL 中把这些字面量替换为绑定参数后保存。之后同一句式的问题直接用
+    新参数执行模板，跳过大模型生成。
+    """
+
+    def __init__(self, max_size: int = settings.SQL_TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._templates: "OrderedDict[str, SQLTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(question: str) -> Tuple[str, Dict[str, str]]:
+        """
+        归一化问题
+
+        Returns:
+            (缓存键, 参数)。例如 "查询用户 ID 为 1763739554902667264 的用户信息。"
+            -> ("查询用户 ID 为 {number0} 的用户信息", {"number0": "1763739554902667264"})
+        """
+        params: Dict[str, str] = {}
+        counters: Dict[str, int] = {}
+
+        def lift(match: re.Match) -> str:
+            # 同一字面量多次出现时共用一个参数
+            for name, value in params.items():
+                if value == match.group(0):
+                    return "{" + name + "}"
+            kind = match.lastgroup
+            name = f"{kind}{counters.get(kind, 0)}"
+            counters[kind] = counters.get(kind, 0) + 1
+            params[name] = match.group(0)
+            return "{" + name + "}"
+
+        key = _LITERAL_PATTERN.sub(lift, question)
+        key = re.sub(r'\s+', ' ', key).strip().rstrip("。.？?！!")
+        return key, params
+
+    def get(self, key: str) -> Optional[SQLTemplate]:
+        """查找 SQL 模板，命中时返回带 :参数名 绑定参数的模板"""
+        with self._lock:
+            template = self._templates.get(key)
+            if template is None:
+                self.misses += 1
+                return None
+            self._templates.move_to_end(key)
+            self.hits += 1
+            return template
+
+    def put(self, key: str, params: Dict[str, str], sql: str) -> bool:
+        """
+        校验并保存大模型生成的 SQL
+
+        只缓存单条 SELECT 语句，且问题中的每个字面量都必须能在 SQL 中替换为绑定参数、
+        替换后不再残留长数字字面量，否则放弃缓存。
+
+        Returns:
+            是否已缓存
+        """
+        template = self._templatize(sql, params)
+        if template is None:
+            logger.debug(f"SQL 无法参数化，不缓存: {sql}")
+            return False
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        logger.debug(f"缓存 SQL 模板: {key} -> {template}")
+        return True
+
+    @staticmethod
+    def _templatize(sql: str, params: Dict[str, str]) -> Optional[SQLTemplate]:
+        template = sql.strip().rstrip(";").strip()
+        if not template.lower().startswith("select") or ";" in template:
+            return None
+        int_params = set()
+        # 先替换长的字面量，避免短字面量误匹配其一部分
+        for name, value in sorted(params.items(), key=lambda item: -len(item[1])):
+            quoted = re.compile(r"'" + re.escape(value) + r"'|\"" + re.escape(value) + r"\"")
+            bare = re.compile(r"(?<![0-9A-Za-z])" + re.escape(value) + r"(?![0-9A-Za-z])")
+            template, quoted_count = quoted.subn(f":{name}", template)
+            template, bare_count = bare.subn(f":{name}", template)
+            if quoted_count + bare_count == 0:
+                return None
+            if bare_count and value.isdigit():
+                int_params.add(name)
+        if _SQL_LONG_LITERAL.search(template):
+            return None
+        return SQLTemplate(template, frozenset(int_params))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._templates), "hits": self.hits, "misses": self.misses}
@@ -1,13 +1,38 @@
 # tools.py
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool, StructuredTool
-from typing import Annotated, List
-import re
+import asyncio
+import importlib
+import threading
+from contextvars import ContextVar
+from typing import Annotated, Any, Dict, List, Optional
 from app.core.logging import logger
-from app.tools.ActivityTool.activity_tool import analyze_ticket_subject
-from app.tools.MjLogs.mj_log_query_tool import query_logs_and_get_results, query_system_logs
-from app.tools.PointsDetails.query_points_details import query_points_details
-from app.tools.sql_db_query_tool import SQLQueryTool
+from app.tools.identifier_extractor import extract_sql_first_id
+
+# 当前工具调用所在的工作流状态。按协程/线程上下文隔离，多个工单并发处理时互不干扰
+tool_calling_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("tool_calling_context", default=None)
+
+# 定义在各自模块中的工具：工具名 -> 模块路径。get_all_tools 时才导入这些模块以取得名称和参数结构，
+# 模块中的重量级后端(向量库、Embedding、大模型客户端、数据库连接、numpy 等)在工具首次调用时才导入。
+# requests 无法推迟：langchain_core.tools 依赖的 langchain_core.utils.utils 在模块级导入 requests，定义任何工具都会加载
+MODULE_TOOLS: Dict[str, str] = {
+    "query_points_details": "app.tools.PointsDetails.query_points_details",
+    "analyze_ticket_subject": "app.tools.ActivityTool.activity_tool",
+}
+_module_tools: Dict[str, StructuredTool] = {}
+_module_tools_lock = threading.Lock()
+
+
+def _load_module_tool(name: str) -> StructuredTool:
+    """按注册表导入模块中的工具，结果缓存"""
+    loaded = _module_tools.get(name)
+    if loaded is None:
+        with _module_tools_lock:
+            loaded = _module_tools.get(name)
+            if loaded is None:
+                loaded = getattr(importlib.import_module(MODULE_TOOLS[name]), name)
+                _module_tools[name] = loaded
+    return loaded
 
 
 class Tools:
@@ -27,7 +52,7 @@ class Tools:
 
     @staticmethod
     @tool
-    def query_system_logs(params: Annotated[str, "查询系统日志的参数"]) -> str:
+    async def query_system_logs(params: Annotated[str, "查询系统日志的参数"]) -> str:
         """从明觉日志系统中查询相关信息的日志，整合已知用户数据优化查询精确度。"""
         try:
             logger.info(f"开始查询系统日志，参数：{params}")
@@ -38,13 +63,12 @@ class Tools:
             
             # 从上下文获取用户ID（如果可用）
             try:
-                calling_context = getattr(query_system_logs, '_calling_context', None)
+                calling_context = tool_calling_context.get()
                 if calling_context and 'messages' in calling_context:
                     for msg in calling_context['messages']:
                         if isinstance(msg, ToolMessage) and msg.name == 'query_user_info':
-                            id_match = re.search(r'\(\s*(\d+)\s*,', msg.content)
-                            if id_match:
-                                user_id = id_match.group(1)
+                            user_id = extract_sql_first_id(msg.content)
+                            if user_id:
                                 logger.info(f"从上下文提取到用户ID: {user_id}")
                                 break
             except Exception as e:
@@ -54,8 +78,9 @@ class Tools:
                 enhanced_params = f"用户ID:{user_id} {params}"
                 logger.info(f"增强日志查询参数: {enhanced_params}")
 
-            # 执行查询
-            query_logs = query_logs_and_get_results(enhanced_params)
+            # 执行查询（日志客户端及其依赖在首次调用时导入）
+            from app.tools.MjLogs.mj_log_query_tool import aquery_logs_and_get_results
+            query_logs = await aquery_logs_and_get_results(enhanced_params)
             return query_logs
         except Exception as e:
             logger.error(f"系统日志查询失败：{str(e)}")
@@ -63,12 +88,14 @@ class Tools:
 
     @staticmethod
     @tool
-    def query_user_info(user_query: Annotated[str, "用户信息查询条件"]) -> str:
+    async def query_user_info(user_query: Annotated[str, "用户信息查询条件"]) -> str:
         """从mysql数据库中，查询用户的详细信息。"""
         try:
             logger.info(f"开始查询用户信息，查询条件：{user_query}")
-            sql_tool = SQLQueryTool()
-            result = sql_tool.generate_sql_query(user_query)
+            # 首次调用时才导入 SQL 链并建立连接池(会读取表结构)，放到线程中执行避免阻塞事件循环
+            from app.tools.sql_db_query_tool import get_sql_query_tool
+            sql_tool = await asyncio.to_thread(get_sql_query_tool)
+            result = await sql_tool.agenerate_sql_query(user_query)
             
             logger.debug(f"SQL查询：{result['sql_query']}")
             logger.debug(f"查询结果：{result['query_result']}")
@@ -94,7 +121,7 @@ class Tools:
 
     @classmethod
     def get_all_tools(cls) -> List[StructuredTool]:
-        """返回所有工具的列表"""
+        """返回所有工具的列表（模块中定义的工具按 MODULE_TOOLS 导入，其后端在首次调用时才导入）"""
         return [
             # cls.query_mj_logs,
             # cls.query_sso_db_info,
@@ -102,6 +129,5 @@ class Tools:
             cls.query_system_logs,
             cls.query_user_info,
             cls.query_ticket_background,
-            query_points_details,
-            analyze_ticket_subject
+            *(_load_module_tool(name) for name in MODULE_TOOLS)
         ]
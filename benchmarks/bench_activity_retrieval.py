@@ -0,0 +1,151 @@
+"""
+活动检索后端基准测试：对比 Chroma 与进程内 NumPy 索引的启动耗时、单次 MMR 检索延迟和常驻内存(RSS)
+
+用法:
+    python -m benchmarks.bench_activity_retrieval                  # 合成目录(默认 2000 条、1024 维)
+    python -m benchmarks.bench_activity_retrieval --docs 5000 --dim 1536
+    python -m benchmarks.bench_activity_retrieval --chroma-dir data/chroma_db --collection my_collection
+    python -m benchmarks.bench_activity_retrieval --workdir /tmp/activity_bench   # 保留生成的索引文件
+
+每个后端在独立子进程中运行，RSS 互不影响；查询向量预先生成，不调用远程 embedding 接口。
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from typing import List
+
+import numpy as np
+
+K, FETCH_K, LAMBDA_MULT = 10, 15, 0.5
+
+
+def _rss_mb() -> float:
+    """当前进程 RSS(MB)，优先读 /proc，其他平台退回峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+
+
+def _prepare(args) -> None:
+    """生成合成目录，或从已有 Chroma 库导出，写成 NumPy 索引文件和查询向量"""
+    from app.tools.ActivityTool.vector_index import NumpyVectorIndex, export_chroma_collection
+
+    rng = np.random.default_rng(42)
+    index_dir = os.path.join(args.workdir, "numpy_index")
+    if args.chroma_dir:
+        export_chroma_collection(args.chroma_dir, args.collection, index_dir)
+        dim = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r").shape[1]
+    else:
+        dim = args.dim
+        embeddings = rng.standard_normal((args.docs, dim), dtype=np.float32)
+        documents = [f"活动{i}: 科目号 {100000 + i} 活动描述" for i in range(args.docs)]
+        NumpyVectorIndex.build(index_dir, documents, embeddings)
+        _build_chroma(os.path.join(args.workdir, "chroma"), documents, embeddings)
+    np.save(os.path.join(args.workdir, "queries.npy"), rng.standard_normal((args.queries, dim), dtype=np.float32))
+
+
+def _build_chroma(path: str, documents, embeddings) -> None:
+    try:
+        import chromadb
+    except ImportError:
+        return
+    collection = chromadb.PersistentClient(path=path).get_or_create_collection(
+        "bench", metadata={"hnsw:space": "cosine"}
+    )
+    for start in range(0, len(documents), 1000):
+        collection.add(
+            ids=[str(i) for i in range(start, min(start + 1000, len(documents)))],
+            documents=documents[start:start + 1000],
+            embeddings=embeddings[start:start + 1000].tolist(),
+        )
+
+
+def _run_backend(backend: str, args) -> dict:
+    """子进程内执行：加载后端并逐条执行 MMR 检索"""
+    queries = np.load(os.path.join(args.workdir, "queries.npy"))
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    if backend == "numpy":
+        from app.tools.ActivityTool.vector_index import NumpyVectorIndex
+
+        index = NumpyVectorIndex.load(os.path.join(args.workdir, "numpy_index"))
+        search = lambda q: index.max_marginal_relevance_search_by_vector(q, K, FETCH_K, LAMBDA_MULT)
+    else:
+        import chromadb
+        from langchain_chroma import Chroma
+
+        if args.chroma_dir:
+            client, name = chromadb.PersistentClient(path=args.chroma_dir), args.collection
+        else:
+            client, name = chromadb.PersistentClient(path=os.path.join(args.workdir, "chroma")), "bench"
+        store = Chroma(client=client, collection_name=name)
+        search = lambda q: store.max_marginal_relevance_search_by_vector(q.tolist(), K, FETCH_K, LAMBDA_MULT)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for query in queries:
+        t = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+    return {
+        "backend": backend,
+        "load_ms": round(load_ms, 2),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "rss_mb": round(_rss_mb() - rss_before, 1),
+    }
+
+
+def _backend_args(args, backend: str) -> List[str]:
+    """子进程的命令行参数：只传递 _run_backend 用到的参数，工作目录显式传入"""
+    argv = ["--workdir", args.workdir, "--backend", backend]
+    if args.chroma_dir:
+        argv += ["--chroma-dir", args.chroma_dir, "--collection", args.collection]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chroma-dir", help="使用已有 Chroma 向量库，而不是合成目录")
+    parser.add_argument("--collection", default="my_collection")
+    parser.add_argument("--workdir", help="保存索引文件和查询向量的目录，默认使用临时目录，结束后删除")
+    parser.add_argument("--backend", choices=["numpy", "chroma"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(_run_backend(args.backend, args)))
+        return
+
+    with (nullcontext(args.workdir) if args.workdir else tempfile.TemporaryDirectory()) as workdir:
+        os.makedirs(workdir, exist_ok=True)
+        args.workdir = workdir
+        _prepare(args)
+        print(f"{'backend':<8} {'load(ms)':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'RSS(MB)':>10}")
+        for backend in ("chroma", "numpy"):
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_activity_retrieval", *_backend_args(args, backend)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"{backend:<8} 运行失败: {proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{r['backend']:<8} {r['load_ms']:>10} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['rss_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
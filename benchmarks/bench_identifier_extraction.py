@@ -0,0 +1,147 @@
+"""
+标识符提取基准：对比逐个 re.search/findall 的旧实现与单次扫描的 IdentifierExtractor
+
+语料为按线上格式合成的工单和日志（含用户ID、证件号、手机号、卡号、traceID 等），
+同时校验两种实现的提取结果是否一致。
+
+用法:
+    python -m benchmarks.bench_identifier_extraction
+    python -m benchmarks.bench_identifier_extraction --tickets 2000 --logs 20000
+"""
+import argparse
+import random
+import re
+import time
+from typing import Dict, List
+
+from app.tools.identifier_extractor import identifier_extractor
+
+
+def legacy_extract_user_identifiers(text: str) -> Dict[str, str]:
+    """旧实现：按模式逐个 re.search"""
+    identifiers = {}
+    for key, patterns in (
+            ("user_id", [r'用户[iI][dD][：:]\s*(\d+)', r'用户标识符[：:]\s*(\d+)',
+                         r'[uU]ser[_\s]*[iI][dD][：:]\s*(\d+)', r'用户\s*(?:编号|号码)?[：:]\s*(\d+)']),
+            ("id_number", [r'证件号[码]?[：:]\s*([0-9X]{18})', r'身份证[：:]\s*([0-9X]{18})',
+                           r'[iI][dD][：:]\s*([0-9X]{18})']),
+            ("phone", [r'手机号[码]?[：:]\s*(1[3-9]\d{9})', r'电话[：:]\s*(1[3-9]\d{9})',
+                       r'联系方式[：:]\s*(1[3-9]\d{9})'])):
+        for pattern in patterns:
+            match = re.search(pattern, text)
+            if match:
+                identifiers[key] = match.group(1).strip()
+                break
+    if not identifiers:
+        general_id_match = re.search(r'\b(\d{10,})\b', text)
+        if general_id_match:
+            identifiers["user_id"] = general_id_match.group(1)
+        general_phone_match = re.search(r'\b(1[3-9]\d{9})\b', text)
+        if general_phone_match:
+            identifiers["phone"] = general_phone_match.group(1)
+    return identifiers
+
+
+def legacy_extract_trace_ids(log_content: str) -> List[str]:
+    """旧实现：每条日志 findall 两次"""
+    matches = re.findall(r':[a-z]{3}:([0-9a-f]{12}):', log_content)
+    if not matches:
+        return list(set(re.findall(r'[0-9a-f]{8}(?:[0-9a-f]{4}){3}[0-9a-f]{12}|[0-9a-f]{12}', log_content)))
+    return list(set(matches))
+
+
+def _legacy_best(identifiers: Dict[str, str]):
+    return identifiers.get("user_id") or identifiers.get("id_number") or identifiers.get("phone")
+
+
+def _legacy_comparable_traces(text: str):
+    trace_ids = set(legacy_extract_trace_ids(text))
+    if re.search(r':[a-z]{3}:([0-9a-f]{12}):', text):
+        return trace_ids
+    return {t for t in trace_ids if not t.isdigit()}
+
+
+def _digits(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice("0123456789") for _ in range(n))
+
+
+def make_tickets(count: int, rng: random.Random) -> List[str]:
+    body = ("客户致电表示在信用卡APP进行抢兑，邮储小绿卡 蜜雪冰城天天1分购（2025年3月-6月）活动的兑换券未成功，"
+            "客户称在进行支付最后一步输入验证码后提示，账户异常，为保证资金安全请前往网点咨询。"
+            "客户前往网点咨询无果后致电，现客户要求核实原因。请相关部门进行协助处理，谢谢。")
+    templates = [
+        "工单类型：1  信息来源：B  证件类型：null  证件号：{short}  联系人姓名：王  卡号：{card}  性别：M\n{body}",
+        "请分析以下工单：\n自助交易渠道：（信用卡APP）\n卡片状态：正常\n{body}\n用户信息 用户id:{uid} 性别 男，手机号：{phone}",
+        "{body}\n证件号码：{idn} 联系方式：{phone}",
+        "{body}\n客户来电号码 {phone}，卡号：{card}",
+    ]
+    tickets = []
+    for _ in range(count):
+        tickets.append(rng.choice(templates).format(
+            body=body, short=_digits(rng, 14), card=_digits(rng, 27), uid="1" + _digits(rng, 18),
+            phone="13" + _digits(rng, 9), idn=_digits(rng, 17) + rng.choice("0123456789X")
+        ))
+    return tickets
+
+
+def make_logs(count: int, rng: random.Random) -> List[str]:
+    logs = []
+    for i in range(count):
+        trace = "".join(rng.choice("0123456789abcdef") for _ in range(12))
+        if i % 5:
+            logs.append(f"2025-03-28 10:00:{i % 60:02d}.123 INFO [http-nio-8080-exec-{i % 8}] c.r.u.UserController - "
+                        f"172.16.0.{i % 255}:sso:{trace}:8080 查询用户信息 userId=1{_digits(rng, 18)} cost={i % 97}ms")
+        else:
+            logs.append(f"2025-03-28 10:00:{i % 60:02d}.456 WARN [main] c.r.u.SmsService - request {trace}{trace[:4]} "
+                        f"手机号校验失败 phone=13{_digits(rng, 9)}")
+    return logs
+
+
+def _timeit(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--logs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    tickets = make_tickets(args.tickets, rng)
+    logs = make_logs(args.logs, rng)
+
+    # 校验一致性：工单比较最终用于查询日志的标识符，日志比较 traceID 集合（旧实现无序）。
+    # 已知的有意差异：旧实现会把 19 位 "用户id:" 值的前 18 位当成证件号（不影响最终选择），
+    # 兜底时会把长数字（如 userId）中的 12 位数字当成 traceID，新实现兜底只接受含字母的十六进制串。
+    mismatched = sum(
+        1 for text, result in zip(tickets, identifier_extractor.scan_many(tickets))
+        if _legacy_best(legacy_extract_user_identifiers(text)) != result.best_identifier()
+    )
+    mismatched_logs = sum(
+        1 for text, trace_ids in zip(logs, identifier_extractor.trace_ids_many(logs))
+        if _legacy_comparable_traces(text) != set(trace_ids)
+    )
+    print(f"一致性: 工单 {len(tickets) - mismatched}/{len(tickets)}，日志 {len(logs) - mismatched_logs}/{len(logs)}")
+
+    rows = [
+        ("tickets", "legacy", _timeit(lambda: [legacy_extract_user_identifiers(t) for t in tickets], args.repeat)),
+        ("tickets", "scan", _timeit(lambda: [identifier_extractor.scan(t).user_identifiers() for t in tickets],
+                                    args.repeat)),
+        ("tickets", "batch", _timeit(lambda: [r.user_identifiers() for r in identifier_extractor.scan_many(tickets)],
+                                     args.repeat)),
+        ("logs", "legacy", _timeit(lambda: [legacy_extract_trace_ids(line) for line in logs], args.repeat)),
+        ("logs", "scan", _timeit(lambda: [identifier_extractor.trace_ids(line) for line in logs], args.repeat)),
+        ("logs", "batch", _timeit(lambda: identifier_extractor.trace_ids_many(logs), args.repeat)),
+    ]
+    print(f"{'corpus':<8} {'impl':<7} {'time(ms)':>10}")
+    for corpus, impl, elapsed in rows:
+        print(f"{corpus:<8} {impl:<7} {elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
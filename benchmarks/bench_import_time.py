@@ -0,0 +1,83 @@
+"""
+启动导入耗时基准：在独立子进程中以 python -X importtime 导入各入口模块，统计总耗时和最重的依赖包
+
+每个模块重复导入多次(每次新进程)取中位数；任一模块超出 --budget-ms 时以非零状态码退出，可在 CI 中守住冷启动预算。
+
+用法:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --modules main app.tools.tools --budget-ms 1500 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["app.tools.tools", "app.api.controller.ticket_api", "main"]
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    在新进程中导入模块，返回 (总耗时 ms, 各顶层包自身耗时 ms)
+
+    -X importtime 输出形如 "import time: self [us] | cumulative | imported package"，
+    最后一行为目标模块本身，其累计耗时即导入总耗时。
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{completed.stderr[-2000:]}")
+
+    total = 0.0
+    by_package: Dict[str, float] = defaultdict(float)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        by_package[name.split(".")[0]] += int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, by_package
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="每个模块列出自身耗时最多的顶层包数")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="单个模块导入耗时预算，0 表示不检查")
+    args = parser.parse_args()
+
+    over_budget: List[str] = []
+    for module in args.modules:
+        totals = []
+        packages: Dict[str, List[float]] = defaultdict(list)
+        for _ in range(args.repeat):
+            total, by_package = _import_profile(module)
+            totals.append(total)
+            for package, elapsed in by_package.items():
+                packages[package].append(elapsed)
+
+        median = statistics.median(totals)
+        status = "OK"
+        if args.budget_ms and median > args.budget_ms:
+            status = "OVER BUDGET"
+            over_budget.append(module)
+        print(f"{module}: {median:.1f} ms (budget {args.budget_ms:.0f} ms) {status}")
+        heaviest = sorted(((statistics.median(v), k) for k, v in packages.items()), reverse=True)[:args.top]
+        for elapsed, package in heaviest:
+            print(f"    {package:<32} {elapsed:>8.1f} ms")
+
+    if over_budget:
+        print(f"超出导入预算: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+日志结果解析微基准：对比旧流程(响应 JSON -> repr 字符串 -> parse_log_response 反解析)
+与新流程(响应 JSON -> LogPage/LogRow)的耗时和内存峰值
+
+用法:
+    python -m benchmarks.bench_log_parse                 # 默认每页 100、1000、5000 行
+    python -m benchmarks.bench_log_parse --rows 2000 --repeat 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+
+from app.tools.MjLogs.log_row import LogPage
+from app.tools.MjLogs.mj_log_query_tool import LOG_QUERY_SUCCESS_PREFIX, parse_log_response
+
+
+def _make_body(rows: int) -> bytes:
+    """构造与日志代理格式一致的响应体"""
+    return json.dumps({
+        "code": 0,
+        "total": rows,
+        "rows": [
+            {
+                "timestamp": f"2025-03-28 10:{i // 60 % 60:02d}:{i % 60:02d}",
+                "level": "INFO",
+                "ip": "10.0.0.1",
+                "project": "uum-api",
+                "message": f"2025-03-28 10:00:00.123 INFO [http-nio-8080-exec-{i % 8}] c.r.u.UserController - "
+                           f":sso:{i:012x}: 查询用户信息 userId=1763739554902667264 cost={i % 97}ms",
+            }
+            for i in range(rows)
+        ],
+    }, ensure_ascii=False).encode("utf-8")
+
+
+def _old_path(body: bytes):
+    # 旧流程：query_system_logs 把解析后的 JSON 拼成字符串，fetch_logs 再用 parse_log_response 还原
+    response = f"{LOG_QUERY_SUCCESS_PREFIX}{json.loads(body)}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parse_log_response(response)
+
+
+def _new_path(body: bytes):
+    return LogPage.from_payload(json.loads(body)).rows
+
+
+def _measure(func, body: bytes, repeat: int):
+    func(body)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(body)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    result = func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak / 1024 / 1024, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'path':<5} {'time(ms)':>10} {'peak(MB)':>10} {'parsed':>8}")
+    for rows in args.rows:
+        body = _make_body(rows)
+        for name, func in (("old", _old_path), ("new", _new_path)):
+            elapsed_ms, peak_mb, parsed = _measure(func, body, args.repeat)
+            print(f"{rows:>6} {name:<5} {elapsed_ms:>10.2f} {peak_mb:>10.2f} {parsed:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+日志写入基准：对比同步 FileHandler(旧实现) 与经队列异步写出的 logger 在请求路径上的单次调用耗时
+
+多个线程并发写日志，消息混合短日志和整段工单/查询结果这类大载荷，统计调用方看到的 p50/p99/最大耗时。
+日志写入临时目录，结束后删除。
+
+用法:
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --threads 8 --messages 5000 --payload-chars 20000
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+
+def legacy_logger(log_dir: str) -> logging.Logger:
+    """旧实现：控制台 + 全部日志文件 + 错误日志文件，均为同步处理器"""
+    logger = logging.getLogger("bench_legacy")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    for handler, level in ((logging.StreamHandler(open(os.devnull, "w")), logging.DEBUG),
+                           (logging.FileHandler(os.path.join(log_dir, "legacy.log")), logging.DEBUG),
+                           (logging.FileHandler(os.path.join(log_dir, "legacy_errors.log")), logging.ERROR)):
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+        logger.addHandler(handler)
+    return logger
+
+
+def run(logger: logging.Logger, threads: int, messages: int, payload: str) -> List[float]:
+    """并发写日志，返回每次调用的耗时(微秒)"""
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+
+    def worker(i: int):
+        for n in range(messages):
+            start = time.perf_counter()
+            if n % 10 == 0:
+                logger.debug(f"【工单】内容: {payload}")
+            else:
+                logger.info(f"工具 query_system_logs 调用完成，耗时: 0.{n % 100:02d}秒")
+            latencies[i].append((time.perf_counter() - start) * 1e6)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return [v for per_thread in latencies for v in per_thread]
+
+
+def report(name: str, latencies: List[float], elapsed: float):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<8} p50 {statistics.median(latencies):8.1f} us  p99 {p99:8.1f} us  "
+          f"max {latencies[-1]:10.1f} us  总耗时 {elapsed:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=2000, help="每个线程写入的日志条数")
+    parser.add_argument("--payload-chars", type=int, default=20000, help="大载荷日志(每 10 条一条)的字符数")
+    args = parser.parse_args()
+    payload = "工单内容与查询结果" * (args.payload_chars // 9)
+
+    results = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        os.environ["LOG_DIR"] = log_dir
+        # 控制台处理器在导入时绑定 sys.stdout，运行期间临时指向 /dev/null，与旧实现一样丢弃控制台输出
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            from app.core.logging import logger, stop_logging
+
+            for name, target in (("legacy", legacy_logger(log_dir)), ("queued", logger)):
+                start = time.perf_counter()
+                latencies = run(target, args.threads, args.messages, payload)
+                if target is logger:
+                    stop_logging()  # 等待队列写完，总耗时包含后台写出
+                results.append((name, latencies, time.perf_counter() - start))
+        finally:
+            sys.stdout = stdout
+
+    for name, latencies, elapsed in results:
+        report(name, latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,44 @@ def call_ticket_assistant(ticket_data: dict):
         print(f"错误: {response.status_code}")
         print(response.text)
 
+def stream_ticket_assistant(ticket_data: dict):
+    """
+    调用工单助手流式接口(SSE)的示例，实时打印处理进度
+    """
+    url = "http://localhost:8000/api/v1/tickets/process/stream"
+
+    with requests.post(url, json=ticket_data, stream=True) as response:
+        event_type = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event_type = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event_type == "token":
+                    print(data["content"], end="", flush=True)
+                elif event_type == "result":
+                    print("\n工单处理成功：")
+                    print(json.dumps(data["data"], indent=2, ensure_ascii=False))
+                else:
+                    print(f"\n[{event_type}] {data}")
+
+def batch_ticket_assistant(tickets: list, max_concurrency: int = 4):
+    """
+    调用批量处理接口的示例
+    """
+    url = "http://localhost:8000/api/v1/tickets/process/batch"
+
+    response = requests.post(url, json={"tickets": tickets, "max_concurrency": max_concurrency})
+    if response.status_code == 200:
+        result = response.json()
+        print(f"批次 {result['batch_id']}：成功 {result['succeeded']}，失败 {result['failed']}，"
+              f"复用工具调用 {result['shared_tool_calls']} 次，耗时 {result['processing_time']:.2f}秒")
+        for item in result["results"]:
+            print(f"[{item['status']}] {item['request_id']}: {item['solution']}")
+    else:
+        print(f"错误: {response.status_code}")
+        print(response.text)
+
 if __name__ == "__main__":
     # 示例工单数据
     ticket_data = {
@@ -1,17 +1,66 @@
 from datetime import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.api.controller import ticket_api
 from app.core.config import settings
-from app.core.logging import logger
+from app.core.logging import logger, start_logging, stop_logging
+from app.services.readiness import (
+    close_resources, open_local_stores, readiness, warm_up_database, warm_up_llm, warm_up_mjlog,
+    warm_up_tokenizer
+)
+from app.tools.ActivityTool.activity_tool import warm_up_activity_store
+from functools import partial
+import asyncio
 import time
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期
+
+    启动时构建工作流并启动任务队列，随后在后台预热各项依赖(模型客户端、数据库连接池、向量库、本地存储、日志接口、tiktoken 编码表)，
+    失败的依赖按退避间隔重试。预热期间 /health 正常响应、/ready 返回 503；
+    关闭时(包括启动中途失败)停止任务队列，释放连接池和本地存储，最后写出剩余日志。
+    """
+    # 同一进程中此前的生命周期关闭时已停止日志线程，重新启动
+    start_logging()
+    job_queue = None
+    warm_up_task = None
+    try:
+        job_queue = await asyncio.to_thread(ticket_api.get_job_queue)
+        await job_queue.start()
+
+        readiness.register("workflow", ticket_api.get_workflow_service)
+        readiness.register("llm", partial(warm_up_llm, ticket_api.get_workflow_service().llm))
+        readiness.register("database", warm_up_database)
+        readiness.register("vector_store", warm_up_activity_store)
+        readiness.register("local_stores", open_local_stores)
+        readiness.register("mjlog", warm_up_mjlog)
+        readiness.register("tokenizer", warm_up_tokenizer)
+        # 首次预热后，失败的依赖在后台按退避间隔重试
+        warm_up_task = asyncio.create_task(readiness.run())
+        yield
+    finally:
+        # 启动中途失败或异常退出时同样释放已创建的资源
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+            await asyncio.gather(warm_up_task, return_exceptions=True)
+        if job_queue is not None:
+            await job_queue.stop()
+        await close_resources()
+        stop_logging()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # CORS设置
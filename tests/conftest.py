@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# app.core.config 在导入时读取环境变量，测试中提供占位值，日志写入临时目录
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_BASE", "http://localhost")
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="ticket_assistant_logs_"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,66 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.services import context_manager
+from app.services.context_manager import ContextManager, count_tokens, message_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """按估算计数，结果不依赖 tiktoken 编码表是否可用"""
+    monkeypatch.setattr(context_manager, "_encoding", None)
+    monkeypatch.setattr(context_manager, "_encoding_requested", True)
+
+
+def _tool_round(call_id: str, content: str):
+    return [
+        AIMessage(content="", tool_calls=[{"name": "query_points_details", "args": {"card_no": call_id}, "id": call_id}]),
+        ToolMessage(content=content, tool_call_id=call_id, name="query_points_details"),
+    ]
+
+
+def test_count_tokens_estimates_until_encoding_is_loaded():
+    """编码表未加载时不等待加载：中文每字 1 个，其他字符每 4 个 1 个"""
+    assert count_tokens("") == 0
+    assert count_tokens("积分明细abcdefgh") == 4 + 2
+
+
+def test_get_encoding_does_not_block_while_loading(monkeypatch):
+    started = []
+
+    class FakeThread:
+        def __init__(self, target, **kwargs):
+            self.target = target
+
+        def start(self):
+            started.append(self.target)
+
+    monkeypatch.setattr(context_manager, "_encoding_requested", False)
+    monkeypatch.setattr(context_manager.threading, "Thread", FakeThread)
+
+    assert context_manager._get_encoding() is None
+    assert context_manager._get_encoding() is None
+    assert started == [context_manager._load_encoding_in_background]
+
+
+def test_long_tool_output_is_truncated_to_limit():
+    messages = [HumanMessage(content="工单"), *_tool_round("a", "积分" * 3000)]
+
+    compacted = ContextManager(budget=100000, tool_output_limit=500).compact(messages)
+
+    assert "内容过长，已省略" in compacted[2].content
+    assert message_tokens(compacted[2]) <= 500 + 50
+    assert messages[2].content == "积分" * 3000  # 原消息不变
+
+
+def test_older_tool_outputs_compacted_to_fit_budget_latest_kept():
+    messages = [HumanMessage(content="工单"), *_tool_round("a", "旧" * 1500),
+                *_tool_round("b", "中" * 1500), *_tool_round("c", "新" * 1500)]
+
+    compacted = ContextManager(budget=2500, tool_output_limit=2000, reference_tokens=100).compact(messages)
+
+    assert compacted[2].content.startswith("[较早的工具输出已压缩]")
+    assert compacted[6].content == "新" * 1500
+    assert sum(message_tokens(m) for m in compacted) <= 2500
+    # 只替换内容，tool_calls 与 ToolMessage 一一对应
+    assert [m.tool_call_id for m in compacted if isinstance(m, ToolMessage)] == ["a", "b", "c"]
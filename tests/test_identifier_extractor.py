@@ -0,0 +1,47 @@
+import random
+
+from app.tools.identifier_extractor import extract_sql_first_id, identifier_extractor
+from benchmarks.bench_identifier_extraction import (
+    legacy_extract_trace_ids, legacy_extract_user_identifiers, make_logs, make_tickets
+)
+
+
+def test_user_identifiers_match_legacy_regexes():
+    tickets = make_tickets(300, random.Random(7))
+    tickets += [
+        "用户id:123456789012345678 手机号：13812345678",
+        "User ID: 11010119900307123X",
+        "身份证：11010119900307123X 电话：13912345678",
+        "客户来电号码 13712345678，无其他信息",
+        "没有标识符",
+    ]
+    for text, result in zip(tickets, identifier_extractor.scan_many(tickets)):
+        assert result.user_identifiers() == legacy_extract_user_identifiers(text), text
+
+
+def test_labeled_user_id_does_not_hide_id_number():
+    """"用户id:" 包含证件号的 "id:" 标签，两者都应提取到"""
+    result = identifier_extractor.scan("用户id:110101199003071234")
+
+    assert result.user_ids == ["110101199003071234"]
+    assert result.id_numbers == ["110101199003071234"]
+    assert result.numbers == []
+
+
+def test_scan_many_keeps_results_per_text():
+    results = identifier_extractor.scan_many(["证件号：11010119900307123X", "", "卡号：6217000012345678901"])
+
+    assert [r.id_numbers for r in results] == [["11010119900307123X"], [], []]
+    assert results[2].card_numbers == ["6217000012345678901"]
+    assert results[2].numbers == ["6217000012345678901"]
+
+
+def test_trace_ids_match_legacy_on_formatted_logs():
+    for log in make_logs(50, random.Random(3)):
+        if ":sso:" in log:
+            assert set(identifier_extractor.trace_ids(log)) == set(legacy_extract_trace_ids(log))
+
+
+def test_extract_sql_first_id():
+    assert extract_sql_first_id("[(1763739554902667264, '张三', 'M')]") == "1763739554902667264"
+    assert extract_sql_first_id("[]") is None
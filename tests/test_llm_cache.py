@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.services.llm_cache import TieredLLMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    llm_cache = TieredLLMCache(str(tmp_path / "llm_cache.db"), ttl=3600, max_memory_items=2, max_entries=3)
+    yield llm_cache
+    llm_cache.close()
+
+
+def _history(call_id="call_1"):
+    return [
+        HumanMessage(content="积分兑换失败"),
+        AIMessage(content="", tool_calls=[{"name": "query_user_info", "args": {"uid": "1"}, "id": call_id}]),
+        ToolMessage(content="[(1763739554902667264, '张三')]", tool_call_id=call_id, name="query_user_info"),
+    ]
+
+
+def test_key_is_deterministic_and_ignores_run_metadata():
+    first = _history()
+    second = _history()
+    second[0].id = "run-2-message"
+    second[1].usage_metadata = {"input_tokens": 10, "output_tokens": 1, "total_tokens": 11}
+
+    assert TieredLLMCache.key("analysis", first) == TieredLLMCache.key("analysis", second)
+
+
+def test_key_changes_with_namespace_content_or_tool_calls():
+    base = TieredLLMCache.key("analysis", _history())
+
+    assert TieredLLMCache.key("resolution", _history()) != base
+    assert TieredLLMCache.key("analysis", _history()[:2]) != base
+    assert TieredLLMCache.key("analysis", _history(call_id="call_2")) != base
+
+
+def test_put_and_get_round_trip_through_memory_and_disk(cache, tmp_path):
+    key = TieredLLMCache.key("analysis", _history())
+    answer = AIMessage(content="FINAL ANSWER: 已核实")
+    cache.put(key, answer)
+
+    assert cache.get(key).content == answer.content
+    assert cache.stats()["memory_hits"] == 1
+
+    # 新进程只有磁盘上的记录
+    reopened = TieredLLMCache(str(tmp_path / "llm_cache.db"), ttl=3600)
+    try:
+        assert reopened.get(key).content == answer.content
+        assert reopened.stats()["disk_hits"] == 1
+        assert reopened.get("missing") is None
+        assert reopened.stats()["misses"] == 1
+    finally:
+        reopened.close()
+
+
+def test_disk_entries_are_capped_and_expired(cache):
+    for n in range(5):
+        cache.put(f"key-{n}", AIMessage(content=str(n)))
+
+    assert cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 3
+    assert cache.stats()["memory_items"] == 2
+
+    cache.ttl = -1
+    assert cache.get("key-4") is None
+
+
+def test_async_get_and_put(cache):
+    async def scenario():
+        await cache.aput("key", AIMessage(content="cached"))
+        return await cache.aget("key")
+
+    assert asyncio.run(scenario()).content == "cached"
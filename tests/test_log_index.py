@@ -0,0 +1,84 @@
+import pytest
+
+from app.tools.MjLogs.log_index import LogIndex
+from app.tools.MjLogs.log_row import LogRow
+
+PROJECT = "uum-api"
+BEGIN = "2025-03-28 00:00:00"
+END = "2025-03-29 23:59:59"
+
+
+@pytest.fixture
+def index():
+    log_index = LogIndex(":memory:", ttl=3600)
+    yield log_index
+    log_index.close()
+
+
+def test_lookup_uncovered_window_returns_none(index):
+    assert index.lookup("1763739554902667264", PROJECT, BEGIN, END) is None
+
+
+def test_short_identifier_replays_ingested_rows(index):
+    """trigram 全文检索匹配不到 3 个字符以下的词，命中缓存时仍应返回写入的日志行"""
+    logs = [LogRow("2025-03-28 10:00:00", "user 42 login"), LogRow("2025-03-28 10:00:01", "user 42 logout")]
+    index.ingest("42", logs, PROJECT, BEGIN, END)
+
+    rows = index.lookup("42", PROJECT, BEGIN, END)
+    assert [row.message for row in rows] == ["user 42 login", "user 42 logout"]
+
+
+def test_rows_without_identifier_in_message_are_replayed(index):
+    """日志平台按其他字段命中的行，消息中不包含标识符，也应原样返回"""
+    logs = [
+        LogRow("2025-03-28 10:00:00", "query user 1763739554902667264"),
+        LogRow("2025-03-28 10:00:02", "points refund failed", extra={"traceId": "abc123def456"}),
+        LogRow("2025-03-28 10:00:03", None, level="ERROR"),
+    ]
+    index.ingest("1763739554902667264", logs, PROJECT, BEGIN, END)
+
+    rows = index.lookup("1763739554902667264", PROJECT, BEGIN, END)
+    assert [row.to_dict() for row in rows] == [log.to_dict() for log in logs]
+
+
+def test_lookup_narrower_window_filters_by_timestamp(index):
+    logs = [LogRow("2025-03-28 10:00:00", "a"), LogRow("2025-03-29 10:00:00", "b")]
+    index.ingest("a1", logs, PROJECT, BEGIN, END)
+
+    rows = index.lookup("a1", PROJECT, "2025-03-29 00:00:00", END)
+    assert [row.message for row in rows] == ["b"]
+
+
+def test_reingest_replaces_window_rows(index):
+    index.ingest("a1", [LogRow("2025-03-28 10:00:00", "old")], PROJECT, BEGIN, END)
+    index.ingest("a1", [LogRow("2025-03-28 11:00:00", "new")], PROJECT, BEGIN, END)
+
+    assert [row.message for row in index.lookup("a1", PROJECT, BEGIN, END)] == ["new"]
+
+
+def test_search_uses_full_text_index(index):
+    index.ingest("a1", [LogRow("2025-03-28 10:00:00", "points refund failed")], PROJECT, BEGIN, END)
+
+    assert [row.message for row in index.search("refund", PROJECT)] == ["points refund failed"]
+
+
+def test_rows_differing_only_outside_message_stay_distinct(index):
+    """时间和消息相同、IP 或级别不同的日志行是不同的行，不能合并"""
+    logs = [
+        LogRow("2025-03-28 10:00:00", "points refund failed", extra={"ip": "10.0.0.1"}),
+        LogRow("2025-03-28 10:00:00", "points refund failed", extra={"ip": "10.0.0.2"}),
+        LogRow("2025-03-28 10:00:00", "points refund failed", level="ERROR", extra={"ip": "10.0.0.2"}),
+        LogRow("2025-03-28 10:00:00", "points refund failed", level="ERROR", extra={"ip": "10.0.0.2"}),
+    ]
+    index.ingest("a1", logs, PROJECT, BEGIN, END)
+
+    rows = index.lookup("a1", PROJECT, BEGIN, END)
+    assert [row.to_dict() for row in rows] == [log.to_dict() for log in logs]
+    assert index._conn.execute("SELECT COUNT(*) FROM log_rows").fetchone()[0] == 3
+
+
+def test_ingest_more_rows_than_one_key_batch(index):
+    logs = [LogRow("2025-03-28 10:00:00", f"row {n}") for n in range(1200)]
+    index.ingest("a1", logs, PROJECT, BEGIN, END)
+
+    assert [row.message for row in index.lookup("a1", PROJECT, BEGIN, END)] == [f"row {n}" for n in range(1200)]
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from app.tools.MjLogs.log_pager import (
+    STOP_END, STOP_ERROR, STOP_MAX_PAGES, STOP_MAX_ROWS, STOP_PREDICATE, STOP_TIMEOUT, LogPager
+)
+from app.tools.MjLogs.log_row import LogPage, LogRow
+
+PAGE_SIZE = 10
+
+
+class FakeSource:
+    """共 total 条日志的分页接口，slow_pages 中的页延迟 delay 秒返回，fail_page 返回错误"""
+
+    def __init__(self, total: int, slow_pages=(), delay: float = 0.0, fail_page: int = None):
+        self.total = total
+        self.slow_pages = set(slow_pages)
+        self.delay = delay
+        self.fail_page = fail_page
+        self.requested = []
+
+    def _page(self, page_num: int) -> LogPage:
+        self.requested.append(page_num)
+        if page_num == self.fail_page:
+            return LogPage(error="请求发生错误: 502")
+        start = (page_num - 1) * PAGE_SIZE
+        rows = [LogRow("2025-03-28 10:00:00", f"row {n}") for n in range(start, min(start + PAGE_SIZE, self.total))]
+        return LogPage(rows, total=self.total)
+
+    def fetch(self, page_num: int) -> LogPage:
+        if page_num in self.slow_pages:
+            time.sleep(self.delay)
+        return self._page(page_num)
+
+    async def afetch(self, page_num: int) -> LogPage:
+        if page_num in self.slow_pages:
+            await asyncio.sleep(self.delay)
+        return self._page(page_num)
+
+
+def _read(pager: LogPager, use_async: bool):
+    if not use_async:
+        return [row.message for row in pager]
+
+    async def collect():
+        return [row.message async for row in pager]
+
+    return asyncio.run(collect())
+
+
+def _pager(source: FakeSource, **limits) -> LogPager:
+    options = dict(max_rows=0, max_pages=0, time_budget=0)
+    options.update(limits)
+    return LogPager(source.fetch, source.afetch, page_size=PAGE_SIZE, **options)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_reads_all_pages_until_end(use_async):
+    source = FakeSource(25)
+    pager = _pager(source)
+
+    assert _read(pager, use_async) == [f"row {n}" for n in range(25)]
+    assert (pager.stop_reason, pager.pages, pager.rows) == (STOP_END, 3, 25)
+    assert pager.complete
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_row_budget_stops_mid_page_without_fetching_more(use_async):
+    source = FakeSource(100)
+    pager = _pager(source, max_rows=15)
+
+    assert len(_read(pager, use_async)) == 15
+    assert pager.stop_reason == STOP_MAX_ROWS
+    assert source.requested == [1, 2]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_page_limit(use_async):
+    source = FakeSource(100)
+    pager = _pager(source, max_pages=2)
+
+    assert len(_read(pager, use_async)) == 20
+    assert pager.stop_reason == STOP_MAX_PAGES
+    assert not pager.complete
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_time_budget_abandons_slow_prefetch(use_async):
+    source = FakeSource(100, slow_pages={2}, delay=0.5)
+    pager = _pager(source, time_budget=0.1)
+
+    started = time.perf_counter()
+    assert len(_read(pager, use_async)) == 10
+    assert time.perf_counter() - started < 0.4
+    assert pager.stop_reason == STOP_TIMEOUT
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_stop_when_predicate(use_async):
+    pager = _pager(FakeSource(100), stop_when=lambda row: row.message == "row 12")
+
+    assert _read(pager, use_async)[-1] == "row 12"
+    assert pager.stop_reason == STOP_PREDICATE
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failed_page_keeps_earlier_rows_and_records_error(use_async):
+    pager = _pager(FakeSource(100, fail_page=2))
+
+    assert len(_read(pager, use_async)) == 10
+    assert pager.stop_reason == STOP_ERROR
+    assert pager.error == "请求发生错误: 502"
@@ -0,0 +1,52 @@
+from app.tools.MjLogs.log_templates import WILDCARD, LogTemplateMiner, strip_ansi
+
+
+def test_messages_differing_only_in_variables_share_a_template():
+    miner = LogTemplateMiner()
+    for n, (user_id, trace) in enumerate((("1763739554902667264", "a1b2c3d4e5f6"), ("1763739554902667999", "0f9e8d7c6b5a"))):
+        miner.add(f"2025-03-28 10:00:0{n}.123 INFO 172.16.0.{n}:sso:{trace}:8080 查询用户信息 userId={user_id} cost={n}ms",
+                  f"2025-03-28 10:00:0{n}")
+
+    assert len(miner.clusters) == 1
+    cluster = miner.clusters[0]
+    assert cluster.count == 2
+    assert cluster.template_text == f"{WILDCARD} {WILDCARD} INFO {WILDCARD}:sso:{WILDCARD}:{WILDCARD} 查询用户信息 " \
+                                    f"userId={WILDCARD} cost={WILDCARD}ms"
+    assert (cluster.first_timestamp, cluster.last_timestamp) == ("2025-03-28 10:00:00", "2025-03-28 10:00:01")
+    # 参数示例不含时间
+    assert cluster.sample_params()[0] == ["172.16.0.0:sso:a1b2c3d4e5f6:8080", "userId=1763739554902667264", "cost=0ms"]
+
+
+def test_different_messages_get_separate_templates():
+    miner = LogTemplateMiner()
+    miner.add("points refund failed for order 1001")
+    miner.add("points refund failed for order 1002")
+    miner.add("sms verification code sent to 13812345678")
+    miner.add("user login success")
+
+    assert [cluster.count for cluster in miner.clusters] == [2, 1, 1]
+    assert miner.clusters[0].template_text == f"points refund failed for order {WILDCARD}"
+    assert miner.total == 4
+
+
+def test_constant_tokens_that_differ_become_wildcards_above_threshold():
+    miner = LogTemplateMiner(similarity_threshold=0.5)
+    miner.add("cache miss for key activity")
+    miner.add("cache miss for key subject")
+    miner.add("queue full drop job now")
+
+    assert miner.clusters[0].template_text == f"cache miss for key {WILDCARD}"
+    assert len(miner.clusters) == 2
+
+
+def test_samples_are_capped():
+    miner = LogTemplateMiner(max_samples=2)
+    for n in range(5):
+        miner.add(f"retry {n} of request")
+
+    assert miner.clusters[0].count == 5
+    assert len(miner.clusters[0].samples) == 2
+
+
+def test_strip_ansi():
+    assert strip_ansi("\033[32mINFO\033[0m ok") == "INFO ok"
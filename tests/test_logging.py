@@ -0,0 +1,22 @@
+import os
+
+from app.core.config import settings
+from app.core.logging import logger, start_logging, stop_logging
+
+
+def _log_file_text() -> str:
+    with open(os.path.join(settings.LOG_DIR, "ticket_assistant.log"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_logging_resumes_after_stop():
+    """应用关闭时停止日志线程后，同一进程中再次启动应用仍能写日志"""
+    stop_logging()
+    stop_logging()  # 可重复调用
+    start_logging()
+    start_logging()  # 已在运行时不重复添加处理器
+    logger.warning("restarted-logging-marker")
+    stop_logging()  # 写出队列中剩余的日志
+
+    assert _log_file_text().count("restarted-logging-marker") == 1
+    start_logging()
@@ -0,0 +1,49 @@
+from app.tools.PointsDetails.points_ledger import PointsLedger
+
+SUBJECT = "S00000000101220250213 【邮储总行】2025年蜜雪冰城周周享-3月奖励"
+EXCHANGE_ROW = (f"6 电子礼券 {SUBJECT} 1340********7966 1259********7900 -6 7   20250331 兑换 "
+                f"蜜雪冰城5元券（周周享）二期，共1件 20250325 093002   0.00 1111224651184472065")
+REFUND_ROW = (f"5 电子礼券 {SUBJECT} 1340********7966 1259********7900 6 13   20250331 退货 "
+              f"权益撤销 20250325 160001   0.00 11113227923448094720")
+GAIN_ROW = (f"7 电子礼券 {SUBJECT} 1340********7966 1340********8100 1 0   20250331 新增 "
+            f"财付通(银联云闪付) 20250305 005647 【邮储总行】2025年蜜雪冰城周周享-3月 0.00  ")
+
+
+def test_parse_single_row_keeps_fixed_width_date_and_time():
+    ledger = PointsLedger.parse(EXCHANGE_ROW)
+
+    assert len(ledger) == 1
+    assert ledger.records()[0]["trade_time"] == 93002
+    header, row = ledger.format_rows([0]).split("\n")
+    cells = row.split(" | ")
+    assert cells == ["6", "电子礼券", "S00000000101220250213", "【邮储总行】2025年蜜雪冰城周周享-3月奖励",
+                     "1340********7966", "1259********7900", "-6", "7", "", "20250331", "兑换",
+                     "蜜雪冰城5元券（周周享）二期，共1件", "20250325", "093002", "", "0.00", "1111224651184472065"]
+
+
+def test_summary_pairs_exchange_with_later_refund():
+    ledger = PointsLedger.parse("   ".join([REFUND_ROW, EXCHANGE_ROW, GAIN_ROW]))
+
+    assert [int(seq) for seq in ledger.seq] == [5, 6, 7]
+    pairs = ledger.exchange_refund_pairs()
+    assert [(p["exchange_seq"], p["refund_seq"]) for p in pairs["pairs"]] == [(6, 5)]
+    assert pairs["unmatched_exchanges"] == [] and pairs["unmatched_refunds"] == []
+
+    summary = ledger.summarize()
+    assert "共 3 笔积分明细，时间 20250305005647 ~ 20250325160001" in summary
+    assert "净变动 +1" in summary
+    assert "20250305 | 005647" in summary
+
+
+def test_filter_by_date_range_and_full_card_number():
+    ledger = PointsLedger.parse("   ".join([REFUND_ROW, EXCHANGE_ROW, GAIN_ROW]))
+
+    selected = ledger.filter("2025-03-20", "2025-03-31", "1259000000007900")
+    assert [int(seq) for seq in selected.seq] == [5, 6]
+
+
+def test_subject_numbers_are_distinct_and_sorted():
+    ledger = PointsLedger.parse("   ".join([REFUND_ROW, EXCHANGE_ROW, GAIN_ROW]))
+
+    assert ledger.subject_numbers() == ["S00000000101220250213"]
+    assert PointsLedger.parse("").subject_numbers() == []
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.tools.PointsDetails.points_ledger import PointsLedger
+from app.tools.PointsDetails.points_store import PointsStore
+from app.tools.PointsDetails.query_points_details import _POINTS_LOGS
+
+CARD, BANK = "1340********7966", "01"
+
+
+@pytest.fixture
+def store():
+    points_store = PointsStore(":memory:", ttl=3600)
+    yield points_store
+    points_store.close()
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    return PointsLedger.parse(_POINTS_LOGS)
+
+
+def test_uncovered_card_is_one_gap(store):
+    assert store.missing_ranges(CARD, BANK, "2025-03-01", "2025-03-31") == [("2025-03-01", "2025-03-31")]
+
+
+def test_gaps_exclude_covered_ranges(store, ledger):
+    store.ingest(CARD, BANK, "2025-03-05", "2025-03-10", ledger.filter("2025-03-05", "2025-03-10", CARD))
+    store.ingest(CARD, BANK, "2025-03-20", "2025-03-25", ledger.filter("2025-03-20", "2025-03-25", CARD))
+
+    assert store.missing_ranges(CARD, BANK, "2025-03-01", "2025-03-31") == [
+        ("2025-03-01", "2025-03-04"), ("2025-03-11", "2025-03-19"), ("2025-03-26", "2025-03-31"),
+    ]
+    assert store.missing_ranges(CARD, BANK, "2025-03-06", "2025-03-09") == []
+    assert store.missing_ranges(CARD, "02", "2025-03-06", "2025-03-09") == [("2025-03-06", "2025-03-09")]
+
+
+def test_today_is_never_marked_covered(store):
+    today = date.today()
+    start = (today - timedelta(days=3)).isoformat()
+    store.ingest(CARD, BANK, start, today.isoformat(), PointsLedger.from_records([]))
+
+    assert store.missing_ranges(CARD, BANK, start, today.isoformat()) == [(today.isoformat(), today.isoformat())]
+
+
+def test_query_returns_stored_rows_in_time_order_without_duplicates(store, ledger):
+    expected = ledger.filter("2025-03-20", "2025-03-31", CARD)
+    store.ingest(CARD, BANK, "2025-03-20", "2025-03-31", expected)
+    # 与已有区间重叠的再次写入不产生重复行
+    store.ingest(CARD, BANK, "2025-03-24", "2025-03-31", ledger.filter("2025-03-24", "2025-03-31", CARD))
+
+    stored = store.query(CARD, BANK, "2025-03-20", "2025-03-31")
+    assert len(stored) == len(expected) > 0
+    assert list(stored.timestamps) == sorted(expected.timestamps, reverse=True)
+    assert [int(seq) for seq in stored.seq] == list(range(1, len(stored) + 1))
+    assert "093002" in stored.format_rows(list(range(len(stored))))
+
+
+def test_expired_coverage_is_fetched_again(store, ledger):
+    store.ingest(CARD, BANK, "2025-03-20", "2025-03-31", ledger.filter("2025-03-20", "2025-03-31", CARD))
+    store.ttl = -1
+
+    assert store.missing_ranges(CARD, BANK, "2025-03-20", "2025-03-31") == [("2025-03-20", "2025-03-31")]
+    assert len(store.query(CARD, BANK, "2025-03-20", "2025-03-31")) == 0
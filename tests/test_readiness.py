@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from app.services.readiness import Readiness
+
+
+def test_failed_required_dependency_is_retried_until_ready():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("db down")
+
+    async def scenario():
+        readiness = Readiness(timeout=1, optional="", retry_interval=0.01, max_retry_interval=0.02)
+        readiness.register("database", flaky)
+        readiness.register("workflow", lambda: None)
+        await asyncio.wait_for(readiness.run(), 2)
+        return readiness
+
+    readiness = asyncio.run(scenario())
+    assert len(attempts) == 3
+    assert readiness.ready
+    assert readiness.snapshot()["dependencies"]["database"]["error"] is None
+
+
+def test_not_ready_while_required_dependency_fails():
+    def down():
+        raise ConnectionError("db down")
+
+    async def scenario():
+        readiness = Readiness(timeout=1, optional="mjlog", retry_interval=0.01, max_retry_interval=0.01)
+        readiness.register("database", down)
+        task = asyncio.create_task(readiness.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return readiness
+
+    readiness = asyncio.run(scenario())
+    assert not readiness.ready
+    assert readiness.snapshot()["status"] == "not_ready"
+
+
+def test_timed_out_sync_check_is_awaited_instead_of_restarted():
+    """超时的同步预热仍在线程中执行时，重试继续等待它，不再启动新线程"""
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+
+    async def scenario():
+        readiness = Readiness(timeout=0.05, optional="")
+        readiness.register("database", slow)
+        first = await readiness.check("database")
+        assert not first.ready and "超时" in first.error
+        await readiness.check("database")
+        release.set()
+        return await readiness.check("database")
+
+    status = asyncio.run(scenario())
+    assert status.ready
+    assert len(calls) == 1
@@ -0,0 +1,65 @@
+from app.tools.sql_template_cache import SQLTemplateCache, clean_generated_sql
+
+
+def test_normalize_lifts_literals_into_parameters():
+    key, params = SQLTemplateCache.normalize("查询用户 ID 为 1763739554902667264 的用户信息。")
+
+    assert key == "查询用户 ID 为 {number0} 的用户信息"
+    assert params == {"number0": "1763739554902667264"}
+    # 同一句式、不同取值得到相同的缓存键
+    assert SQLTemplateCache.normalize("查询用户 ID 为 1763739554902667999 的用户信息")[0] == key
+
+
+def test_normalize_distinguishes_id_number_and_phone():
+    key, params = SQLTemplateCache.normalize("证件号 11010119900307123X 手机 13812345678 的用户")
+
+    assert key == "证件号 {id_number0} 手机 {phone0} 的用户"
+    assert params == {"id_number0": "11010119900307123X", "phone0": "13812345678"}
+
+
+def test_generated_sql_is_parameterized_and_reused():
+    cache = SQLTemplateCache(max_size=10)
+    key, params = SQLTemplateCache.normalize("查询用户 ID 为 1763739554902667264 的用户信息")
+    sql = clean_generated_sql("SQLQuery: SELECT * FROM user WHERE id = 1763739554902667264 LIMIT 5;")
+
+    assert cache.put(key, params, sql)
+    template = cache.get(SQLTemplateCache.normalize("查询用户 ID 为 1763739554900000001 的用户信息")[0])
+    assert template.sql == "SELECT * FROM user WHERE id = :number0 LIMIT 5"
+    assert template.bind({"number0": "1763739554900000001"}) == {"number0": 1763739554900000001}
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 0}
+
+
+def test_quoted_literals_bind_as_strings():
+    cache = SQLTemplateCache()
+    key, params = SQLTemplateCache.normalize("手机号 13812345678 的用户")
+
+    assert cache.put(key, params, "SELECT id FROM user WHERE phone = '13812345678'")
+    template = cache.get(key)
+    assert template.sql == "SELECT id FROM user WHERE phone = :phone0"
+    assert template.bind(params) == {"phone0": "13812345678"}
+
+
+def test_sql_that_cannot_be_parameterized_is_not_cached():
+    cache = SQLTemplateCache()
+    key, params = SQLTemplateCache.normalize("查询用户 ID 为 1763739554902667264 的用户信息")
+
+    # 写死了问题中没有的取值
+    assert not cache.put(key, params, "SELECT * FROM user WHERE id = 1763739554902667264 AND org = 12345678")
+    # 非 SELECT 或多条语句
+    assert not cache.put(key, params, "DELETE FROM user WHERE id = 1763739554902667264")
+    assert not cache.put(key, params, "SELECT 1; SELECT * FROM user WHERE id = 1763739554902667264")
+    # 问题中的字面量没有出现在 SQL 中
+    assert not cache.put(key, params, "SELECT * FROM user")
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_template_is_evicted():
+    cache = SQLTemplateCache(max_size=2)
+    for n in range(3):
+        key, params = SQLTemplateCache.normalize(f"查询表{n} ID 为 1763739554902667264 的记录")
+        cache.put(key, params, f"SELECT * FROM t{n} WHERE id = 1763739554902667264")
+
+    lookup = lambda n: cache.get(SQLTemplateCache.normalize(f"查询表{n} ID 为 1763739554900000000 的记录")[0])
+    assert lookup(0) is None
+    assert lookup(2).sql == "SELECT * FROM t2 WHERE id = :number0"
+    assert cache.stats()["size"] == 2
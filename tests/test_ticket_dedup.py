@@ -0,0 +1,75 @@
+from app.models.ticket_dto import TicketRequest, TicketResponse
+from app.services.ticket_dedup import SimilarTicket, TicketDeduplicator, build_seed_message
+
+BODY = ("客户致电表示在信用卡APP进行抢兑，邮储小绿卡 蜜雪冰城天天1分购活动的兑换券未成功，"
+        "客户称在进行支付最后一步输入验证码后提示账户异常，现客户要求核实原因。")
+
+
+def _ticket(name: str, card: str, phone: str, body: str = BODY) -> TicketRequest:
+    return TicketRequest(description=f"联系人姓名：{name} 卡号：{card} 联系方式：{phone}\n{body}")
+
+
+def _response(request_id: str = "req-1", status: str = "success") -> TicketResponse:
+    return TicketResponse(request_id=request_id, status=status, analysis="验证码环节风控拦截",
+                          solution="引导客户解除风控后重试", processing_time=1)
+
+
+def test_mask_removes_per_customer_details():
+    a = TicketDeduplicator.mask(_ticket("王五", "6217000012345678901", "13812345678").format_ticket_content())
+    b = TicketDeduplicator.mask(_ticket("李四", "6217000098765432100", "13987654321").format_ticket_content())
+
+    assert a == b
+    assert "王五" not in a and "6217000012345678901" not in a and "13812345678" not in a
+
+
+def test_same_incident_for_another_customer_is_matched():
+    dedup = TicketDeduplicator(threshold=0.85, window=3600)
+    dedup.remember(_ticket("王五", "6217000012345678901", "13812345678"), _response())
+
+    similar = dedup.find(_ticket("李四", "6217000098765432100", "13987654321"))
+
+    assert similar is not None
+    assert similar.request_id == "req-1" and similar.similarity == 1.0
+    assert dedup.hits == 1
+
+
+def test_minhash_similarity_drops_below_threshold_for_different_ticket():
+    dedup = TicketDeduplicator(threshold=0.85, window=3600)
+    dedup.remember(_ticket("王五", "6217000012345678901", "13812345678"), _response())
+
+    # 少量改动仍高于阈值，内容不同的工单低于阈值
+    edited = dedup.find(_ticket("李四", "6217000098765432100", "13987654321", BODY.replace("验证码", "短信验证码")))
+    other = dedup.find(_ticket("李四", "6217000098765432100", "13987654321", "客户反映积分到期未提醒，要求恢复已过期积分。"))
+
+    assert edited is not None and 0.85 <= edited.similarity < 1.0
+    assert other is None
+
+
+def test_signature_similarity_tracks_jaccard():
+    dedup = TicketDeduplicator(num_perm=256)
+    a, b = "abcdefghijklmnopqrst", "abcdefghijklmnopqrsX"
+    shingles = lambda s: {s[i:i + 3] for i in range(len(s) - 2)}
+    jaccard = len(shingles(a) & shingles(b)) / len(shingles(a) | shingles(b))
+
+    estimate = float((dedup.signature(a) == dedup.signature(b)).mean())
+    assert abs(estimate - jaccard) < 0.15
+
+
+def test_failed_or_empty_results_are_not_remembered_and_entries_expire():
+    dedup = TicketDeduplicator(window=3600)
+    ticket = _ticket("王五", "6217000012345678901", "13812345678")
+    dedup.remember(ticket, _response(status="error"))
+    dedup.remember(ticket, TicketResponse(request_id="req-2", processing_time=1))
+    assert len(dedup) == 0
+
+    dedup.remember(ticket, _response())
+    dedup.window = -1
+    assert dedup.find(ticket) is None
+    assert len(dedup) == 0
+
+
+def test_seed_message_includes_prior_conclusions():
+    message = build_seed_message(SimilarTicket("req-1", 0.9, "验证码环节风控拦截", "引导客户解除风控后重试", 0))
+
+    assert "req-1" in message and "0.90" in message
+    assert "验证码环节风控拦截" in message and "引导客户解除风控后重试" in message
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.controller import ticket_api
+from app.models.ticket_dto import TicketRequest, TicketResponse
+from app.services.ticket_queue import TicketQueue
+
+
+class FakeWorkflowService:
+    """按处理顺序记录工单，release 之前阻塞第一个工单"""
+
+    def __init__(self):
+        self.processed = []
+        self.release = asyncio.Event()
+
+    async def process_ticket(self, ticket: TicketRequest, request_id: str) -> TicketResponse:
+        self.processed.append(ticket.description)
+        await self.release.wait()
+        return TicketResponse(request_id=request_id, processing_time=0)
+
+
+def test_jobs_run_by_priority_then_submission_order():
+    async def scenario():
+        service = FakeWorkflowService()
+        queue = TicketQueue(service, workers=1, max_size=10, result_ttl=60)
+        await queue.start()
+        blocker = queue.submit(TicketRequest(description="first"), "normal")
+        await asyncio.sleep(0.01)  # worker 取走第一个工单后阻塞
+        jobs = [queue.submit(TicketRequest(description=name), priority)
+                for name, priority in (("low", "low"), ("normal-1", None), ("紧急", None), ("normal-2", "normal"))]
+        service.release.set()
+        while any(job.status != "success" for job in [blocker, *jobs]):
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return service.processed, [job.priority for job in jobs]
+
+    processed, priorities = asyncio.run(scenario())
+    assert processed == ["first", "紧急", "normal-1", "normal-2", "low"]
+    assert priorities == ["low", "normal", "urgent", "normal"]
+
+
+def test_classify_marks_urgent_keywords():
+    queue = TicketQueue(FakeWorkflowService(), workers=0)
+
+    assert queue.classify(TicketRequest(description="客户要求加急处理")) == "urgent"
+    assert queue.classify(TicketRequest(description="积分未到账")) == "normal"
+
+
+def test_submit_raises_when_full_and_stop_cancels_queued_jobs():
+    async def scenario():
+        queue = TicketQueue(FakeWorkflowService(), workers=0, max_size=1)
+        await queue.start()
+        job = queue.submit(TicketRequest(description="a"))
+        with pytest.raises(asyncio.QueueFull):
+            queue.submit(TicketRequest(description="b"))
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "cancelled"
+    assert job.ticket is None
+
+
+def test_full_queue_returns_429_with_depth(monkeypatch):
+    queue = TicketQueue(FakeWorkflowService(), workers=0, max_size=1)
+    asyncio.run(queue.start())
+    monkeypatch.setattr(ticket_api, "_job_queue", queue)
+    app = FastAPI()
+    app.include_router(ticket_api.router)
+
+    with TestClient(app) as client:
+        accepted = client.post("/jobs", json={"description": "积分未到账", "priority": "low"})
+        rejected = client.post("/jobs", json={"description": "积分未到账"})
+
+    assert accepted.status_code == 202
+    assert accepted.json()["status"] == "queued" and accepted.json()["priority"] == "low"
+    assert rejected.status_code == 429
+    assert rejected.json()["detail"]["queue_depth"] == 1
+    assert rejected.headers["Retry-After"] == "10"
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+from langchain_core.messages import AIMessage
+
+from app.core.config import settings
+from app.services.ticket_workflow import TicketWorkflowService, ToolCallMemo, batch_tool_memo
+
+
+class FakeTool:
+    """记录调用次数和最大并发数的工具"""
+
+    def __init__(self, name: str, delay: float = 0.05, error: Exception = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def ainvoke(self, args):
+        self.calls.append(args)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return f"{self.name}:{args.get('key')}"
+        finally:
+            self.running -= 1
+
+
+def _service(*tools: FakeTool) -> TicketWorkflowService:
+    """只用到工具节点，不创建模型客户端和工作流图"""
+    service = TicketWorkflowService.__new__(TicketWorkflowService)
+    service.tools_by_name = {tool.name: tool for tool in tools}
+    return service
+
+
+def _state(*calls):
+    tool_calls = [{"name": name, "args": {"key": key}, "id": f"call_{i}"} for i, (name, key) in enumerate(calls)]
+    return {"messages": [AIMessage(content="", tool_calls=tool_calls)], "context": {}, "sender": "analysis_agent"}
+
+
+def test_tool_calls_of_one_step_run_concurrently_in_order(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_MAX_CONCURRENCY", 4)
+    tool = FakeTool("query_user_info", delay=0.1)
+    service = _service(tool)
+
+    started = time.perf_counter()
+    result = asyncio.run(service._tool_node_with_context(_state(*[("query_user_info", n) for n in range(4)])))
+
+    assert time.perf_counter() - started < 0.3
+    assert tool.max_running == 4
+    assert [m.content for m in result["messages"]] == [f"query_user_info:{n}" for n in range(4)]
+    assert [m.tool_call_id for m in result["messages"]] == [f"call_{n}" for n in range(4)]
+
+
+def test_tool_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_MAX_CONCURRENCY", 2)
+    tool = FakeTool("query_user_info", delay=0.02)
+
+    asyncio.run(_service(tool)._tool_node_with_context(_state(*[("query_user_info", n) for n in range(5)])))
+
+    assert tool.max_running == 2
+    assert len(tool.calls) == 5
+
+
+def test_failing_slow_and_unknown_tools_become_error_messages(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_TIMEOUTS", {"query_system_logs": 0.05})
+    service = _service(FakeTool("query_user_info"), FakeTool("query_system_logs", delay=1),
+                       FakeTool("query_points_details", error=RuntimeError("upstream down")))
+
+    result = asyncio.run(service._tool_node_with_context(_state(
+        ("query_user_info", 1), ("query_system_logs", 2), ("query_points_details", 3), ("missing_tool", 4)
+    )))
+
+    assert [m.content for m in result["messages"]] == [
+        "query_user_info:1", "错误: 工具调用超时(0.05秒)", "错误: upstream down", "错误: 未找到工具 missing_tool",
+    ]
+
+
+def _run_tickets(service, states):
+    """模拟一个批次：在设置 memo 的上下文中并发执行各工单的工具节点"""
+    async def scenario():
+        memo = ToolCallMemo()
+        token = batch_tool_memo.set(memo)
+        try:
+            results = await asyncio.gather(*(service._tool_node_with_context(state) for state in states))
+        finally:
+            batch_tool_memo.reset(token)
+        return memo, results
+
+    return asyncio.run(scenario())
+
+
+def test_batch_shares_identical_tool_calls_across_tickets():
+    tool = FakeTool("query_user_info")
+    memo, results = _run_tickets(_service(tool), [_state(("query_user_info", 1)) for _ in range(3)])
+
+    assert len(tool.calls) == 1
+    assert memo.hits == 2
+    assert [r["messages"][0].content for r in results] == ["query_user_info:1"] * 3
+
+
+def test_batch_does_not_share_tools_that_depend_on_ticket_context():
+    tool = FakeTool("query_system_logs")
+    memo, _ = _run_tickets(_service(tool), [_state(("query_system_logs", 1)) for _ in range(3)])
+
+    assert len(tool.calls) == 3
+    assert memo.hits == 0
+
+
+def test_failed_shared_call_is_retried_by_later_tickets():
+    tool = FakeTool("query_points_details", error=RuntimeError("upstream down"))
+    service = _service(tool)
+
+    async def scenario():
+        memo = ToolCallMemo()
+        token = batch_tool_memo.set(memo)
+        try:
+            first = await service._tool_node_with_context(_state(("query_points_details", 1)))
+            tool.error = None
+            second = await service._tool_node_with_context(_state(("query_points_details", 1)))
+        finally:
+            batch_tool_memo.reset(token)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["messages"][0].content == "错误: upstream down"
+    assert second["messages"][0].content == "query_points_details:1"
+    assert len(tool.calls) == 2